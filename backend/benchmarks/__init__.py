@@ -0,0 +1,13 @@
+"""
+バックエンドのベンチマーク
+
+Connpass規模の合成データ（参加者・景品・不参加・当選者）を作成し、
+CSVの解析・管理クラスの各操作・各APIルートの所要時間を計測して、実行間で比較できるJSONに書き出す
+loadtestは起動したバックエンドに会場と同じ種類の同時アクセスで負荷をかけ、応答時間と変更が失われていないかを確認する
+
+使い方（backendディレクトリで実行）：
+    python -m benchmarks run --scales 1k,10k --output results.json
+    python -m benchmarks compare before.json after.json
+    python -m benchmarks generate --scale 100k --output ./data-testing
+    python -m benchmarks loadtest --profile busy --duration 60
+"""
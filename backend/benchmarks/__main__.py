@@ -0,0 +1,106 @@
+import argparse
+import json
+import sys
+
+from benchmarks.compare import compare_results, format_results
+from benchmarks.datagen import SCALES, Scale, generate_dataset, parse_scale
+from benchmarks.loadtest import PROFILES, format_loadtest, run_loadtest
+from benchmarks.runner import run_benchmarks, run_scale
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='バックエンドのベンチマーク')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='合成データで計測し、結果をJSONに書き出す')
+    run_parser.add_argument('--scales', default='1k,10k', help=f'規模（{",".join(SCALES)}又は参加者数）のカンマ区切り（既定：1k,10k）')
+    run_parser.add_argument('--repeat', type=int, default=20, help='各操作の計測回数（既定：20）')
+    run_parser.add_argument('--bulk-repeat', type=int, default=3, help='解析・全体を置き換える操作の計測回数（既定：3）')
+    run_parser.add_argument('--storage', choices=('csv', 'sqlite'), default='csv', help='データの保存先（既定：csv）')
+    run_parser.add_argument('--seed', type=int, default=0, help='合成データ・操作対象の乱数シード（既定：0）')
+    run_parser.add_argument('--output', help='結果のJSONの書き出し先（省略時は表のみ表示）')
+    run_parser.add_argument('--verbose', action='store_true', help='バックエンドの出力も表示する')
+
+    compare_parser = subparsers.add_parser('compare', help='2つの結果のJSONを比較する')
+    compare_parser.add_argument('before', help='変更前の結果')
+    compare_parser.add_argument('after', help='変更後の結果')
+    compare_parser.add_argument('--threshold', type=float, default=1.2, help='この倍率より遅くなった項目を遅延とし、終了コードを1にする（既定：1.2）')
+
+    generate_parser = subparsers.add_parser('generate', help='合成データのCSV・TXTファイルのみを作成する')
+    generate_parser.add_argument('--scale', default='1k', help=f'規模（{",".join(SCALES)}又は参加者数）')
+    generate_parser.add_argument('--seed', type=int, default=0, help='乱数シード（既定：0）')
+    generate_parser.add_argument('--output', required=True, help='書き出し先のディレクトリ（バックエンドのDATA_PATHとして利用できる）')
+
+    loadtest_parser = subparsers.add_parser('loadtest', help='表示・受付・ステージ操作の同時アクセスで負荷をかける')
+    loadtest_parser.add_argument('--profile', choices=list(PROFILES), default='event-day', help='負荷の種類（既定：event-day）')
+    for field, default in PROFILES['event-day']._asdict().items():
+        loadtest_parser.add_argument(f'--{field.replace("_", "-")}', type=type(default), help=f'{field}を--profileの値から変更する')
+    loadtest_parser.add_argument('--duration', type=float, default=30.0, help='負荷をかける時間（秒、既定：30）')
+    loadtest_parser.add_argument('--scale', default='10k', help=f'起動するバックエンドのデータの規模（{",".join(SCALES)}又は参加者数、既定：10k）')
+    loadtest_parser.add_argument('--workers', type=int, default=4, help='gunicornのworker数（既定：4）')
+    loadtest_parser.add_argument('--threads', type=int, default=16, help='gunicornのスレッド数（既定：16）')
+    loadtest_parser.add_argument('--storage', choices=('csv', 'sqlite'), default='csv', help='データの保存先（既定：csv）')
+    loadtest_parser.add_argument('--no-restart-check', action='store_true', help='終了後に再起動して変更が残っているかを確認しない')
+    loadtest_parser.add_argument('--url', help='起動済みのバックエンド（例：http://127.0.0.1:6001）に負荷をかける（データが変更されるので本番では使わないこと）')
+    loadtest_parser.add_argument('--seed', type=int, default=0, help='乱数シード（既定：0）')
+    loadtest_parser.add_argument('--output', help='結果のJSONの書き出し先')
+
+    # run_benchmarks()が規模ごとに起動する内部用のコマンド
+    worker_parser = subparsers.add_parser('worker')
+    worker_parser.add_argument('result_filepath')
+    worker_parser.add_argument('options')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        scales = [parse_scale(value) for value in args.scales.split(',') if value != '']
+        results = run_benchmarks(scales, args.repeat, args.bulk_repeat, args.storage, args.seed, args.verbose)
+        print('\n'.join(format_results(results)))
+        if args.output:
+            with open(args.output, 'wt', encoding='utf-8') as output_file:
+                json.dump(results, output_file, ensure_ascii=False, indent=2)
+            print(f'結果を{args.output}に書き出しました', file=sys.stderr)
+        return 0
+
+    elif args.command == 'compare':
+        with open(args.before, 'rt', encoding='utf-8') as before_file, open(args.after, 'rt', encoding='utf-8') as after_file:
+            before, after = json.load(before_file), json.load(after_file)
+        lines, regressions = compare_results(before, after, args.threshold)
+        print('\n'.join(lines))
+        if regressions > 0:
+            print(f'{args.threshold}倍より遅くなった項目が{regressions}件あります', file=sys.stderr)
+            return 1
+        return 0
+
+    elif args.command == 'generate':
+        dataset = generate_dataset(args.output, parse_scale(args.scale), args.seed)
+        print(f'{args.output}に参加者{len(dataset.registration_ids)}人・景品{len(dataset.prize_ids)}個・不参加{len(dataset.cancel_ids)}人・当選{len(dataset.winners)}件を書き出しました')
+        return 0
+
+    elif args.command == 'loadtest':
+        profile = PROFILES[args.profile]
+        profile = profile._replace(**{field: getattr(args, field) for field in profile._fields if getattr(args, field) is not None})
+        result = run_loadtest(
+            args.profile, profile, args.duration, args.seed, args.url, parse_scale(args.scale),
+            args.workers, args.threads, args.storage, not args.no_restart_check
+        )
+        print('\n'.join(format_loadtest(result)))
+        if args.output:
+            with open(args.output, 'wt', encoding='utf-8') as output_file:
+                json.dump(result, output_file, ensure_ascii=False, indent=2)
+            print(f'結果を{args.output}に書き出しました', file=sys.stderr)
+        return 0 if result["ok"] else 1
+
+    elif args.command == 'worker':
+        options = json.loads(args.options)
+        scale = Scale(**options["scale"])
+        result = run_scale(scale, options["repeat"], options["bulk_repeat"], options["storage"], options["seed"])
+        with open(args.result_filepath, 'wt', encoding='utf-8') as result_file:
+            json.dump(result, result_file, ensure_ascii=False)
+        return 0
+
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from typing import Any
+
+
+def index_results(results: dict[str, Any]) -> dict[tuple[str, str, str], dict[str, Any]]:
+    """
+    結果を（規模, グループ, 名前）で引けるようにする
+    """
+    return {(result["scale"], result["group"], result["name"]): result for result in results["results"]}
+
+
+def compare_results(before: dict[str, Any], after: dict[str, Any], threshold: float) -> tuple[list[str], int]:
+    """
+    2回の実行結果の中央値を比較する
+    表の各行と、threshold倍より遅くなった項目の数を返す
+    """
+    before_index = index_results(before)
+    after_index = index_results(after)
+    lines = [f'{"規模":<6} {"グループ":<8} {"項目":<64} {"変更前(ms)":>12} {"変更後(ms)":>12} {"比":>7}']
+    regressions = 0
+    for key, after_result in after_index.items():
+        scale, group, name = key
+        before_result = before_index.get(key)
+        after_ms = after_result["median_s"] * 1000
+        if before_result is None:
+            lines.append(f'{scale:<6} {group:<8} {name:<64} {"-":>12} {after_ms:>12.3f} {"new":>7}')
+            continue
+        before_ms = before_result["median_s"] * 1000
+        ratio = after_ms / before_ms if before_ms > 0 else float('inf')
+        marker = ''
+        if ratio > threshold:
+            regressions += 1
+            marker = ' !'
+        lines.append(f'{scale:<6} {group:<8} {name:<64} {before_ms:>12.3f} {after_ms:>12.3f} {ratio:>6.2f}x{marker}')
+    for key in before_index.keys() - after_index.keys():
+        scale, group, name = key
+        lines.append(f'{scale:<6} {group:<8} {name:<64} {before_index[key]["median_s"] * 1000:>12.3f} {"-":>12} {"removed":>7}')
+    return lines, regressions
+
+
+def format_results(results: dict[str, Any]) -> list[str]:
+    """
+    1回の実行結果を表にする
+    """
+    lines = [f'{"規模":<6} {"グループ":<8} {"項目":<64} {"回数":>5} {"中央値(ms)":>12} {"最小(ms)":>12} {"最大(ms)":>12}']
+    for result in results["results"]:
+        lines.append(
+            f'{result["scale"]:<6} {result["group"]:<8} {result["name"]:<64} {result["count"]:>5} '
+            f'{result["median_s"] * 1000:>12.3f} {result["min_s"] * 1000:>12.3f} {result["max_s"] * 1000:>12.3f}'
+        )
+    return lines
@@ -0,0 +1,98 @@
+import csv
+import os
+from random import Random
+from typing import NamedTuple
+
+
+class Scale(NamedTuple):
+    name: str                 # 規模の名前（結果の識別用）
+    participants: int         # 参加者数
+    prizes: int               # 景品数
+    heavy_group_ratio: float  # 最大の景品グループ（同じ景品名・提供元）に含まれる景品の割合
+    connpass_cancel_ratio: float # Connpass上「参加キャンセル」の参加者の割合
+    cancel_ratio: float       # 当日不参加（cancels.txt）の参加者の割合
+    winner_ratio: float       # 抽選済み（winners.csvに記録済み）の景品の割合
+    weighted_ratio: float     # 抽選重みが1以外の参加者の割合
+
+
+# 既定の規模（1k～1M行）
+SCALES: dict[str, Scale] = {
+    '1k': Scale('1k', 1_000, 200, 0.3, 0.05, 0.03, 0.5, 0.1),
+    '10k': Scale('10k', 10_000, 2_000, 0.3, 0.05, 0.03, 0.5, 0.1),
+    '100k': Scale('100k', 100_000, 10_000, 0.4, 0.05, 0.03, 0.5, 0.1),
+    '1m': Scale('1m', 1_000_000, 50_000, 0.5, 0.05, 0.03, 0.5, 0.1),
+}
+
+
+class Dataset(NamedTuple):
+    registration_ids: list[str] # 全参加者の受付番号（CSVの行順）
+    attending_ids: list[str]    # 会場に居る参加者の受付番号（Connpass参加 - 当日不参加）
+    cancel_ids: list[str]       # 当日不参加の受付番号
+    prize_ids: list[str]        # 全景品ID（CSVの行順）
+    winners: list[tuple[str, str]] # 記録済みの当選（景品ID, 受付番号）
+
+
+def parse_scale(value: str) -> Scale:
+    """
+    規模の名前（1k等）又は参加者数を規模に変換する
+    参加者数のみ指定された場合、景品数等は最も近い既定の規模に合わせる
+    """
+    if value in SCALES:
+        return SCALES[value]
+    participants = int(value)
+    base = min(SCALES.values(), key=lambda scale: abs(scale.participants - participants))
+    return base._replace(name=value, participants=participants, prizes=max(1, participants * base.prizes // base.participants))
+
+
+def generate_dataset(directory: str, scale: Scale, seed: int = 0) -> Dataset:
+    """
+    directoryにparts.csv・prizes.csv・cancels.txt・winners.csvを書き出す
+    同じ規模・シードからは常に同じ内容が作成される
+    """
+    rng = Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # 参加者：受付番号は重複しない8桁の数字（CSVの行順は受付番号順ではない）
+    registration_ids = [str(id) for id in rng.sample(range(10_000_000, 100_000_000), scale.participants)]
+    connpass_attending = [rng.random() >= scale.connpass_cancel_ratio for _ in registration_ids]
+    with open(os.path.join(directory, 'parts.csv'), 'wt', newline='', encoding='utf-8') as participants_file:
+        writer = csv.writer(participants_file)
+        writer.writerow(['受付番号', '参加枠名', 'ユーザー名', '表示名', '利用開始日', '参加ステータス', '抽選重み'])
+        for index, (registration_id, attending) in enumerate(zip(registration_ids, connpass_attending)):
+            weight = rng.choice(('0.5', '2', '3')) if rng.random() < scale.weighted_ratio else ''
+            writer.writerow([registration_id, '一般参加枠', f'user{index}', f'参加者{index}さん', '2024-01-01', '参加' if attending else '参加キャンセル', weight])
+
+    # 当日不参加：Connpass上の参加者から選ぶ
+    connpass_attending_ids = [registration_id for registration_id, attending in zip(registration_ids, connpass_attending) if attending]
+    cancel_ids = rng.sample(connpass_attending_ids, int(len(connpass_attending_ids) * scale.cancel_ratio))
+    with open(os.path.join(directory, 'cancels.txt'), 'wt', encoding='utf-8') as cancels_file:
+        cancels_file.write(''.join(f'{registration_id}\n' for registration_id in cancel_ids))
+    cancel_set = set(cancel_ids)
+    attending_ids = [registration_id for registration_id in connpass_attending_ids if registration_id not in cancel_set]
+
+    # 景品：最大のグループにheavy_group_ratioの景品を入れ、残りは1～20個のグループにする
+    prize_ids = [f'{index + 1:07d}' for index in range(scale.prizes)]
+    heavy_group_size = int(scale.prizes * scale.heavy_group_ratio)
+    groups: list[tuple[str, str]] = [('協賛各社', '天キー特製キーキャップ')] * heavy_group_size
+    group_index = 0
+    while len(groups) < scale.prizes:
+        group_size = min(rng.randint(1, 20), scale.prizes - len(groups))
+        groups.extend([(f'提供元{group_index % 50}', f'景品{group_index}')] * group_size)
+        group_index += 1
+    # CSVの行順ではグループが混ざるようにする
+    rng.shuffle(groups)
+    with open(os.path.join(directory, 'prizes.csv'), 'wt', newline='', encoding='utf-8') as prizes_file:
+        writer = csv.writer(prizes_file)
+        writer.writerow(['管理No', '提供元', '景品名'])
+        for prize_id, (provider, display_name) in zip(prize_ids, groups):
+            writer.writerow([prize_id, provider, display_name])
+
+    # 当選者：抽選済みの景品ごとに、会場に居る参加者から1人ずつ（重複なし）
+    winner_count = min(int(scale.prizes * scale.winner_ratio), len(attending_ids))
+    winners = list(zip(rng.sample(prize_ids, winner_count), rng.sample(attending_ids, winner_count)))
+    with open(os.path.join(directory, 'winners.csv'), 'wt', newline='', encoding='utf-8') as winners_file:
+        writer = csv.writer(winners_file)
+        writer.writerow(['景品ID', '当選者受付番号'])
+        writer.writerows(winners)
+
+    return Dataset(registration_ids, attending_ids, cancel_ids, prize_ids, winners)
@@ -0,0 +1,568 @@
+import asyncio
+from collections import deque
+import http.client
+import importlib.util
+import json
+import os
+from random import Random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, NamedTuple
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.datagen import Scale, generate_dataset
+from benchmarks.runner import BACKEND_PACKAGE_PATH, RESULTS_FORMAT_VERSION, git_commit
+
+
+class Profile(NamedTuple):
+    displays: int               # /api/v1/mappingsをポーリングする表示用ブラウザの数
+    display_interval: float     # ポーリング間隔（秒）
+    scanners: int               # 受付で不参加をまとめて登録・取り消すクライアントの数
+    scanner_interval: float     # 送信間隔（秒）
+    scanner_batch_size: int     # 1回に送る受付番号の数
+    controllers: int            # 抽選結果を書き込むステージ操作用クライアントの数
+    controller_interval: float  # 操作間隔（秒）
+
+
+# 既定の負荷（間隔0の場合は応答を受け取り次第次のリクエストを送る）
+PROFILES: dict[str, Profile] = {
+    'event-day': Profile(displays=8, display_interval=1.0, scanners=2, scanner_interval=1.0, scanner_batch_size=5, controllers=1, controller_interval=2.0),
+    'busy': Profile(displays=32, display_interval=0.5, scanners=4, scanner_interval=0.25, scanner_batch_size=10, controllers=1, controller_interval=0.5),
+    'stress': Profile(displays=64, display_interval=0.0, scanners=8, scanner_interval=0.0, scanner_batch_size=20, controllers=2, controller_interval=0.0),
+}
+
+# この時間以上使っていない接続は、サーバーが閉じている可能性があるので接続し直す（送信済みのリクエストを失わないように）
+IDLE_RECONNECT_SECONDS = 1.0
+
+# 1リクエストの応答待ちの上限（秒）
+REQUEST_TIMEOUT_SECONDS = 30.0
+
+
+# === HTTPクライアント ===
+
+class HttpResponse(NamedTuple):
+    status: int
+    headers: dict[str, str] # ヘッダー名は小文字
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode('utf-8'))
+
+
+class HttpConnection:
+    """
+    1つの接続を使い回すHTTP/1.1クライアント（標準ライブラリのみ）
+    仮想クライアント1つにつき1つ作成し、リクエストは1つずつ送る
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.last_used = 0.0
+
+    async def request(self, method: str, path: str, body: bytes = b'', headers: dict[str, str] | None = None) -> HttpResponse:
+        if self.writer is not None and time.monotonic() - self.last_used > IDLE_RECONNECT_SECONDS:
+            await self.close()
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        assert self.reader is not None
+        try:
+            request_lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+            request_lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+            self.writer.write(('\r\n'.join(request_lines) + '\r\n\r\n').encode('latin-1') + body)
+            await self.writer.drain()
+            response = await asyncio.wait_for(self.__read_response(method), REQUEST_TIMEOUT_SECONDS)
+        except BaseException:
+            await self.close()
+            raise
+        self.last_used = time.monotonic()
+        return response
+
+    async def __read_response(self, method: str) -> HttpResponse:
+        assert self.reader is not None
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('応答の前に接続が閉じられました')
+        version, status, *_ = status_line.decode('latin-1').split(' ', 2)
+        headers: dict[str, str] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if method == 'HEAD' or int(status) in (204, 304):
+            body = b''
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            body = b''.join(chunks)
+        else:
+            body = await self.reader.read()
+            keep_alive = False
+
+        if not keep_alive:
+            await self.close()
+        return HttpResponse(int(status), headers, body)
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = None
+        self.writer = None
+
+
+# === 計測 ===
+
+class RouteStats:
+    """
+    ルートごとの応答時間と結果
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    async def call(self, connection: HttpConnection, label: str, method: str, path: str, body: bytes = b'', headers: dict[str, str] | None = None) -> HttpResponse | None:
+        """
+        リクエストを送って応答時間を記録する
+        接続エラー・タイムアウトの場合はNone（サーバーで処理されたかは分からない）
+        """
+        started = time.perf_counter()
+        try:
+            response = await connection.request(method, path, body, headers)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            self.__count(label, type(e).__name__)
+            return None
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        self.__count(label, str(response.status))
+        return response
+
+    def __count(self, label: str, result: str) -> None:
+        statuses = self.statuses.setdefault(label, {})
+        statuses[result] = statuses.get(result, 0) + 1
+
+    def summary(self, elapsed: float) -> list[dict[str, Any]]:
+        summaries = []
+        for label in sorted(self.statuses):
+            latencies = sorted(self.latencies.get(label, []))
+            statuses = self.statuses[label]
+            requests = sum(statuses.values())
+            summaries.append({
+                "route": label,
+                "requests": requests,
+                "errors": sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500),
+                "statuses": statuses,
+                "throughput_rps": requests / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+            })
+        return summaries
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    最近順位法のパーセンタイル（値が無い場合は0）
+    """
+    if len(sorted_values) == 0:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+# === 変更の記録（失われた変更の確認用） ===
+
+class ExpectedState:
+    """
+    成功した変更から、サーバーにあるべき不参加リスト・当選者リストを組み立てる
+    各クライアントは担当する参加者・景品を分けて1つずつ送るので、応答順に適用すれば最終状態が決まる
+    接続エラーの場合はサーバーで処理されたか分からないので、その参加者・景品は確認しない
+    """
+
+    def __init__(self, cancels: list[str], mappings: dict[str, str]):
+        self.cancels: set[str] = set(cancels)
+        self.mappings: dict[str, str] = dict(mappings)
+        self.uncertain_participants: set[str] = set()
+        self.uncertain_prizes: set[str] = set()
+        self.mutations = 0
+
+    def verify(self, actual_cancels: list[str], actual_mappings: dict[str, str]) -> dict[str, Any]:
+        actual_cancel_set = set(actual_cancels)
+        lost_cancels = sorted(id for id in self.cancels - actual_cancel_set if id not in self.uncertain_participants)
+        unexpected_cancels = sorted(id for id in actual_cancel_set - self.cancels if id not in self.uncertain_participants)
+        mismatched_prizes = sorted(
+            prize_id for prize_id in self.mappings.keys() | actual_mappings.keys()
+            if prize_id not in self.uncertain_prizes and self.mappings.get(prize_id) != actual_mappings.get(prize_id)
+        )
+        return {
+            "mutations": self.mutations,
+            "lost_cancels": lost_cancels,
+            "unexpected_cancels": unexpected_cancels,
+            "mismatched_prizes": [
+                {"prize_id": prize_id, "expected": self.mappings.get(prize_id), "actual": actual_mappings.get(prize_id)}
+                for prize_id in mismatched_prizes
+            ],
+            "uncertain": len(self.uncertain_participants) + len(self.uncertain_prizes),
+            "ok": len(lost_cancels) == 0 and len(unexpected_cancels) == 0 and len(mismatched_prizes) == 0,
+        }
+
+
+# === 仮想クライアント ===
+
+async def pace(started: float, interval: float) -> None:
+    """
+    リクエストの開始からinterval秒後まで待つ（既に過ぎている場合はすぐに戻る）
+    """
+    remaining = interval - (time.perf_counter() - started)
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+    else:
+        await asyncio.sleep(0)
+
+
+async def run_display(host: str, port: int, stats: RouteStats, profile: Profile, deadline: float, rng: Random) -> None:
+    """
+    表示用ブラウザ：ETag付きで/api/v1/mappingsをポーリングする（変更がなければ304）
+    """
+    connection = HttpConnection(host, port)
+    # 全ての表示が同時にポーリングしないようにずらす
+    await asyncio.sleep(rng.random() * profile.display_interval)
+    etag: str | None = None
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        headers = {'Accept-Encoding': 'gzip'}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        response = await stats.call(connection, 'GET /api/v1/mappings', 'GET', '/api/v1/mappings', headers=headers)
+        if response is not None and response.status == 200:
+            etag = response.headers.get('etag')
+        await pace(started, profile.display_interval)
+    await connection.close()
+
+
+async def run_scanner(host: str, port: int, stats: RouteStats, profile: Profile, deadline: float, rng: Random, expected: ExpectedState, participant_ids: list[str]) -> None:
+    """
+    受付：担当する参加者を不参加としてまとめて登録し、4回に1回は以前の登録を取り消す
+    """
+    connection = HttpConnection(host, port)
+    available = deque(participant_ids)
+    registered: deque[list[str]] = deque()
+    operation = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if len(registered) > 0 and (operation % 4 == 3 or len(available) == 0):
+            batch = registered.popleft()
+            method, applied = 'DELETE', False
+        elif len(available) > 0:
+            batch = [available.popleft() for _ in range(min(profile.scanner_batch_size, len(available)))]
+            method, applied = 'PUT', True
+        else:
+            break
+        response = await stats.call(
+            connection, f'{method} /api/v1/participants/cancels/edit', method, '/api/v1/participants/cancels/edit',
+            json.dumps(batch).encode('utf-8'), {'Content-Type': 'application/json'}
+        )
+        if response is None:
+            expected.uncertain_participants.update(batch)
+        elif response.status == 200:
+            expected.mutations += 1
+            if applied:
+                expected.cancels.update(batch)
+                registered.append(batch)
+            else:
+                expected.cancels.difference_update(batch)
+                available.extend(batch)
+        operation += 1
+        await pace(started, profile.scanner_interval)
+    await connection.close()
+
+
+async def run_controller(host: str, port: int, stats: RouteStats, profile: Profile, deadline: float, rng: Random, expected: ExpectedState, prize_ids: list[str], participant_ids: list[str]) -> None:
+    """
+    ステージ操作：担当する景品について、手動での当選記録・サーバー側抽選・上書き・取り消しを繰り返す
+    """
+    connection = HttpConnection(host, port)
+    form_headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    unraffled = deque(prize_ids)
+    raffled: list[str] = []
+    operation = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        step = operation % 4
+        if len(unraffled) == 0 or (step >= 2 and len(raffled) > 0):
+            if len(raffled) == 0:
+                break
+            prize_id = rng.choice(raffled)
+            if step == 3:
+                # 抽選の取り消し
+                response = await stats.call(connection, 'DELETE /api/v1/raffle', 'DELETE', '/api/v1/raffle', urlencode({'prize_id': prize_id}).encode('ascii'), form_headers)
+                winner_id = None
+            else:
+                # 当選者の上書き
+                winner_id = rng.choice(participant_ids)
+                response = await stats.call(connection, 'PUT /api/v1/raffle', 'PUT', '/api/v1/raffle', urlencode({'prize_id': prize_id, 'winner_id': winner_id}).encode('ascii'), form_headers)
+        else:
+            prize_id = unraffled.popleft()
+            if step == 0:
+                # 手動での当選記録
+                winner_id = rng.choice(participant_ids)
+                response = await stats.call(connection, 'POST /api/v1/raffle', 'POST', '/api/v1/raffle', urlencode({'prize_id': prize_id, 'winner_id': winner_id}).encode('ascii'), form_headers)
+            else:
+                # サーバー側抽選
+                response = await stats.call(connection, 'POST /api/v1/raffle/draw', 'POST', '/api/v1/raffle/draw', urlencode({'prize_id': prize_id}).encode('ascii'), form_headers)
+                winner_id = response.json()['winner_id'] if response is not None and response.status == 200 else None
+
+        if response is None:
+            expected.uncertain_prizes.add(prize_id)
+        elif response.status == 200:
+            expected.mutations += 1
+            if winner_id is None:
+                expected.mappings.pop(prize_id, None)
+                raffled.remove(prize_id)
+                unraffled.append(prize_id)
+            else:
+                expected.mappings[prize_id] = winner_id
+                if prize_id not in raffled:
+                    raffled.append(prize_id)
+        elif prize_id not in raffled and prize_id not in expected.mappings:
+            unraffled.append(prize_id)
+        operation += 1
+        await pace(started, profile.controller_interval)
+    await connection.close()
+
+
+# === サーバーの状態の取得 ===
+
+async def fetch_state(host: str, port: int) -> tuple[list[str], list[str], dict[str, str], list[str]]:
+    """
+    会場に居る参加者・不参加リスト・当選者リスト・全景品IDを取得する
+    """
+    connection = HttpConnection(host, port)
+    attending_ids: list[str] = []
+    cursor: str | None = None
+    while True:
+        path = '/api/v1/participants?filter=attending&fields=registration_id&limit=1000' + (f'&cursor={cursor}' if cursor else '')
+        page = (await connection.request('GET', path)).json()
+        attending_ids += [participant['registration_id'] for participant in page['participants']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    cancels = (await connection.request('GET', '/api/v1/participants/cancels/all')).json()
+    mappings = {mapping['prize_id']: mapping['winner_id'] for mapping in (await connection.request('GET', '/api/v1/mappings')).json() if mapping['winner_id'] is not None}
+    prize_ids = [prize['id'] for prize in (await connection.request('GET', '/api/v1/prizes')).json()]
+    await connection.close()
+    return attending_ids, cancels, mappings, prize_ids
+
+
+async def verify_state(host: str, port: int, expected: ExpectedState, checks: int) -> list[dict[str, Any]]:
+    """
+    新しい接続で最終状態を取得して確認する（複数のworkerで動いている場合に備えて複数回）
+    """
+    results = []
+    for _ in range(checks):
+        _, cancels, mappings, _ = await fetch_state(host, port)
+        results.append(expected.verify(cancels, mappings))
+    return results
+
+
+# === 負荷の実行 ===
+
+async def run_load(host: str, port: int, profile: Profile, duration: float, seed: int, checks: int) -> dict[str, Any]:
+    rng = Random(seed)
+    attending_ids, cancels, mappings, prize_ids = await fetch_state(host, port)
+    expected = ExpectedState(cancels, mappings)
+
+    # 受付・ステージ操作が担当する参加者・景品を分ける（同じ対象を同時に変更しないように）
+    cancel_set = set(cancels)
+    available_ids = [id for id in attending_ids if id not in cancel_set]
+    rng.shuffle(available_ids)
+    unraffled_prize_ids = [prize_id for prize_id in prize_ids if prize_id not in mappings]
+    rng.shuffle(unraffled_prize_ids)
+
+    stats = RouteStats()
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    clients = [run_display(host, port, stats, profile, deadline, Random(rng.random())) for _ in range(profile.displays)]
+    clients += [
+        run_scanner(host, port, stats, profile, deadline, Random(rng.random()), expected, available_ids[index::profile.scanners])
+        for index in range(profile.scanners)
+    ]
+    clients += [
+        run_controller(host, port, stats, profile, deadline, Random(rng.random()), expected, unraffled_prize_ids[index::profile.controllers], attending_ids)
+        for index in range(profile.controllers)
+    ]
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed_s": elapsed,
+        "routes": stats.summary(elapsed),
+        "total_requests": sum(sum(statuses.values()) for statuses in stats.statuses.values()),
+        "expected": expected,
+        "verification": await verify_state(host, port, expected, checks),
+    }
+
+
+# === バックエンドの起動 ===
+
+class LocalBackend:
+    """
+    一時ディレクトリの合成データでバックエンドを起動する
+    gunicornがあればDockerfileと同じくworker・スレッドを複数にして起動し、無ければFlaskの開発サーバーで起動する
+    """
+
+    def __init__(self, scale: Scale, seed: int, workers: int, threads: int, storage: str):
+        self.workdir = tempfile.mkdtemp(prefix='raffle-loadtest-')
+        self.port = find_free_port()
+        self.workers = workers
+        self.threads = threads
+        self.storage = storage
+        self.process: subprocess.Popen | None = None
+        self.log_filepath = os.path.join(self.workdir, 'backend.log')
+        generate_dataset(os.path.join(self.workdir, 'data'), scale, seed)
+
+    def start(self) -> None:
+        # settings.pyは変更せず、起動前に保存先のみ差し替える
+        # （gunicornのworkerは設定を読み込んだ後のプロセスからforkされるので、差し替えが引き継がれる）
+        script = f'import settings\nsettings.STORAGE_BACKEND = {self.storage!r}\n'
+        if importlib.util.find_spec('gunicorn') is not None:
+            argv = ['gunicorn', '--bind', f'127.0.0.1:{self.port}', '--workers', str(self.workers), '--threads', str(self.threads), '--keep-alive', '75', 'app:flask_app']
+            script += f'import sys\nfrom gunicorn.app.wsgiapp import run\nsys.argv = {argv!r}\nrun()\n'
+        else:
+            script += f'from app import flask_app\nflask_app.run(host="127.0.0.1", port={self.port}, threaded=True)\n'
+        environment = dict(os.environ, PYTHONPATH=BACKEND_PACKAGE_PATH)
+        with open(self.log_filepath, 'ab') as log_file:
+            self.process = subprocess.Popen([sys.executable, '-c', script], cwd=self.workdir, env=environment, stdout=log_file, stderr=subprocess.STDOUT)
+        self.wait_until_ready()
+
+    def wait_until_ready(self, timeout: float = 300.0) -> None:
+        """
+        /api/v1/readyで既存データの読み込みが終わるまで待つ
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                raise RuntimeError(f'バックエンドが終了しました（{self.log_filepath}）')
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=timeout)
+                connection.request('POST', '/api/v1/ready')
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status == 200:
+                    return
+                if response.status == 503:
+                    raise RuntimeError(f'バックエンドが既存データを読み込めませんでした（{self.log_filepath}）')
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f'バックエンドが起動しませんでした（{self.log_filepath}）')
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def cleanup(self) -> None:
+        self.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def run_loadtest(profile_name: str, profile: Profile, duration: float, seed: int, url: str | None, scale: Scale, workers: int, threads: int, storage: str, restart_check: bool) -> dict[str, Any]:
+    """
+    負荷をかけて結果を返す
+    urlを指定しない場合は合成データでバックエンドを起動し、終了後に再起動しても変更が残っているかも確認する
+    """
+    backend: LocalBackend | None = None
+    if url is None:
+        backend = LocalBackend(scale, seed, workers, threads, storage)
+        print(f'バックエンドを起動中...（{backend.workdir}）', file=sys.stderr)
+        backend.start()
+        host, port = '127.0.0.1', backend.port
+    else:
+        parsed_url = urlsplit(url)
+        host, port = parsed_url.hostname or '127.0.0.1', parsed_url.port or 80
+    try:
+        print(f'{duration}秒間、負荷（{profile_name}）をかけています...', file=sys.stderr)
+        checks = max(1, workers * 2) if backend is not None else 4
+        result = asyncio.run(run_load(host, port, profile, duration, seed, checks))
+        expected: ExpectedState = result.pop("expected")
+        if backend is not None and restart_check:
+            # 書き込みが保存先に残っているか（再起動後に同じ状態になるか）
+            backend.stop()
+            backend.start()
+            result["verification_after_restart"] = asyncio.run(verify_state(host, port, expected, 1))
+    finally:
+        if backend is not None:
+            backend.cleanup()
+
+    result.update({
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "git_commit": git_commit(),
+        "profile": profile_name,
+        "profile_settings": profile._asdict(),
+        "duration_s": duration,
+        "seed": seed,
+        "backend": url or {"scale": scale._asdict(), "workers": workers, "threads": threads, "storage": storage},
+    })
+    result["ok"] = all(check["ok"] for check in result["verification"] + result.get("verification_after_restart", []))
+    return result
+
+
+def format_loadtest(result: dict[str, Any]) -> list[str]:
+    """
+    ルートごとの結果と変更の確認結果を表にする
+    """
+    lines = [f'{"ルート":<44} {"件数":>7} {"エラー":>6} {"req/s":>9} {"p50(ms)":>9} {"p95(ms)":>9} {"p99(ms)":>9} {"最大(ms)":>9}']
+    for route in result["routes"]:
+        lines.append(
+            f'{route["route"]:<44} {route["requests"]:>7} {route["errors"]:>6} {route["throughput_rps"]:>9.1f} '
+            f'{route["p50_ms"]:>9.2f} {route["p95_ms"]:>9.2f} {route["p99_ms"]:>9.2f} {route["max_ms"]:>9.2f}'
+        )
+    lines.append(f'合計 {result["total_requests"]}件 / {result["elapsed_s"]:.1f}秒（{result["total_requests"] / result["elapsed_s"]:.1f} req/s）')
+    for title, checks in (('負荷終了後', result["verification"]), ('再起動後', result.get("verification_after_restart", []))):
+        if len(checks) == 0:
+            continue
+        # 不一致があった確認を優先して表示する
+        failed_checks = [check for check in checks if not check["ok"]]
+        check = failed_checks[0] if failed_checks else checks[0]
+        lines.append(
+            f'{title}（{len(checks)}回確認・不一致{len(failed_checks)}回）：変更{check["mutations"]}件 / 失われた不参加{len(check["lost_cancels"])}件'
+            f'・想定外の不参加{len(check["unexpected_cancels"])}件・当選の不一致{len(check["mismatched_prizes"])}件（接続エラーで未確認{check["uncertain"]}件）'
+        )
+    lines.append('変更は全て反映されています' if result["ok"] else '失われた変更があります')
+    return lines
@@ -0,0 +1,483 @@
+from contextlib import contextmanager
+import csv
+import importlib
+import io
+import json
+import os
+from pathlib import Path
+from random import Random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Iterator
+
+from benchmarks.datagen import Dataset, Scale, generate_dataset
+
+
+# 結果のJSONの形式のバージョン（項目を変えた場合は上げる）
+RESULTS_FORMAT_VERSION = 1
+
+# バックエンドのパッケージ（モジュールはこのディレクトリからの相対importで読み込まれる）
+BACKEND_PACKAGE_PATH = str(Path(__file__).resolve().parent.parent / 'tenkey_raffle_backend')
+
+# 一括操作（受付・当選の複数件指定）の件数
+BATCH_SIZE = 100
+
+
+class Recorder:
+    """
+    計測結果を（グループ, 名前）ごとに集める
+    """
+
+    def __init__(self):
+        self.samples: dict[tuple[str, str], list[float]] = {}
+
+    @contextmanager
+    def sample(self, group: str, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        yield
+        self.add(group, name, time.perf_counter() - started)
+
+    def add(self, group: str, name: str, seconds: float) -> None:
+        self.samples.setdefault((group, name), []).append(seconds)
+
+    def repeat(self, group: str, name: str, count: int, operation: Callable[[], Any]) -> None:
+        for _ in range(count):
+            with self.sample(group, name):
+                operation()
+
+    def results(self, scale: Scale) -> list[dict[str, Any]]:
+        return [
+            {
+                "scale": scale.name,
+                "group": group,
+                "name": name,
+                "count": len(samples),
+                "min_s": min(samples),
+                "median_s": statistics.median(samples),
+                "mean_s": statistics.fmean(samples),
+                "max_s": max(samples),
+            }
+            for (group, name), samples in self.samples.items()
+        ]
+
+
+# === 1つの規模の計測（新しいプロセスで実行する） ===
+
+def run_scale(scale: Scale, repeat: int, bulk_repeat: int, storage: str, seed: int) -> dict[str, Any]:
+    """
+    一時ディレクトリに合成データを作成し、バックエンドを起動して全項目を計測する
+    管理クラスはSingletonなので、規模ごとに新しいプロセスで呼ぶこと（run_worker()）
+    """
+    workdir = tempfile.mkdtemp(prefix='raffle-bench-')
+    try:
+        os.chdir(workdir)
+        recorder = Recorder()
+        started = time.perf_counter()
+        dataset = generate_dataset('data', scale, seed)
+        generate_seconds = time.perf_counter() - started
+
+        # settings.DATA_PATH（./data）は作業ディレクトリからの相対パス
+        sys.path.insert(0, BACKEND_PACKAGE_PATH)
+        settings = importlib.import_module('settings')
+        settings.STORAGE_BACKEND = storage
+        # 起動時の読み込みは計測のため明示的に行う
+        settings.WARM_UP_ON_BOOT = False
+        # アップロードの上限を規模に合わせる（1M行のCSVは既定の上限を超える）
+        settings.MAX_CSV_ROWS = max(settings.MAX_CSV_ROWS, scale.participants, scale.prizes)
+        settings.MAX_UPLOAD_BYTES = max(settings.MAX_UPLOAD_BYTES, 2 * os.path.getsize('data/parts.csv'))
+
+        bench_parsers(recorder, dataset, bulk_repeat)
+        flask_app = bench_startup(recorder)
+        bench_managers(recorder, dataset, repeat, bulk_repeat, seed)
+        bench_routes(recorder, flask_app, dataset, repeat, bulk_repeat, seed)
+
+        return {
+            "scale": scale._asdict(),
+            "generate_seconds": generate_seconds,
+            "results": recorder.results(scale),
+        }
+    finally:
+        os.chdir(tempfile.gettempdir())
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_parsers(recorder: Recorder, dataset: Dataset, count: int) -> None:
+    """
+    parse_*_csv（ファイルの読み込みを含む）
+    """
+    CsvParser = importlib.import_module('services.CsvParser')
+
+    def parse(filepath: str, parser: Callable[[csv.DictReader], dict[str, Any]]) -> dict[str, Any]:
+        with open(filepath, 'rt', newline='', encoding='utf-8') as csv_file:
+            parsed = parser(csv.DictReader(csv_file))
+        if parsed['error']:
+            raise RuntimeError(parsed['error'])
+        return parsed
+
+    for _ in range(count):
+        with recorder.sample('parse', 'parse_participants_csv'):
+            participants = parse('data/parts.csv', CsvParser.parse_participants_csv)['participants']
+        with recorder.sample('parse', 'parse_prizes_csv'):
+            prizes = parse('data/prizes.csv', CsvParser.parse_prizes_csv)['prizes']
+        with recorder.sample('parse', 'parse_winners_csv'):
+            parse('data/winners.csv', lambda reader: CsvParser.parse_winners_csv(reader, participants, prizes))
+
+
+def bench_startup(recorder: Recorder) -> Any:
+    """
+    app.pyの読み込みと既存データの読み込み（起動の各段階はStartupTimerの記録）
+    """
+    with recorder.sample('startup', 'import app'):
+        app = importlib.import_module('app')
+    with recorder.sample('startup', 'warm up'):
+        if not app.startup_manager.wait_until_ready():
+            raise RuntimeError(app.startup_manager.error)
+    StartupTimer = importlib.import_module('util.StartupTimer').StartupTimer
+    for phase, seconds in StartupTimer().phase_seconds.items():
+        recorder.add('startup', f'phase {phase}', seconds)
+    return app.flask_app
+
+
+def bench_managers(recorder: Recorder, dataset: Dataset, count: int, bulk_count: int, seed: int) -> None:
+    """
+    管理クラスの全操作
+    変更する操作は元に戻す操作と組にして、データの規模を保つ
+    """
+    ParticipantsManager = importlib.import_module('services.ParticipantsManager').ParticipantsManager
+    PrizesManager = importlib.import_module('services.PrizesManager').PrizesManager
+    RaffleManager = importlib.import_module('services.RaffleManager').RaffleManager
+    DrawManager = importlib.import_module('services.DrawManager').DrawManager
+    SharedState = importlib.import_module('util.SharedState').SharedState
+    create_draw_rng = importlib.import_module('util.SeedableCsprng').create_draw_rng
+    RaffleDatatypes = importlib.import_module('typedefs.RaffleDatatypes')
+    ParticipantFilter, WinnerMapping = RaffleDatatypes.ParticipantFilter, RaffleDatatypes.WinnerMapping
+
+    participants_manager = ParticipantsManager()
+    prizes_manager = PrizesManager()
+    raffle_manager = RaffleManager()
+    draw_manager = DrawManager()
+    shared_state = SharedState()
+    picker = Picker(dataset, raffle_manager, seed)
+    heavy_prize_id = picker.heavy_prize_id(prizes_manager)
+    heavy_group_key = prizes_manager.get_prize_group_key(heavy_prize_id)
+    participant_id = dataset.registration_ids[len(dataset.registration_ids) // 2]
+    winner_id = dataset.winners[0][1] if dataset.winners else participant_id
+    middle_cursor = dataset.registration_ids[len(dataset.registration_ids) // 2]
+
+    def group(name: str) -> Callable[[str, Callable[[], Any]], None]:
+        return lambda operation, call: recorder.repeat('manager', f'{name}.{operation}', count, call)
+
+    # --- 読み込みのみの操作 ---
+    participants = group('ParticipantsManager')
+    participants('get_version', participants_manager.get_version)
+    participants('get_all_participants', participants_manager.get_all_participants)
+    participants('get_all_participant_ids', participants_manager.get_all_participant_ids)
+    participants('get_participant_by_id', lambda: participants_manager.get_participant_by_id(participant_id))
+    participants('participant_exists', lambda: participants_manager.participant_exists(participant_id))
+    participants('get_attending_participants', participants_manager.get_attending_participants)
+    participants('get_unwon_attending_participants', participants_manager.get_unwon_attending_participants)
+    participants('get_weighted_attending_participants', participants_manager.get_weighted_attending_participants)
+    participants('get_weighted_unwon_attending_participants', participants_manager.get_weighted_unwon_attending_participants)
+    for filter in ParticipantFilter:
+        participants(f'get_participants_page({filter})', lambda filter=filter: participants_manager.get_participants_page(filter, None, 100))
+    participants('get_participants_page(cursor)', lambda: participants_manager.get_participants_page(ParticipantFilter.ALL, middle_cursor, 100))
+    participants('get_all_cancel_ids', participants_manager.get_all_cancel_ids)
+    participants('get_cancel_changes_since', lambda: participants_manager.get_cancel_changes_since(participants_manager.get_version()))
+
+    prizes = group('PrizesManager')
+    prizes('get_version', prizes_manager.get_version)
+    prizes('get_all_prizes', prizes_manager.get_all_prizes)
+    prizes('get_all_prize_ids', prizes_manager.get_all_prize_ids)
+    prizes('get_prize_by_id', lambda: prizes_manager.get_prize_by_id(heavy_prize_id))
+    prizes('prize_exists', lambda: prizes_manager.prize_exists(heavy_prize_id))
+    prizes('get_prize_group', lambda: prizes_manager.get_prize_group(heavy_prize_id))
+    prizes('get_prize_group_key', lambda: prizes_manager.get_prize_group_key(heavy_prize_id))
+    prizes('get_prize_ids_in_group', lambda: prizes_manager.get_prize_ids_in_group(heavy_group_key))
+    prizes('get_all_prize_groups', prizes_manager.get_all_prize_groups)
+
+    raffle = group('RaffleManager')
+    raffle('get_version', raffle_manager.get_version)
+    raffle('get_winner_changes_since', lambda: raffle_manager.get_winner_changes_since(raffle_manager.get_version()))
+    raffle('get_prize_winner_mappings', raffle_manager.get_prize_winner_mappings)
+    raffle('has_winner_mappings', raffle_manager.has_winner_mappings)
+    raffle('get_winner_for_prize', lambda: raffle_manager.get_winner_for_prize(heavy_prize_id))
+    raffle('get_prizes_for_winner', lambda: raffle_manager.get_prizes_for_winner(winner_id))
+    raffle('get_unraffled_prize_ids', raffle_manager.get_unraffled_prize_ids)
+    raffle('get_remaining_prizes_in_group', lambda: raffle_manager.get_remaining_prizes_in_group(heavy_prize_id))
+    raffle('get_remaining_count_in_group', lambda: raffle_manager.get_remaining_count_in_group(heavy_prize_id))
+    raffle('get_prize_groups_progress', raffle_manager.get_prize_groups_progress)
+
+    draw = group('DrawManager')
+    for exclude_prior_winners in (True, False):
+        # 抽選対象の取得はexclusive()の中で呼ぶ
+        draw(f'get_eligible_pool({exclude_prior_winners})', lambda exclude=exclude_prior_winners: exclusive_call(shared_state, lambda: draw_manager.get_eligible_pool(exclude)))
+        draw(f'get_eligible_weighted_pool({exclude_prior_winners})', lambda exclude=exclude_prior_winners: exclusive_call(shared_state, lambda: draw_manager.get_eligible_weighted_pool(exclude)))
+    draw('create_draw_rng', lambda: create_draw_rng(str(seed)))
+
+    # --- 変更する操作（元に戻す操作と組） ---
+    for _ in range(count):
+        cancel_id = picker.attending_id()
+        with recorder.sample('manager', 'ParticipantsManager.add_cancel'):
+            participants_manager.add_cancel(cancel_id)
+        with recorder.sample('manager', 'ParticipantsManager.remove_cancel'):
+            participants_manager.remove_cancel(cancel_id)
+
+        cancel_ids = picker.attending_ids(BATCH_SIZE)
+        with recorder.sample('manager', f'ParticipantsManager.add_cancels({BATCH_SIZE})'):
+            participants_manager.add_cancels(cancel_ids)
+        with recorder.sample('manager', f'ParticipantsManager.remove_cancels({BATCH_SIZE})'):
+            participants_manager.remove_cancels(cancel_ids)
+
+        unwon_id = picker.unwon_id()
+        with recorder.sample('manager', 'ParticipantsManager.mark_prior_winner'):
+            participants_manager.mark_prior_winner(unwon_id)
+        with recorder.sample('manager', 'ParticipantsManager.unmark_prior_winner'):
+            participants_manager.unmark_prior_winner(unwon_id)
+
+        prize_id, unwon_id = picker.unraffled_prize_id(), picker.unwon_id()
+        with recorder.sample('manager', 'RaffleManager.set_winner_for_prize'):
+            raffle_manager.set_winner_for_prize(prize_id, unwon_id, False)
+        with recorder.sample('manager', 'RaffleManager.set_winner_for_prize(overwrite)'):
+            raffle_manager.set_winner_for_prize(prize_id, picker.unwon_id(), True)
+        with recorder.sample('manager', 'RaffleManager.delete_winner_for_prize'):
+            raffle_manager.delete_winner_for_prize(prize_id)
+
+        mappings = [WinnerMapping(participant_id=picker.unwon_id(), prize_id=prize_id) for prize_id in picker.unraffled_prize_ids(BATCH_SIZE)]
+        with recorder.sample('manager', f'RaffleManager.set_winners_for_prizes({len(mappings)})'):
+            raffle_manager.set_winners_for_prizes(mappings)
+        for mapping in mappings:
+            raffle_manager.delete_winner_for_prize(mapping.prize_id)
+
+        for weighted in (False, True):
+            prize_id = picker.unraffled_prize_id()
+            with recorder.sample('manager', f'DrawManager.draw_winner(weighted={weighted})'):
+                draw_manager.draw_winner(prize_id, True, False, weighted)
+            raffle_manager.delete_winner_for_prize(prize_id)
+
+    with recorder.sample('manager', 'ParticipantsManager.reset_prior_winners'):
+        participants_manager.reset_prior_winners([mapping.participant_id for mapping in raffle_manager.get_prize_winner_mappings()])
+
+    # --- 全体を置き換える操作 ---
+    original_mappings = list(raffle_manager.get_prize_winner_mappings())
+    original_participants = list(participants_manager.get_all_participants())
+    original_prizes = list(prizes_manager.get_all_prizes())
+    original_cancels = list(participants_manager.get_all_cancel_ids())
+    for _ in range(bulk_count):
+        for weighted in (False, True):
+            with recorder.sample('manager', f'DrawManager.draw_all_remaining_prizes(weighted={weighted})'):
+                draw_manager.draw_all_remaining_prizes(True, weighted)
+            with recorder.sample('manager', 'RaffleManager.wipe_prize_winner_mappings'):
+                raffle_manager.wipe_prize_winner_mappings()
+            raffle_manager.set_winners_for_prizes(original_mappings)
+
+        with shared_state.exclusive():
+            # 他のプロセスの変更を読み込み直す場合（SharedStateから呼ばれる）
+            with recorder.sample('manager', 'ParticipantsManager.reload_participants'):
+                participants_manager.reload_participants(shared_state.get_generation('participants'))
+            with recorder.sample('manager', 'ParticipantsManager.reload_cancels'):
+                participants_manager.reload_cancels(shared_state.get_generation('cancels'))
+            with recorder.sample('manager', 'PrizesManager.reload_prizes'):
+                prizes_manager.reload_prizes(shared_state.get_generation('prizes'))
+            with recorder.sample('manager', 'RaffleManager.reload_winners'):
+                raffle_manager.reload_winners(shared_state.get_generation('winners'))
+
+        with recorder.sample('manager', 'ParticipantsManager.wipe_cancels'):
+            participants_manager.wipe_cancels()
+        with recorder.sample('manager', 'ParticipantsManager.add_cancels(all)'):
+            participants_manager.add_cancels(original_cancels)
+
+        # 参加者・景品リストの置き換えは当選者が居ない状態で行う（APIと同じ）
+        raffle_manager.wipe_prize_winner_mappings()
+        with recorder.sample('manager', 'ParticipantsManager.wipe_participants_list'):
+            participants_manager.wipe_participants_list()
+        with recorder.sample('manager', 'ParticipantsManager.import_new_participants_list'):
+            participants_manager.import_new_participants_list(original_participants)
+        with recorder.sample('manager', 'PrizesManager.wipe_prizes_list'):
+            prizes_manager.wipe_prizes_list()
+        with recorder.sample('manager', 'PrizesManager.import_new_prizes_list'):
+            prizes_manager.import_new_prizes_list(original_prizes)
+        with recorder.sample('manager', 'RaffleManager.set_winners_for_prizes(all)'):
+            raffle_manager.set_winners_for_prizes(original_mappings)
+
+
+def bench_routes(recorder: Recorder, flask_app: Any, dataset: Dataset, count: int, bulk_count: int, seed: int) -> None:
+    """
+    全APIルート（Flaskのテストクライアント経由）
+    GET /api/v1/eventsは接続を維持するストリームのため対象外
+    """
+    RaffleManager = importlib.import_module('services.RaffleManager').RaffleManager
+    raffle_manager = RaffleManager()
+    picker = Picker(dataset, raffle_manager, seed + 1)
+    client = flask_app.test_client()
+    middle_cursor = dataset.registration_ids[len(dataset.registration_ids) // 2]
+    with open('data/parts.csv', 'rb') as participants_file:
+        participants_csv = participants_file.read()
+    with open('data/prizes.csv', 'rb') as prizes_file:
+        prizes_csv = prizes_file.read()
+
+    def call(method: str, path: str, expected: tuple[int, ...] = (200, 201), label: str | None = None, **kwargs: Any) -> Any:
+        with recorder.sample('route', label or f'{method} {path}'):
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+        if response.status_code not in expected:
+            raise RuntimeError(f'{method} {path}: {response.status_code} {response.get_data(as_text=True)[:200]}')
+        return response
+
+    def restore_winners(mappings: list[Any]) -> None:
+        raffle_manager.wipe_prize_winner_mappings()
+        raffle_manager.set_winners_for_prizes(mappings)
+
+    # --- 読み込みのみのルート ---
+    for _ in range(count):
+        call('GET', '/api/v1/health')
+        call('GET', '/api/v1/ready')
+        etag = call('GET', '/api/v1/participants').headers['ETag']
+        call('GET', '/api/v1/participants', expected=(304,), label='GET /api/v1/participants (304)', headers={'If-None-Match': etag})
+        call('GET', '/api/v1/participants?limit=100')
+        call('GET', '/api/v1/participants?limit=1000&fields=registration_id')
+        call('GET', '/api/v1/participants?filter=winners&limit=1000')
+        call('GET', f'/api/v1/participants?cursor={middle_cursor}&limit=100', label='GET /api/v1/participants?cursor=')
+        version = call('GET', '/api/v1/participants/cancels/all?since=', label='GET /api/v1/participants/cancels/all?since= (full)').get_json()['version']
+        call('GET', f'/api/v1/participants/cancels/all?since={version}', label='GET /api/v1/participants/cancels/all?since=')
+        call('GET', '/api/v1/participants/cancels/all')
+        call('GET', '/api/v1/prizes')
+        call('GET', '/api/v1/prizes/groups')
+        etag = call('GET', '/api/v1/mappings').headers['ETag']
+        call('GET', '/api/v1/mappings', expected=(304,), label='GET /api/v1/mappings (304)', headers={'If-None-Match': etag})
+        version = call('GET', '/api/v1/mappings?since=', label='GET /api/v1/mappings?since= (full)').get_json()['version']
+        call('GET', f'/api/v1/mappings?since={version}', label='GET /api/v1/mappings?since=')
+
+    # --- 変更するルート（元に戻す操作と組） ---
+    for _ in range(count):
+        cancel_ids = picker.attending_ids(10)
+        call('PUT', '/api/v1/participants/cancels/edit', json=cancel_ids)
+        call('DELETE', '/api/v1/participants/cancels/edit', json=cancel_ids)
+
+        prize_id = picker.unraffled_prize_id()
+        call('POST', '/api/v1/raffle', data={'prize_id': prize_id, 'winner_id': picker.unwon_id()})
+        call('PUT', '/api/v1/raffle', data={'prize_id': prize_id, 'winner_id': picker.unwon_id()})
+        call('DELETE', '/api/v1/raffle', data={'prize_id': prize_id})
+
+        for weighted in (False, True):
+            prize_id = picker.unraffled_prize_id()
+            data = {'prize_id': prize_id, 'weighted': 'y'} if weighted else {'prize_id': prize_id}
+            call('POST', '/api/v1/raffle/draw', label=f'POST /api/v1/raffle/draw (weighted={weighted})', data=data)
+            raffle_manager.delete_winner_for_prize(prize_id)
+
+    # --- 全体を置き換えるルート ---
+    original_mappings = list(raffle_manager.get_prize_winner_mappings())
+    original_cancels = list(dataset.cancel_ids)
+    for _ in range(bulk_count):
+        call('POST', '/api/v1/raffle/draw/all')
+        call('DELETE', '/api/v1/mappings')
+        restore_winners(original_mappings)
+
+        call('DELETE', '/api/v1/participants/cancels/all')
+        call('PUT', '/api/v1/participants/cancels/edit', label='PUT /api/v1/participants/cancels/edit (all)', json=original_cancels)
+
+        # 参加者・景品リストの置き換えは当選者が居ない状態で行う
+        raffle_manager.wipe_prize_winner_mappings()
+        call('DELETE', '/api/v1/participants')
+        call('PUT', '/api/v1/participants', data={'csv': (io.BytesIO(participants_csv), 'parts.csv')})
+        call('DELETE', '/api/v1/prizes')
+        call('PUT', '/api/v1/prizes', data={'csv': (io.BytesIO(prizes_csv), 'prizes.csv')})
+        restore_winners(original_mappings)
+
+
+def exclusive_call(shared_state: Any, operation: Callable[[], Any]) -> Any:
+    with shared_state.exclusive():
+        return operation()
+
+
+class Picker:
+    """
+    変更する操作の対象（参加者・景品）を再現可能な順序で選ぶ
+    """
+
+    def __init__(self, dataset: Dataset, raffle_manager: Any, seed: int):
+        self.dataset = dataset
+        self.raffle_manager = raffle_manager
+        self.rng = Random(seed)
+
+    def attending_id(self) -> str:
+        return self.rng.choice(self.dataset.attending_ids)
+
+    def attending_ids(self, count: int) -> list[str]:
+        return self.rng.sample(self.dataset.attending_ids, min(count, len(self.dataset.attending_ids)))
+
+    def unwon_id(self) -> str:
+        """
+        まだ何も当選していない会場の参加者
+        """
+        while True:
+            id = self.attending_id()
+            if len(self.raffle_manager.get_prizes_for_winner(id)) == 0:
+                return id
+
+    def unraffled_prize_id(self) -> str:
+        return self.rng.choice(self.raffle_manager.get_unraffled_prize_ids())
+
+    def unraffled_prize_ids(self, count: int) -> list[str]:
+        unraffled_prize_ids = self.raffle_manager.get_unraffled_prize_ids()
+        return self.rng.sample(unraffled_prize_ids, min(count, len(unraffled_prize_ids)))
+
+    def heavy_prize_id(self, prizes_manager: Any) -> str:
+        """
+        最大の景品グループに含まれる景品
+        """
+        return max(prizes_manager.get_all_prize_groups(), key=lambda group: len(group.prize_ids)).prize_ids[0]
+
+
+# === 規模ごとのプロセスの起動と結果の集計 ===
+
+def run_worker(scale: Scale, repeat: int, bulk_repeat: int, storage: str, seed: int, verbose: bool) -> dict[str, Any]:
+    """
+    新しいプロセスでrun_scale()を実行し、結果をファイル経由で受け取る
+    バックエンドの出力（読み込みのログ等）はverboseの場合のみ表示する
+    """
+    with tempfile.TemporaryDirectory(prefix='raffle-bench-result-') as result_directory:
+        result_filepath = os.path.join(result_directory, 'result.json')
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks', 'worker', result_filepath, json.dumps({
+                "scale": scale._asdict(), "repeat": repeat, "bulk_repeat": bulk_repeat, "storage": storage, "seed": seed
+            })],
+            cwd=str(Path(__file__).resolve().parent.parent),
+            stdout=None if verbose else subprocess.DEVNULL,
+            check=True,
+        )
+        with open(result_filepath, 'rt', encoding='utf-8') as result_file:
+            return json.load(result_file)
+
+
+def run_benchmarks(scales: list[Scale], repeat: int, bulk_repeat: int, storage: str, seed: int, verbose: bool = False) -> dict[str, Any]:
+    """
+    全ての規模を計測し、比較用のメタデータと共に返す
+    """
+    runs = []
+    for scale in scales:
+        print(f'{scale.name}（参加者{scale.participants}人・景品{scale.prizes}個）を計測中...', file=sys.stderr)
+        runs.append(run_worker(scale, repeat, bulk_repeat, storage, seed, verbose))
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "storage": storage,
+        "repeat": repeat,
+        "bulk_repeat": bulk_repeat,
+        "seed": seed,
+        "scales": [run["scale"] for run in runs],
+        "results": [result for run in runs for result in run["results"]],
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_PACKAGE_PATH, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
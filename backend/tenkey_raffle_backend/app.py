@@ -1,23 +1,79 @@
+import time
+# モジュールの読み込みの所要時間を記録する
+import_started = time.perf_counter()
+
+from contextlib import ExitStack
 from pathlib import Path
 
 from flask_cors import CORS
-from settings import DATA_PATH
+from settings import DATA_PATH, MAX_UPLOAD_BYTES, WARM_UP_ON_BOOT
 
 Path(DATA_PATH).mkdir(parents=True, exist_ok=True)
 
 
-from flask import Flask
+from flask import Flask, g, jsonify, make_response, request
+from util.SharedState import SharedState
+from util.StartupTimer import StartupTimer
+from services.StartupManager import StartupManager
 from blueprints.Participants import api_v1_participants
 from blueprints.Prizes import api_v1_prizes
 from blueprints.Raffle import api_v1_raffle
+from blueprints.Events import api_v1_events
+from blueprints.Status import api_v1_status
 
 
 flask_app = Flask(__name__)
-CORS(flask_app) # ローカル起動しかしないので全ドメイン許可
+CORS(flask_app, expose_headers=['ETag']) # ローカル起動しかしないので全ドメイン許可
+flask_app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 
 flask_app.register_blueprint(api_v1_participants)
 flask_app.register_blueprint(api_v1_prizes)
 flask_app.register_blueprint(api_v1_raffle)
+flask_app.register_blueprint(api_v1_events)
+flask_app.register_blueprint(api_v1_status)
+
+StartupTimer().record('import', time.perf_counter() - import_started)
+
+shared_state = SharedState()
+startup_manager = StartupManager()
+
+# 他のプロセス（gunicornのworker）が書き込んだ変更を読み込んでから処理する
+# 読み込みのみのリクエストは同時に、書き込みを伴うリクエストは全プロセス・全スレッドで排他して処理する
+# （確認から書き込みまでの間に他が書き込まず、読み込み中に書き換わらないように）
+@flask_app.before_request
+def sync_shared_state():
+    # 死活・準備状態の確認は、既存データの読み込みを待たずに答える
+    if request.blueprint == api_v1_status.name:
+        return None
+    # 既存データの読み込みが終わるまで待つ（管理クラスの作成はロックを取得するので、ロックの取得前に待つ）
+    if not startup_manager.wait_until_ready():
+        return make_response(jsonify({"error": f'既存データを読み込めませんでした（{startup_manager.error}）'}), 503)
+    shared_state.sync()
+    g.shared_state_lock = ExitStack()
+    if request.method in ('GET', 'HEAD', 'OPTIONS'):
+        g.shared_state_lock.enter_context(shared_state.shared())
+    else:
+        g.shared_state_lock.enter_context(shared_state.exclusive())
+        # ロックを取得するまでの間に書き込まれた変更を読み込む
+        shared_state.sync()
+
+# ロックを解放する（書き込みを伴うリクエストは、ここで書き込みロックを解放してから変更の確定を待つ）
+# 確定に失敗した場合は500を返すため、応答の作成後・送信前に解放する
+@flask_app.after_request
+def commit_shared_state(response):
+    release_shared_state(None)
+    return response
+
+@flask_app.teardown_request
+def release_shared_state(exception):
+    shared_state_lock = g.pop('shared_state_lock', None)
+    if shared_state_lock is not None:
+        shared_state_lock.close()
+
+# 既存データの読み込みはサーバーの起動を待たせずにバックグラウンドで行う
+# （gunicornでは各workerがこのモジュールを読み込むので、workerごとに読み込む）
+if WARM_UP_ON_BOOT:
+    startup_manager.start_warm_up()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+import json
+import time
+from typing import Iterator
+
+from flask import Blueprint, Response, request
+
+from settings import EVENT_KEEPALIVE_SECONDS
+from typedefs.RaffleDatatypes import RaffleEvent
+from services.EventHub import EventHub
+from util.SingletonMetaclass import lazy_singleton
+
+api_v1_events = Blueprint('api_v1_events', __name__)
+
+event_hub = lazy_singleton(EventHub)
+
+
+def format_event_id(log_id: str, sequence: int) -> str:
+    """
+    SSEのイベントIDを作成する
+    通し番号は全プロセスで共通のログのものなので、別のworkerに再接続しても再開できる
+    ログが作り直されて通し番号が戻っても、以前のログのIDから再開しないようにログのIDを付ける
+    """
+    return f'{log_id}-{sequence}'
+
+
+def parse_event_id(event_id: str | None) -> tuple[str, int] | None:
+    """
+    SSEのイベントIDからログのIDと通し番号を取り出す（不正な値の場合はNone）
+    """
+    if event_id is None:
+        return None
+    log_id, _, sequence = event_id.rpartition('-')
+    if log_id == '' or not sequence.isdigit():
+        return None
+    return (log_id, int(sequence))
+
+
+def format_event(event_type: str, log_id: str, sequence: int, data: dict) -> str:
+    return f'id: {format_event_id(log_id, sequence)}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def stream_events(last_position: tuple[str, int] | None) -> Iterator[str]:
+    """
+    イベントを送り続ける
+    最初の接続時や、再開できない場合（履歴から消えた・ログが作り直された）は「resync」を送る
+    クライアントはresyncを受け取ったら全データを取得し直し、以降のイベントを反映する
+    
+    他のプロセス（worker）で発行されたイベントも、共有のログから同じ通し番号で届く
+    """
+    yield 'retry: 3000\n\n'
+    
+    events: list[RaffleEvent] | None = None
+    if last_position is not None:
+        log_id, last_sequence = last_position
+        events = event_hub.get_events_since(log_id, last_sequence)
+    if events is None:
+        log_id, last_sequence = event_hub.get_latest_position()
+        yield format_event('resync', log_id, last_sequence, {})
+        events = []
+    
+    last_sent_at = time.monotonic()
+    while True:
+        for event in events:
+            yield format_event(event.type, log_id, event.sequence, event.data)
+            last_sequence = event.sequence
+            last_sent_at = time.monotonic()
+        timeout = max(0.0, EVENT_KEEPALIVE_SECONDS - (time.monotonic() - last_sent_at))
+        events = event_hub.wait_for_events(log_id, last_sequence, timeout)
+        if events is None:
+            log_id, last_sequence = event_hub.get_latest_position()
+            yield format_event('resync', log_id, last_sequence, {})
+            last_sent_at = time.monotonic()
+            events = []
+        elif len(events) == 0 and time.monotonic() - last_sent_at >= EVENT_KEEPALIVE_SECONDS:
+            # 接続維持（切断されたクライアントもここで検出される）
+            yield ': keepalive\n\n'
+            last_sent_at = time.monotonic()
+
+
+# 変更イベント
+@api_v1_events.route("/api/v1/events", methods=['GET'])
+def route_events():
+    
+    # GET -> Server-Sent Eventsで変更を配信する
+    # 再接続時はLast-Event-ID（ヘッダー、またはlast_event_idクエリ）の次のイベントから再開する
+    # WSGIで返すので、接続中はworkerのスレッドを1つ占有する（1接続1スレッド）
+    # そのため、プロセスごとの接続数に上限を設ける（超えた場合は503）
+    if not event_hub.subscribe():
+        return Response('同時接続数の上限に達しています。しばらくしてから再接続してください。', status=503, headers={"Retry-After": "5"})
+    last_position = parse_event_id(request.headers.get('Last-Event-ID', request.args.get('last_event_id')))
+    response = Response(stream_events(last_position), mimetype='text/event-stream')
+    response.call_on_close(event_hub.unsubscribe)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,17 +1,26 @@
-import csv
-from os import fdopen
 from flask import Blueprint, Response, jsonify, make_response, request
 from markupsafe import escape
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from services.RaffleManager import RaffleManager
 from services.CsvParser import parse_participants_csv
+from services.CsvUpload import open_uploaded_csv
+from settings import MAX_CSV_ROWS, PARTICIPANTS_PAGE_SIZE_DEFAULT, PARTICIPANTS_PAGE_SIZE_MAX
+from typedefs.RaffleDatatypes import Participant, ParticipantFilter
+from util.HttpCaching import cached_json_response, make_etag, parse_version_token
+from util.SingletonMetaclass import lazy_singleton
 from services.ParticipantsManager import ParticipantsManager
-from typedefs.FunctionReturnTypes import AttendanceModificationStatus
 
 api_v1_participants = Blueprint('api_v1_participants', __name__)
 
-participants_manager = ParticipantsManager()
-raffle_manager = RaffleManager()
+# アップロードサイズの上限（MAX_UPLOAD_BYTES）を超えた場合
+@api_v1_participants.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(e: RequestEntityTooLarge):
+    return make_response(jsonify({"parsed_participants": 0, "error": 'ファイルサイズが上限を超えています'}), 413)
+
+# 管理クラスは初回利用時に作成する（モジュールの読み込み時には既存データを読み込まない）
+participants_manager = lazy_singleton(ParticipantsManager)
+raffle_manager = lazy_singleton(RaffleManager)
 
 
 # 全参加者ルート
@@ -19,27 +28,37 @@ raffle_manager = RaffleManager()
 def route_participants():
     
     # GET -> 全参加者リストを返す
-    if request.method == "GET":
-        return jsonify([participant._asdict() for participant in participants_manager.get_all_participants()])
+    # 変更がなければ304
+    # ページ分割・絞り込みの指定がある場合はroute_participants_page()
+    if request.method == "GET" and any(key in request.args for key in ('cursor', 'limit', 'fields', 'filter')):
+        return route_participants_page()
+    elif request.method == "GET":
+        return cached_json_response(
+            'participants',
+            make_etag('participants', participants_manager.get_version()),
+            lambda: [participant._asdict() for participant in participants_manager.get_all_participants()]
+        )
     
     # PUT -> CSV読み込み、既存リストを破棄して置き換え
     elif request.method == "PUT":
         
         # もし抽選結果が存在する場合、参加者リストの置き換えを許さない
-        if len(raffle_manager.get_prize_winner_mappings()) > 0:
+        if raffle_manager.has_winner_mappings():
             return make_response(jsonify({"parsed_participants": 0, "error": '抽選結果が存在する場合は参加者リストの書き換えを行えません。'}), 400)
         
         # CSVファイルが添付されてるか確認する
         if 'csv' not in request.files:
             return make_response(jsonify({"parsed_participants": 0, "error": 'ファイル「csv」が添付されていません'}), 400)
         
-        # CSVファイルを開く
+        # CSVファイルを開き、1行ずつ読み込む
         f = request.files['csv']
-        with fdopen(f.stream.fileno(), 'rt') as csvfile:
-            
-            reader = csv.DictReader(csvfile)
-            parsed_data = parse_participants_csv(reader)
-            csvfile.close()
+        try:
+            reader = open_uploaded_csv(f)
+            parsed_data = parse_participants_csv(reader, max_rows=MAX_CSV_ROWS)
+        except UnicodeDecodeError:
+            return make_response(jsonify({"parsed_participants": 0, "error": 'CSVファイルの文字コードを読み取れません（UTF-8又はShift_JISで保存してください）'}), 400)
+        finally:
+            f.close()
             
         if parsed_data['error']:
             return make_response(jsonify({"parsed_participants": 0, "error": parsed_data['error']}), 400)
@@ -50,19 +69,64 @@ def route_participants():
     # DELETE -> 全データ削除
     elif request.method == 'DELETE':
         # もし抽選結果が存在する場合、参加者リストの置き換えを許さない
-        if len(raffle_manager.get_prize_winner_mappings()) > 0:
+        if raffle_manager.has_winner_mappings():
             return Response('抽選結果が存在する場合は参加者リストの書き換えを行えません。', status=400)
         participants_manager.wipe_participants_list()
         return Response(f"参加者データを削除しました。", status=200)
     
         
+def route_participants_page():
+    """
+    参加者リストをページ分割して返す
+    {"participants": [参加者...], "next_cursor": 次のページの?cursor=（最後のページの場合はnull）}
+    
+    ?filter=all|attending|cancelled|not_attending|winners 絞り込み（既定はall）
+    ?fields=registration_id,display_name,... 返す項目（既定は全項目）
+    ?limit=N 1ページの件数（既定はPARTICIPANTS_PAGE_SIZE_DEFAULT、上限はPARTICIPANTS_PAGE_SIZE_MAX）
+    ?cursor=... 前のページのnext_cursor
+    """
+    try:
+        filter = ParticipantFilter(request.args.get('filter', ParticipantFilter.ALL))
+    except ValueError:
+        return Response(f'filterは{"・".join(ParticipantFilter)}のいずれかを指定してください', status=400)
+    
+    fields: list[str] = list(Participant._fields)
+    if 'fields' in request.args:
+        fields = [field for field in request.args['fields'].split(',') if field != '']
+        unknown_fields = [field for field in fields if field not in Participant._fields]
+        if len(fields) == 0 or len(unknown_fields) > 0:
+            return Response(f'fieldsには{"・".join(Participant._fields)}を指定してください', status=400)
+    
+    limit_arg = request.args.get('limit', str(PARTICIPANTS_PAGE_SIZE_DEFAULT))
+    limit = int(limit_arg) if limit_arg.isdigit() else 0
+    if limit < 1 or limit > PARTICIPANTS_PAGE_SIZE_MAX:
+        return Response(f'limitは1～{PARTICIPANTS_PAGE_SIZE_MAX}の数字を指定してください', status=400)
+    
+    page = participants_manager.get_participants_page(filter, request.args.get('cursor'), limit)
+    if page is None:
+        return Response('cursorが無効です（参加者リストが変更された可能性があります）', status=400)
+    
+    return make_response(jsonify({
+        "participants": [{field: getattr(participant, field) for field in fields} for participant in page['participants']],
+        "next_cursor": page['next_cursor']
+    }), 200)
+    
+        
 # 全不参加ルート
 @api_v1_participants.route("/api/v1/participants/cancels/all", methods=['GET', 'PUT', 'DELETE'])
 def route_participants_all_cancels():
     
     # GET -> 当日不参加リストを取得
-    if request.method == "GET":
-        return jsonify(participants_manager.get_all_cancel_ids())
+    # 変更がなければ304
+    # ?since=<version>の場合は、そのバージョン以降の差分のみを返す
+    if request.method == "GET" and 'since' in request.args:
+        return route_participants_cancels_since(request.args.get('since'))
+    elif request.method == "GET":
+        return cached_json_response(
+            'cancels',
+            make_etag('cancels', participants_manager.get_version()),
+            participants_manager.get_all_cancel_ids
+        )
     
     # DELETE -> 不参加リストを削除
     elif request.method == 'DELETE':
@@ -70,6 +134,36 @@ def route_participants_all_cancels():
         return Response(status=200)
     
     
+def route_participants_cancels_since(since: str | None):
+    """
+    差分同期
+    {"version": 次回の?since=, "full": false, "upserts": [追加された受付番号...], "deletes": [削除された受付番号...]}を返す
+    差分を返せない場合（変更履歴が足りない・別の起動時のバージョン）は
+    {"version": 次回の?since=, "full": true, "cancels": [全件]}を返す
+    """
+    # バージョンを先に読む（以降の変更が含まれても、次回同じ差分が再度届くだけ）
+    participants_version = participants_manager.get_version()
+    version_token = make_etag(participants_version)
+    
+    changes = None
+    since_versions = parse_version_token(since, 1)
+    if since_versions is not None:
+        changes = participants_manager.get_cancel_changes_since(since_versions[0])
+    
+    if changes is None:
+        return make_response(jsonify({
+            "version": version_token,
+            "full": True,
+            "cancels": participants_manager.get_all_cancel_ids()
+        }), 200)
+    return make_response(jsonify({
+        "version": version_token,
+        "full": False,
+        "upserts": [id for id, cancelled in changes.items() if cancelled],
+        "deletes": [id for id, cancelled in changes.items() if not cancelled]
+    }), 200)
+    
+    
 # 不参加編集ルート
 @api_v1_participants.route("/api/v1/participants/cancels/edit", methods=['PUT', 'DELETE'])
 def route_participants_batch_cancels():
@@ -84,26 +178,13 @@ def route_participants_batch_cancels():
         if not isinstance(request_payload, list):
             return Response('RequestにIDリストをJSONとして追加してください。', status=400)
         
-        success = []
-        skipped = []
-        nonexistent_ids = []
+        if not all(isinstance(id, str) for id in request_payload):
+            return Response('文字列以外のIDが含まれてます', status=400)
         
-        for id in request_payload:
-            if not isinstance(id, str):
-                return Response('文字列以外のIDが含まれてます', status=400)
-            processing_response = participants_manager.add_cancel(id)
-            if processing_response == AttendanceModificationStatus.PROCESSED_SUCCESSFULLY:
-                success.append(id)
-            elif processing_response == AttendanceModificationStatus.ALREADY_PROCESSED:
-                skipped.append(id)
-            else:
-                nonexistent_ids.append(id)
+        # まとめて処理し、ファイル書き出しは1回のみ
+        result = participants_manager.add_cancels(request_payload)
                 
-        return make_response(jsonify({
-            "success": success,
-            "skipped": skipped,
-            "nonexistent_ids": nonexistent_ids
-        }), 200)
+        return make_response(jsonify(result), 200)
                 
     # DELETE -> 指定された参加者を不参加リストから削除する
     elif request.method == 'DELETE':
@@ -115,22 +196,11 @@ def route_participants_batch_cancels():
         if not isinstance(request_payload, list):
             return Response('RequestにIDリストをJSONとして追加してください。', status=400)
         
-        success = []
-        skipped = []
-        nonexistent_ids = []
+        if not all(isinstance(id, str) for id in request_payload):
+            return Response('文字列以外のIDが含まれてます', status=400)
         
-        for id in request_payload:
-            processing_response = participants_manager.remove_cancel(id)
-            if processing_response == AttendanceModificationStatus.PROCESSED_SUCCESSFULLY:
-                success.append(id)
-            elif processing_response == AttendanceModificationStatus.ALREADY_PROCESSED:
-                skipped.append(id)
-            else:
-                nonexistent_ids.append(id)
+        # まとめて処理し、ファイル書き出しは1回のみ
+        result = participants_manager.remove_cancels(request_payload)
                 
-        return make_response(jsonify({
-            "success": success,
-            "skipped": skipped,
-            "nonexistent_ids": nonexistent_ids
-        }), 200)
+        return make_response(jsonify(result), 200)
 
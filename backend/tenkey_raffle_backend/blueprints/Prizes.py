@@ -1,39 +1,56 @@
-import csv
-from os import fdopen
 from flask import Blueprint, Response, jsonify, make_response, request
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from services.RaffleManager import RaffleManager
 from services.CsvParser import parse_prizes_csv
+from services.CsvUpload import open_uploaded_csv
+from settings import MAX_CSV_ROWS
+from util.HttpCaching import cached_json_response, make_etag
+from util.SingletonMetaclass import lazy_singleton
 from services.PrizesManager import PrizesManager
 
 api_v1_prizes = Blueprint('api_v1_prizes', __name__)
 
-prizes_manager = PrizesManager()
-raffle_manager = RaffleManager()
+# アップロードサイズの上限（MAX_UPLOAD_BYTES）を超えた場合
+@api_v1_prizes.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(e: RequestEntityTooLarge):
+    return make_response(jsonify({"parsed_prizes": 0, "error": 'ファイルサイズが上限を超えています'}), 413)
+
+# 管理クラスは初回利用時に作成する（モジュールの読み込み時には既存データを読み込まない）
+prizes_manager = lazy_singleton(PrizesManager)
+raffle_manager = lazy_singleton(RaffleManager)
   
 @api_v1_prizes.route("/api/v1/prizes", methods=['GET', 'PUT', 'DELETE'])
 def route_prizes():
     
     # GET -> 全景品リストを返す
+    # 変更がなければ304
     if request.method == "GET":
-        return jsonify([prize._asdict() for prize in prizes_manager.get_all_prizes()])
+        return cached_json_response(
+            'prizes',
+            make_etag('prizes', prizes_manager.get_version()),
+            lambda: [prize._asdict() for prize in prizes_manager.get_all_prizes()]
+        )
     
     # PUT -> CSV読み込み、既存リストを破棄して置き換え
     elif request.method == "PUT":
         # もし抽選結果が存在する場合、参加者リストの置き換えを許さない
-        if len(raffle_manager.get_prize_winner_mappings()) > 0:
+        if raffle_manager.has_winner_mappings():
             return make_response(jsonify({"parsed_prizes": 0, "error": '抽選結果が存在する場合は景品リストの書き換えを行えません。'}), 400)
         
         # CSVファイルが添付されてるか確認する
         if 'csv' not in request.files:
             return make_response(jsonify({"parsed_prizes": 0, "error": 'ファイル「csv」が添付されていません'}), 400)
         
-        # CSVファイルを開く
+        # CSVファイルを開き、1行ずつ読み込む
         f = request.files['csv']
-        with fdopen(f.stream.fileno(), 'rt') as csvfile:
-            reader = csv.DictReader(csvfile)
-            parsed_data = parse_prizes_csv(reader)
-            csvfile.close()
+        try:
+            reader = open_uploaded_csv(f)
+            parsed_data = parse_prizes_csv(reader, max_rows=MAX_CSV_ROWS)
+        except UnicodeDecodeError:
+            return make_response(jsonify({"parsed_prizes": 0, "error": 'CSVファイルの文字コードを読み取れません（UTF-8又はShift_JISで保存してください）'}), 400)
+        finally:
+            f.close()
             
         if parsed_data['error']:
             return make_response(jsonify({"parsed_prizes": 0, "error": parsed_data['error']}), 400)
@@ -44,7 +61,20 @@ def route_prizes():
     # DELETE -> 全データ削除
     elif request.method == 'DELETE':
         # もし抽選結果が存在する場合、参加者リストの置き換えを許さない
-        if len(raffle_manager.get_prize_winner_mappings()) > 0:
+        if raffle_manager.has_winner_mappings():
             return Response('抽選結果が存在する場合は景品リストの書き換えを行えません。', status=400)
         prizes_manager.wipe_prizes_list()
         return Response(f"景品データを削除しました。", status=200)
+        
+
+# 景品グループルート
+@api_v1_prizes.route("/api/v1/prizes/groups", methods=['GET'])
+def route_prize_groups():
+    
+    # GET -> 全景品グループと抽選状況を返す
+    # 変更がなければ304
+    return cached_json_response(
+        'groups',
+        make_etag('groups', prizes_manager.get_version(), raffle_manager.get_version()),
+        lambda: [group._asdict() for group in raffle_manager.get_prize_groups_progress()]
+    )
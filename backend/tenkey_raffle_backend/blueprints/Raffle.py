@@ -3,14 +3,20 @@ from os import fdopen
 from flask import Blueprint, Response, jsonify, make_response, request
 
 from typedefs.FunctionReturnTypes import RaffleModificationStatus
-from blueprints.forms.RaffleForms import RaffleSetWinnerForm, RaffleDeleteWinnerForm
+from blueprints.forms.RaffleForms import RaffleDrawAllForm, RaffleDrawForm, RaffleSetWinnerForm, RaffleDeleteWinnerForm
+from services.DrawManager import DrawManager
 from services.RaffleManager import RaffleManager
 from services.PrizesManager import PrizesManager
+from util.HttpCaching import cached_json_response, make_etag, parse_version_token
+from util.SeedableCsprng import create_draw_rng
+from util.SingletonMetaclass import lazy_singleton
 
 api_v1_raffle = Blueprint('api_v1_raffle', __name__)
 
-raffle_manager = RaffleManager()
-prizes_manager = PrizesManager()
+# 管理クラスは初回利用時に作成する（モジュールの読み込み時には既存データを読み込まない）
+raffle_manager = lazy_singleton(RaffleManager)
+prizes_manager = lazy_singleton(PrizesManager)
+draw_manager = lazy_singleton(DrawManager)
 
 # =====
 
@@ -20,15 +26,57 @@ def route_mappings():
         
     # GET: 現在の抽選状況を取得する
     # 全景品リストを[{景品ID、当選者IDまたはNone}...]と返す
-    if request.method == 'GET':
-        all_prize_ids = prizes_manager.get_all_prize_ids()
-        response_array = [{"prize_id": prize_id, "winner_id": raffle_manager.get_winner_for_prize(prize_id)} for prize_id in all_prize_ids]
-        return make_response(jsonify(response_array), 200)
+    # 変更がなければ304
+    # ?since=<version>の場合は、そのバージョン以降の差分のみを返す
+    if request.method == 'GET' and 'since' in request.args:
+        return route_mappings_since(request.args.get('since'))
+    elif request.method == 'GET':
+        return cached_json_response(
+            'mappings',
+            make_etag('mappings', prizes_manager.get_version(), raffle_manager.get_version()),
+            lambda: [
+                {"prize_id": prize_id, "winner_id": raffle_manager.get_winner_for_prize(prize_id)}
+                for prize_id in prizes_manager.get_all_prize_ids()
+            ]
+        )
     
     elif request.method == 'DELETE':
         raffle_manager.wipe_prize_winner_mappings()
         return Response(status=200)
 
+def route_mappings_since(since: str | None):
+    """
+    差分同期
+    {"version": 次回の?since=, "full": false, "upserts": [{景品ID、当選者ID}...], "deletes": [景品ID...]}を返す
+    差分を返せない場合（景品リストが変わった・変更履歴が足りない・別の起動時のバージョン）は
+    {"version": 次回の?since=, "full": true, "mappings": [全件]}を返す
+    """
+    # バージョンを先に読む（以降の変更が含まれても、次回同じ差分が再度届くだけ）
+    prizes_version = prizes_manager.get_version()
+    raffle_version = raffle_manager.get_version()
+    version_token = make_etag(prizes_version, raffle_version)
+    
+    changes = None
+    since_versions = parse_version_token(since, 2)
+    if since_versions is not None and since_versions[0] == prizes_version:
+        changes = raffle_manager.get_winner_changes_since(since_versions[1])
+    
+    if changes is None:
+        return make_response(jsonify({
+            "version": version_token,
+            "full": True,
+            "mappings": [
+                {"prize_id": prize_id, "winner_id": raffle_manager.get_winner_for_prize(prize_id)}
+                for prize_id in prizes_manager.get_all_prize_ids()
+            ]
+        }), 200)
+    return make_response(jsonify({
+        "version": version_token,
+        "full": False,
+        "upserts": [{"prize_id": prize_id, "winner_id": winner_id} for prize_id, winner_id in changes.items() if winner_id is not None],
+        "deletes": [prize_id for prize_id, winner_id in changes.items() if winner_id is None]
+    }), 200)
+
 # 抽選編集
 @api_v1_raffle.route("/api/v1/raffle", methods=['PUT', 'POST', 'DELETE'])
 def route_raffle_set():
@@ -88,4 +136,64 @@ def route_raffle_set():
         
         return Response(status=200)
     
-    
\ No newline at end of file
+
+# サーバー側抽選
+@api_v1_raffle.route("/api/v1/raffle/draw", methods=['POST'])
+def route_raffle_draw():
+    
+    # POST: 景品の当選者を抽選し、当選として書き込む
+    # 当日不参加・Connpass不参加・（allow_prior_winnersが無い場合）既に当選した参加者は対象外
+    form = RaffleDrawForm(request.form)
+    if not form.validate():
+        return Response(jsonify(form.errors), status=400)
+    
+    prize_id = form.prize_id.data
+    # シードはこのリクエストの抽選のみに利用する（以降のシード無しの抽選はOSの乱数のまま）
+    rng = create_draw_rng(form.seed.data) if form.seed.data else None
+    
+    draw_result = draw_manager.draw_winner(
+        prize_id=prize_id,
+        exclude_prior_winners=not form.allow_prior_winners.data,
+        overwrite=form.redraw.data,
+        weighted=form.weighted.data,
+        rng=rng
+    )
+    edit_status = draw_result['status']
+    if edit_status == RaffleModificationStatus.NONEXISTENT_PRIZE_ID:
+        return Response(f"管理番号「{prize_id}」の景品は存在しません。", status=400)
+    elif edit_status == RaffleModificationStatus.NOT_OVERWRITING:
+        return Response(f"景品「{prize_id}」は既に抽選済みです。", status=400)
+    elif edit_status == RaffleModificationStatus.NO_ELIGIBLE_PARTICIPANTS:
+        return Response(f"抽選対象の参加者がいません。", status=400)
+    elif edit_status != RaffleModificationStatus.PROCESSED_SUCCESSFULLY:
+        return Response(f"景品「{prize_id}」の抽選に失敗しました。", status=400)
+    
+    return make_response(jsonify({"prize_id": prize_id, "winner_id": draw_result['winner_id']}), 200)
+    
+
+# 未抽選の全景品をまとめて抽選（事前抽選・リハーサル用）
+@api_v1_raffle.route("/api/v1/raffle/draw/all", methods=['POST'])
+def route_raffle_draw_all():
+    
+    # POST: 未抽選の全景品の当選者を抽選し、まとめて書き込む
+    # allow_prior_winnersが無い場合は1人1景品まで
+    form = RaffleDrawAllForm(request.form)
+    if not form.validate():
+        return Response(jsonify(form.errors), status=400)
+    
+    rng = create_draw_rng(form.seed.data) if form.seed.data else None
+    
+    draw_result = draw_manager.draw_all_remaining_prizes(
+        one_win_per_person=not form.allow_prior_winners.data,
+        weighted=form.weighted.data,
+        rng=rng
+    )
+    if draw_result['status'] == RaffleModificationStatus.NO_ELIGIBLE_PARTICIPANTS:
+        return Response(f"抽選対象の参加者がいません。", status=400)
+    elif draw_result['status'] != RaffleModificationStatus.PROCESSED_SUCCESSFULLY:
+        return Response(f"景品の一括抽選に失敗しました。", status=400)
+    
+    return make_response(jsonify([
+        {"prize_id": mapping.prize_id, "winner_id": mapping.participant_id}
+        for mapping in draw_result['winner_mappings']
+    ]), 200)
@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify, make_response, request
+
+from typedefs.RaffleDatatypes import StartupStatus
+from services.StartupManager import StartupManager
+from util.StartupTimer import StartupTimer
+
+api_v1_status = Blueprint('api_v1_status', __name__)
+
+# このBlueprintのリクエストは既存データの読み込みを待たず、SharedStateのロックも取得しない（app.py）
+startup_manager = StartupManager()
+
+
+# 死活確認ルート
+# 既存データの読み込み中・失敗時もプロセスが動いていれば200
+@api_v1_status.route("/api/v1/health", methods=['GET'])
+def route_health():
+    return make_response(jsonify({"status": "ok"}), 200)
+
+
+# 準備状態ルート
+@api_v1_status.route("/api/v1/ready", methods=['GET', 'POST'])
+def route_ready():
+    
+    # GET -> 既存データの読み込みを（まだなら）バックグラウンドで開始し、待たずに状態を返す
+    if request.method == "GET":
+        startup_manager.start_warm_up()
+    
+    # POST -> 既存データの読み込みが終わるまで待ってから状態を返す（ウォームアップ）
+    elif request.method == "POST":
+        startup_manager.wait_until_ready()
+    
+    # 読み込み完了なら200、読み込み中・失敗時は503
+    status = startup_manager.status
+    return make_response(jsonify({
+        "status": status,
+        "error": startup_manager.error,
+        "startup_seconds": dict(StartupTimer().phase_seconds) # 読み込み中に追加されるのでコピーする
+    }), 200 if status == StartupStatus.READY else 503)
@@ -1,6 +1,6 @@
 
 
-from wtforms import Form, StringField, validators
+from wtforms import BooleanField, Form, StringField, validators
 
 
 class RaffleSetWinnerForm(Form):
@@ -8,4 +8,16 @@ class RaffleSetWinnerForm(Form):
     winner_id = StringField('景品ID', [validators.DataRequired()])
     
 class RaffleDeleteWinnerForm(Form):
-    prize_id = StringField('景品ID', [validators.DataRequired()])
\ No newline at end of file
+    prize_id = StringField('景品ID', [validators.DataRequired()])
+    
+class RaffleDrawForm(Form):
+    prize_id = StringField('景品ID', [validators.DataRequired()])
+    allow_prior_winners = BooleanField('既に当選した参加者も対象にする')
+    redraw = BooleanField('既存の当選者を上書きして再抽選する')
+    weighted = BooleanField('抽選重みに比例した確率で抽選する')
+    seed = StringField('乱数シード', [validators.Optional()])
+    
+class RaffleDrawAllForm(Form):
+    allow_prior_winners = BooleanField('1人が複数の景品に当選できるようにする')
+    weighted = BooleanField('抽選重みに比例した確率で抽選する')
+    seed = StringField('乱数シード', [validators.Optional()])
@@ -1,206 +1,228 @@
-
 from csv import DictReader
-from typing import NamedTuple, TypedDict
+from math import isfinite
+from typing import NamedTuple, Sequence, TypedDict
+from settings import MAX_DRAW_WEIGHT
 from typedefs.RaffleDatatypes import Participant, Prize, WinnerMapping
 
 
+# エラー報告用：(行番号, 値)のリストを「値（行番号行目）」の形式で並べる
+def format_error_rows(error_rows: list[tuple[int, str]]) -> str:
+    return '、'.join(f'{value}（{line_num}行目）' for line_num, value in error_rows)
+
+
+# 必要な列が揃っているか確認し、足りない列のエラーメッセージを返す
+def check_required_headers(headers: list[str] | None, required_headers: list[str], csv_name: str) -> str | None:
+    existing_headers = set(headers or [])
+    missing_headers = [header for header in required_headers if header not in existing_headers]
+    if len(missing_headers) == 0:
+        return None
+    return '\n'.join(f'{csv_name}に「{header}」列がありません' for header in missing_headers)
+
+
 
 class ParticipantsParserReturnType(TypedDict):
     participants: list[Participant]
     error: str | None
 
 # 参加者CSVを解析
-def parse_participants_csv(participants_reader: DictReader[str]) ->  ParticipantsParserReturnType:
+def parse_participants_csv(participants_reader: DictReader[str], max_rows: int | None = None) ->  ParticipantsParserReturnType:
     
     # 読み込みデータ管理
     participants: list[Participant] = []
     
     # データ内容の確認用
-    error_msg: str | None = None
-    seen_participant_ids: list[str] = []
-    duplicate_participant_ids: list[str] = []
-    faulty_attendance_status_ids: list[str] = []
+    # 問題は全て集めてからまとめて返す（行番号, 値）
+    seen_participant_ids: set[str] = set()
+    duplicate_participant_ids: list[tuple[int, str]] = []
+    faulty_attendance_status_ids: list[tuple[int, str]] = []
+    faulty_weight_ids: list[tuple[int, str]] = []
     
     # CSVの確認
-    participants_headers = participants_reader.fieldnames
-    if 'ユーザー名' not in participants_headers:
-        error_msg = '参加者CSVに「ユーザー名」列がありません'
-    elif '表示名' not in participants_headers:
-        error_msg = '参加者CSVに「表示名」列がありません'
-    elif '参加ステータス' not in participants_headers:
-        error_msg = '参加者CSVに「参加ステータス」列がありません'
-    elif '受付番号' not in participants_headers:
-        error_msg = '参加者CSVに「受付番号」列がありません'
-        
-    if error_msg: 
+    error_msg = check_required_headers(participants_reader.fieldnames, ['ユーザー名', '表示名', '参加ステータス', '受付番号'], '参加者CSV')
+    if error_msg:
         return {
             "participants": [],
             "error": error_msg
         }
+    # 「抽選重み」列は任意
+    has_weight_column = '抽選重み' in participants_reader.fieldnames
     
     for row in participants_reader:
+        # 行数上限を超えた場合は残りを読まずに弾く
+        if max_rows is not None and len(participants) >= max_rows:
+            return {
+                "participants": [],
+                "error": f"参加者CSVの行数が上限（{max_rows}行）を超えています"
+            }
         id = row['受付番号']
+        line_num = participants_reader.line_num
         # 参加ステータスの確認
         if row['参加ステータス'] != "参加" and row['参加ステータス'] != "参加キャンセル":
-            faulty_attendance_status_ids.append(row['受付番号']) 
+            faulty_attendance_status_ids.append((line_num, id))
         # 重複IDの確認
         if id in seen_participant_ids:
-            duplicate_participant_ids.append(id)
+            duplicate_participant_ids.append((line_num, id))
         else:
-            seen_participant_ids.append(id)
+            seen_participant_ids.add(id)
+        # 抽選重みの確認（空欄は1、0以上の数値のみ可）
+        weight = 1.0
+        if has_weight_column and row['抽選重み'] not in (None, ''):
+            try:
+                weight = float(row['抽選重み'])
+            except ValueError:
+                weight = -1.0
+            if not isfinite(weight) or weight < 0 or weight > MAX_DRAW_WEIGHT:
+                faulty_weight_ids.append((line_num, id))
+                weight = 1.0
         participants.append(Participant(
             registration_id=id,
             username=row['ユーザー名'],
             display_name=row['表示名'],
             connpass_attending=True if row['参加ステータス'] == "参加" else False,
+            weight=weight,
         ))
     
-
+    errors: list[str] = []
     if len(faulty_attendance_status_ids) > 0:
+        errors.append(f"参加者CSVに「参加ステータス」が参加・参加キャンセル以外の参加者が存在します（{format_error_rows(faulty_attendance_status_ids)}）")
+    if len(duplicate_participant_ids) > 0:
+        errors.append(f"参加者CSVに受付番号の重複があります（{format_error_rows(duplicate_participant_ids)}）")
+    if len(faulty_weight_ids) > 0:
+        errors.append(f"参加者CSVに「抽選重み」が0以上{MAX_DRAW_WEIGHT}以下の数値ではない参加者が存在します（{format_error_rows(faulty_weight_ids)}）")
+    
+    if len(errors) > 0:
         return {
             "participants": [],
-            "error": f"参加者CSVに「参加ステータス」が参加・参加キャンセル以外の参加者が存在します（{str(faulty_attendance_status_ids)}）"
-        }  
-    elif len(duplicate_participant_ids) > 0:
-        return {
-            "prizes": [],
-            "error": f"参加者CSVに受付番号の重複があります（{str(set(duplicate_participant_ids))}）"
+            "error": '\n'.join(errors)
         }
-        
+    
     return {
         "participants": participants,
         "error": None
-    } 
-    
-    
+    }
+
+
 
 class PrizesParserReturnType(TypedDict):
     prizes: list[Prize]
     error: str | None
 
 # 参加者CSVを解析
-def parse_prizes_csv(prizes_reader: DictReader[str]) ->  PrizesParserReturnType:
+def parse_prizes_csv(prizes_reader: DictReader[str], max_rows: int | None = None) ->  PrizesParserReturnType:
     
     # 読み込みデータ管理
     prizes: list[Prize] = []
     
     # データ内容の確認用
-    error_msg: str | None = None
-    seen_prize_ids: list[str] = []
-    duplicate_prize_ids: list[str] = []
-    
-    prizes_headers = prizes_reader.fieldnames
-    if '管理No' not in prizes_headers:
-        error_msg = '景品CSVに「管理No」列がありません'
-    elif '提供元' not in prizes_headers:
-        error_msg = '景品CSVに「提供元」列がありません'
-    elif '景品名' not in prizes_headers:
-        error_msg = '景品CSVに「景品名」列がありません'
+    # 問題は全て集めてからまとめて返す（行番号, 値）
+    seen_prize_ids: set[str] = set()
+    duplicate_prize_ids: list[tuple[int, str]] = []
     
+    error_msg = check_required_headers(prizes_reader.fieldnames, ['管理No', '提供元', '景品名'], '景品CSV')
     if error_msg:
         return {
             "prizes": [],
             "error": error_msg
-        }  
-        
+        }
+    
     for row in prizes_reader:
+        # 行数上限を超えた場合は残りを読まずに弾く
+        if max_rows is not None and len(prizes) >= max_rows:
+            return {
+                "prizes": [],
+                "error": f"景品CSVの行数が上限（{max_rows}行）を超えています"
+            }
         id = row['管理No']
         # 重複IDの確認
         if id in seen_prize_ids:
-            duplicate_prize_ids.append(id)
+            duplicate_prize_ids.append((prizes_reader.line_num, id))
         else:
-            seen_prize_ids.append(id)
+            seen_prize_ids.add(id)
         prizes.append(Prize(
             id=id,
             provider=row['提供元'],
             display_name=row['景品名']
-        )) 
-      
-
+        ))
+    
+    
     if len(duplicate_prize_ids) > 0:
         return {
             "prizes": [],
-            "error": f"景品CSVに景品IDの重複があります（{str(set(duplicate_prize_ids))}）"
+            "error": f"景品CSVに景品IDの重複があります（{format_error_rows(duplicate_prize_ids)}）"
         }
-        
+    
     return {
         "prizes": prizes,
         "error": None
-    } 
-    
-    
+    }
+
+
 
 class WinnersParserReturnType(TypedDict):
     winner_mappings: list[WinnerMapping]
     error: str | None
-    
+
 # 当選者CSVを解析
-def parse_winners_csv(winners_reader: DictReader[str], participants: list[Participant], prizes: list[Prize]) ->  WinnersParserReturnType:
+def parse_winners_csv(winners_reader: DictReader[str], participants: Sequence[Participant], prizes: Sequence[Prize]) ->  WinnersParserReturnType:
     
     # 読み込みデータ管理
     winner_mappings: list[WinnerMapping] = []
     
     # データ内容の確認用
-    error_msg: str | None = None
-    seen_prize_ids: list[str] = []
-    duplicate_prize_ids: list[str] = []
-    unknown_prize_ids: list[str] = []
-    unknown_participant_ids: list[str] = []
-    
-    winners_headers = winners_reader.fieldnames
-    if '景品ID' not in winners_headers:
-        error_msg = '当選者リストCSVに「景品ID」列がありません'
-    elif '当選者受付番号' not in winners_headers:
-        error_msg = '当選者リストCSVに「当選者受付番号」列がありません'
-        
+    # 問題は全て集めてからまとめて返す（行番号, 値）
+    seen_prize_ids: set[str] = set()
+    duplicate_prize_ids: list[tuple[int, str]] = []
+    unknown_prize_ids: list[tuple[int, str]] = []
+    unknown_participant_ids: list[tuple[int, str]] = []
+    
+    error_msg = check_required_headers(winners_reader.fieldnames, ['景品ID', '当選者受付番号'], '当選者リストCSV')
     if error_msg:
         return {
             "winner_mappings": [],
             "error": error_msg
-        } 
-        
-    # 存在する景品・参加者IDリストを作製
-    all_prize_ids = [prize.id for prize in prizes]
-    all_participant_ids = [participant.registration_id for participant in participants]
-        
+        }
+    
+    # 存在する景品・参加者IDセットを作製
+    all_prize_ids = {prize.id for prize in prizes}
+    all_participant_ids = {participant.registration_id for participant in participants}
+    
     for row in winners_reader:
         prize_id = row['景品ID']
         participant_id = row['当選者受付番号']
-        
+        line_num = winners_reader.line_num
+    
         # 景品の確認
-        if prize_id in seen_prize_ids: 
-            duplicate_prize_ids.append(prize_id)
+        if prize_id in seen_prize_ids:
+            duplicate_prize_ids.append((line_num, prize_id))
         else:
-            seen_prize_ids.append(prize_id)
-            
+            seen_prize_ids.add(prize_id)
+    
         # 存在しない参加者・景品IDの確認
         if prize_id not in all_prize_ids:
-            unknown_prize_ids.append(prize_id)
+            unknown_prize_ids.append((line_num, prize_id))
         if participant_id not in all_participant_ids:
-            unknown_participant_ids.append(participant_id)
-            
+            unknown_participant_ids.append((line_num, participant_id))
+    
         winner_mappings.append(WinnerMapping(
             prize_id=prize_id,
             participant_id=participant_id
-        )) 
-       
+        ))
+    
+    errors: list[str] = []
     if len(duplicate_prize_ids) > 0:
+        errors.append(f"当選者リストCSVに景品IDの重複があります（{format_error_rows(duplicate_prize_ids)}）")
+    if len(unknown_prize_ids) > 0:
+        errors.append(f"当選者リストCSVに存在しない景品IDが含まれてます（{format_error_rows(unknown_prize_ids)}）")
+    if len(unknown_participant_ids) > 0:
+        errors.append(f"当選者リストCSVに存在しない参加者受付番号が含まれてます（{format_error_rows(unknown_participant_ids)}）")
+    
+    if len(errors) > 0:
         return {
             "winner_mappings": [],
-            "error": f"当選者リストCSVに景品IDの重複があります（{str(set(duplicate_prize_ids))}）"
-        }
-    elif len(unknown_prize_ids) > 0:
-        return {
-            "winner_mappings": [],
-            "error": f"当選者リストCSVに存在しない景品IDが含まれてます（{str(set(unknown_prize_ids))}）"
-        }
-    elif len(unknown_participant_ids) > 0:
-        return {
-            "winner_mappings": [],
-            "error": f"当選者リストCSVに存在しない参加者受付番号が含まれてます（{str(set(unknown_participant_ids))}）"
+            "error": '\n'.join(errors)
         }
-        
+    
     return {
         "winner_mappings": winner_mappings,
         "error": None
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,364 @@
+from io import StringIO
+from os import path
+import os
+import csv
+from typing import Any, Iterable, Sequence, TextIO
+
+from settings import PARTICIPANT_CSV_FILEPATH, CANCELS_TXT_FILEPATH, PRIZES_CSV_FILEPATH, WINNERS_CSV_FILEPATH, WINNERS_JOURNAL_FILEPATH, WINNERS_JOURNAL_ENABLED, WINNERS_JOURNAL_COMPACTION_THRESHOLD, GROUP_COMMIT_WINDOW_SECONDS, SNAPSHOT_PATH, CSV_SNAPSHOT_ENABLED
+from typedefs.RaffleDatatypes import Participant, Prize, WinnerMapping
+from services.StorageBackend import DataLoadError, StorageBackend
+from services.CsvParser import parse_participants_csv, parse_prizes_csv, parse_winners_csv
+from util.SingletonMetaclass import Singleton
+from util.DurableWrite import GroupCommitter, append_lines_durably, fsync_directory, write_file_atomically
+from util.SnapshotStore import SnapshotStore
+from util.SharedState import SharedState
+
+
+# スナップショットごとの元ファイル
+# 当選者リストは参加者・景品リストに対して確認するので、それらのファイルも含める
+SNAPSHOT_SOURCES: dict[str, list[str]] = {
+    'participants': [PARTICIPANT_CSV_FILEPATH],
+    'cancels': [CANCELS_TXT_FILEPATH],
+    'prizes': [PRIZES_CSV_FILEPATH],
+    'winners': [WINNERS_CSV_FILEPATH, WINNERS_JOURNAL_FILEPATH, PARTICIPANT_CSV_FILEPATH, PRIZES_CSV_FILEPATH],
+}
+
+
+# Singletonなので、インスタンスは1つしか作成されない
+class CsvStorage(StorageBackend, metaclass=Singleton):
+
+    def __init__(self):
+        """
+        settings.DATA_PATH内のCSV・TXTファイルに保存する
+        参加者・不参加・景品リストは変更の度にファイル全体を書き直し、
+        当選者リストはジャーナルに追記して一定数溜まったらwinners.csvにまとめる（RaffleManagerがバックグラウンドで行う）
+
+        読み込んだ内容はスナップショットとして保存し、次の起動時にファイルが変わっていなければ解析を省く
+        参加者・景品リストとwinners.csvは書き出し時にもスナップショットを更新する（不参加リストとジャーナルは次の読み込み時に更新）
+        """
+
+        # ファイル書き出し（同時に届いた変更は1回の書き出しにまとめる、最後に渡された全件を書き出す）
+        # 書き出しはexclusive()を抜けた後に行われるので、渡す全件は変更されないリストにすること
+        self.participants_committer: GroupCommitter[list[Participant]] = GroupCommitter(
+            lambda snapshots: self.__commit_participants(snapshots[-1]),
+            GROUP_COMMIT_WINDOW_SECONDS
+        )
+        self.cancels_committer: GroupCommitter[list[str]] = GroupCommitter(
+            lambda snapshots: write_file_atomically(CANCELS_TXT_FILEPATH, lambda cancels_file: self.__render_cancels(cancels_file, snapshots[-1])),
+            GROUP_COMMIT_WINDOW_SECONDS
+        )
+        self.prizes_committer: GroupCommitter[list[Prize]] = GroupCommitter(
+            lambda snapshots: self.__commit_prizes(snapshots[-1]),
+            GROUP_COMMIT_WINDOW_SECONDS
+        )
+        self.winners_committer: GroupCommitter[list[WinnerMapping]] = GroupCommitter(
+            lambda snapshots: write_file_atomically(WINNERS_CSV_FILEPATH, lambda winners_file: self.__render_winners(winners_file, snapshots[-1])),
+            GROUP_COMMIT_WINDOW_SECONDS
+        )
+        self.journal_committer: GroupCommitter[str] = GroupCommitter(
+            lambda lines: append_lines_durably(WINNERS_JOURNAL_FILEPATH, lines),
+            GROUP_COMMIT_WINDOW_SECONDS
+        )
+
+        # 書き出しの確定はexclusive()を抜ける際に待つ（書き込みロックを保持したまま待たない）
+        self.shared_state = SharedState()
+
+        # 解析済みのデータのスナップショット（無効な場合はNone）
+        self.snapshot_store: SnapshotStore | None = SnapshotStore(SNAPSHOT_PATH) if CSV_SNAPSHOT_ENABLED else None
+
+        return
+
+
+    # === スナップショット ===
+
+    def __load_snapshot(self, key: str) -> Any | None:
+        """
+        元ファイルが変わっていない場合のみ、スナップショットの内容を返す
+        """
+        if self.snapshot_store is None:
+            return None
+        return self.snapshot_store.load(key, SNAPSHOT_SOURCES[key])
+
+    def __save_snapshot(self, key: str, data: Any) -> None:
+        """
+        元ファイルの現在の内容に対するスナップショットを保存する
+        """
+        if self.snapshot_store is not None:
+            self.snapshot_store.save(key, SNAPSHOT_SOURCES[key], data)
+
+
+    # === 書き出し ===
+
+    def __submit[T](self, committer: GroupCommitter[T], item: T) -> None:
+        """
+        変更を書き出しに登録し、確定はexclusive()を抜ける際に待つ
+        """
+        ticket = committer.enqueue(item)
+        self.shared_state.after_exclusive(lambda: committer.wait(ticket))
+
+
+    # === 参加者リスト ===
+
+    def load_participants(self) -> list[Participant]:
+        """
+        参加者CSVを読み込む
+        """
+        if not path.exists(PARTICIPANT_CSV_FILEPATH):
+            print('既存のparts.csvはありません')
+            return []
+        snapshot = self.__load_snapshot('participants')
+        if snapshot is not None:
+            print('既存のparts.csvを利用します（スナップショット）')
+            return [Participant._make(row) for row in snapshot]
+        print('既存のparts.csvを利用します')
+        participants_file = open(PARTICIPANT_CSV_FILEPATH, 'rt', newline='')
+        participants_reader = csv.DictReader(participants_file)
+        participants_return = parse_participants_csv(participants_reader)
+        participants_file.close()
+        if participants_return['error']:
+            raise DataLoadError(participants_return['error'])
+        self.__save_snapshot('participants', [tuple(participant) for participant in participants_return['participants']])
+        return participants_return['participants']
+
+    def replace_participants(self, participants: Iterable[Participant]) -> None:
+        self.__submit(self.participants_committer, list(participants))
+
+    def __commit_participants(self, participants: list[Participant]) -> None:
+        """
+        参加者CSVを書き出し、スナップショットを更新する（書き出しの代表スレッドから呼ばれる）
+        """
+        write_file_atomically(PARTICIPANT_CSV_FILEPATH, lambda participants_file: self.__render_participants(participants_file, participants))
+        self.__save_snapshot('participants', [tuple(participant) for participant in participants])
+
+    def __render_participants(self, participants_file: TextIO, participants: Iterable[Participant]) -> None:
+        """
+        参加者CSVの内容を書き込む
+        """
+        writer = csv.DictWriter(participants_file, fieldnames=['ユーザー名', '表示名', '参加ステータス', '受付番号', '抽選重み'])
+        writer.writeheader()
+        for participant in participants:
+            writer.writerow({
+                'ユーザー名': participant.username,
+                '表示名': participant.display_name,
+                '参加ステータス': '参加' if participant.connpass_attending else '参加キャンセル',
+                '受付番号': participant.registration_id,
+                '抽選重み': participant.weight
+            })
+
+
+    # === 不参加リスト ===
+
+    def load_cancels(self) -> list[str]:
+        """
+        不参加リストを読み込む
+        """
+        if not path.exists(CANCELS_TXT_FILEPATH):
+            print('既存のcancels.txtはありません')
+            return []
+        snapshot = self.__load_snapshot('cancels')
+        if snapshot is not None:
+            print('既存のcancels.txtを利用します（スナップショット）')
+            return snapshot
+        print('既存のcancels.txtを利用します')
+        cancels_file = open(CANCELS_TXT_FILEPATH, 'rt')
+        entries = cancels_file.read().splitlines()
+        cancels_file.close()
+        cancels: dict[str, None] = {}
+        for line_num, line in enumerate(entries):
+            # キャンセルリストの読み込み
+            # 空欄はスキップ
+            if line == "" or line.isspace():
+                continue
+            # 数字列の場合は受付番号として登録
+            elif line.isdigit():
+                cancels[line] = None
+            # その他は弾く
+            else:
+                raise DataLoadError(f'cancels.txtに受付番号ではない行があります（"{line}"、{line_num}行目）')
+        self.__save_snapshot('cancels', list(cancels))
+        return list(cancels)
+
+    def replace_cancels(self, cancels: Iterable[str]) -> None:
+        self.__submit(self.cancels_committer, list(cancels))
+
+    def apply_cancel_changes(self, changes: list[tuple[str, bool]], cancels: Iterable[str]) -> None:
+        # 1行ずつの書き換えはできないので、全体を書き直す
+        self.__submit(self.cancels_committer, list(cancels))
+
+    def __render_cancels(self, cancels_file: TextIO, cancels: Iterable[str]) -> None:
+        """
+        当日不参加リストの内容を書き込む
+        """
+        for entry in cancels:
+            cancels_file.write(f"{entry}\n")
+
+
+    # === 景品リスト ===
+
+    def load_prizes(self) -> list[Prize]:
+        """
+        景品CSVを読み込む
+        """
+        if not path.exists(PRIZES_CSV_FILEPATH):
+            print('既存のprizes.csvはありません')
+            return []
+        snapshot = self.__load_snapshot('prizes')
+        if snapshot is not None:
+            print('既存のprizes.csvを利用します（スナップショット）')
+            return [Prize._make(row) for row in snapshot]
+        print('既存のprizes.csvを利用します')
+        prizes_file = open(PRIZES_CSV_FILEPATH, 'rt', newline='')
+        prizes_reader = csv.DictReader(prizes_file)
+        prizes_return = parse_prizes_csv(prizes_reader)
+        prizes_file.close()
+        if prizes_return['error']:
+            raise DataLoadError(prizes_return['error'])
+        self.__save_snapshot('prizes', [tuple(prize) for prize in prizes_return['prizes']])
+        return prizes_return['prizes']
+
+    def replace_prizes(self, prizes: Iterable[Prize]) -> None:
+        self.__submit(self.prizes_committer, list(prizes))
+
+    def __commit_prizes(self, prizes: list[Prize]) -> None:
+        """
+        景品CSVを書き出し、スナップショットを更新する（書き出しの代表スレッドから呼ばれる）
+        """
+        write_file_atomically(PRIZES_CSV_FILEPATH, lambda prizes_file: self.__render_prizes(prizes_file, prizes))
+        self.__save_snapshot('prizes', [tuple(prize) for prize in prizes])
+
+    def __render_prizes(self, prizes_file: TextIO, prizes: Iterable[Prize]) -> None:
+        """
+        景品CSVの内容を書き込む
+        """
+        writer = csv.DictWriter(prizes_file, fieldnames=['管理No', '提供元', '景品名'])
+        writer.writeheader()
+        for prize in prizes:
+            writer.writerow({
+                '管理No': prize.id,
+                '提供元': prize.provider,
+                '景品名': prize.display_name
+                })
+
+
+    # === 当選者リスト ===
+
+    def load_winners(self, participants: Sequence[Participant], prizes: Sequence[Prize]) -> list[WinnerMapping]:
+        """
+        当選者CSVとジャーナル（winners.csvへ反映されていない操作）を読み込む
+        """
+        snapshot = self.__load_snapshot('winners')
+        if snapshot is not None:
+            print('既存の当選者リストを利用します（スナップショット）')
+            return [WinnerMapping._make(row) for row in snapshot]
+
+        # 景品ID -> 当選（挿入順＝当選順を保持）
+        winner_mappings: dict[str, WinnerMapping] = {}
+        if not path.exists(WINNERS_CSV_FILEPATH):
+            print('既存のwinners.csvはありません')
+        else:
+            print('既存のwinners.csvを利用します')
+            winners_file = open(WINNERS_CSV_FILEPATH, 'rt', newline='')
+            winners_reader = csv.DictReader(winners_file)
+            winners_return = parse_winners_csv(winners_reader, participants, prizes)
+            winners_file.close()
+            if winners_return['error']:
+                raise DataLoadError(winners_return['error'])
+            winner_mappings = {mapping.prize_id: mapping for mapping in winners_return['winner_mappings']}
+
+        if path.exists(WINNERS_JOURNAL_FILEPATH):
+            print('既存のwinners.journalを適用します')
+            self.__replay_journal(winner_mappings, {participant.registration_id for participant in participants}, {prize.id for prize in prizes})
+
+        self.__save_snapshot('winners', [tuple(mapping) for mapping in winner_mappings.values()])
+        return list(winner_mappings.values())
+
+    def __replay_journal(self, winner_mappings: dict[str, WinnerMapping], participant_ids: set[str], prize_ids: set[str]) -> None:
+        """
+        ジャーナルに記録された操作を当選者リストに適用する
+        書き込み途中で落ちた最終行（改行で終わらない行）は無視する
+        """
+        journal_file = open(WINNERS_JOURNAL_FILEPATH, 'rt', newline='')
+        lines = journal_file.read().split('\n')
+        journal_file.close()
+        # 最後の要素は正常終了時は空文字列、書き込み途中の場合は不完全な行
+        if lines[-1] != '':
+            print('winners.journalの最終行が不完全なため無視します')
+
+        for line_num, row in enumerate(csv.reader(lines[:-1])):
+            if len(row) == 0:
+                continue
+            if len(row) != 3 or row[0] not in ('SET', 'DELETE'):
+                raise DataLoadError(f'winners.journalに不正な行があります（{line_num + 1}行目）')
+            action, prize_id, participant_id = row
+            if prize_id not in prize_ids:
+                raise DataLoadError(f'winners.journalに存在しない景品IDが含まれてます（{prize_id}）')
+            if action == 'SET':
+                if participant_id not in participant_ids:
+                    raise DataLoadError(f'winners.journalに存在しない参加者受付番号が含まれてます（{participant_id}）')
+                # 上書きの場合も元の位置を維持する
+                winner_mappings[prize_id] = WinnerMapping(participant_id=participant_id, prize_id=prize_id)
+            else:
+                winner_mappings.pop(prize_id, None)
+
+    def replace_winners(self, winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        当選者CSVを書き出し、ジャーナルを空にする
+        winners.csvの置き換え後にジャーナルを消すため、その間に落ちても再適用で同じ結果になる
+        （ジャーナルの削除もディレクトリをfsyncして確定させ、落ちた後に古いジャーナルが新しいwinners.csvに適用されないようにする）
+        ジャーナルを消す前に書き出しを確定させる必要があるので、これのみexclusive()の中で確定まで待つ
+        """
+        winner_mappings = list(winner_mappings)
+        # 確定待ちの変更を先に書き出す
+        # （winners.csvの置き換え後に古い操作がジャーナルに追記されず、当選者が参照する参加者・景品リストが先に確定するように）
+        self.journal_committer.flush()
+        self.participants_committer.flush()
+        self.prizes_committer.flush()
+        self.winners_committer.submit(winner_mappings)
+        if path.exists(WINNERS_JOURNAL_FILEPATH):
+            os.remove(WINNERS_JOURNAL_FILEPATH)
+            fsync_directory(path.dirname(WINNERS_JOURNAL_FILEPATH) or '.')
+        self.__save_snapshot('winners', [tuple(mapping) for mapping in winner_mappings])
+
+    def apply_winner_mutations(self, mutations: list[tuple[str, str, str]], winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        ジャーナルが有効な場合は変更をジャーナルに追記するだけで済ませる（複数件でも1回の書き込み）
+        winners.csvへのまとめはここでは行わない（winners_compaction_due()を参照）
+        """
+        if not WINNERS_JOURNAL_ENABLED:
+            self.__submit(self.winners_committer, list(winner_mappings))
+            return
+
+        journal_lines = StringIO()
+        csv.writer(journal_lines, lineterminator='\n').writerows(mutations)
+        self.__submit(self.journal_committer, journal_lines.getvalue())
+
+    def winners_compaction_due(self) -> bool:
+        """
+        ジャーナルの操作数がWINNERS_JOURNAL_COMPACTION_THRESHOLDに達しているか
+        操作数は全プロセスで共通のジャーナル自体から数える（追記のみなので、exclusive()の外で呼んでもよい）
+        """
+        try:
+            with open(WINNERS_JOURNAL_FILEPATH, 'rb') as journal_file:
+                entry_count = journal_file.read().count(b'\n')
+        except FileNotFoundError:
+            return False
+        return entry_count >= WINNERS_JOURNAL_COMPACTION_THRESHOLD
+
+    def compact_winners(self, winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        ジャーナルがある場合はwinners.csvにまとめ、ジャーナルを空にする
+        """
+        if path.exists(WINNERS_JOURNAL_FILEPATH):
+            self.replace_winners(winner_mappings)
+
+    def __render_winners(self, winners_file: TextIO, winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        当選者CSVの内容を書き込む
+        """
+        writer = csv.DictWriter(winners_file, fieldnames=['景品ID', '当選者受付番号'])
+        writer.writeheader()
+        for mapping in winner_mappings:
+            writer.writerow({
+                '景品ID': mapping.prize_id,
+                '当選者受付番号': mapping.participant_id
+                })
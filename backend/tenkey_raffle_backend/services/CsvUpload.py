@@ -0,0 +1,34 @@
+import codecs
+import csv
+import io
+from csv import DictReader
+
+from werkzeug.datastructures import FileStorage
+
+
+# 文字コード判定に利用する先頭のバイト数
+ENCODING_DETECTION_BYTES = 64 * 1024
+
+
+# アップロードされたCSVの文字コードを判定する
+# BOM付きUTF-8、UTF-8、Shift_JIS（ConnpassのExcel向けCSV）に対応
+def detect_csv_encoding(head: bytes) -> str:
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # 先頭部分だけを見るので、途中で切れたマルチバイト文字はエラーにしない
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp932'
+
+
+# アップロードされたCSVを開く
+# ファイル全体を読み込まず、DictReaderで1行ずつ読み進める
+# ヘッダーはDictReader.fieldnamesの参照時に先頭行だけ読まれるので、列が足りない場合は本文を読まずに弾ける
+def open_uploaded_csv(uploaded_file: FileStorage) -> DictReader[str]:
+    stream = uploaded_file.stream
+    head = stream.read(ENCODING_DETECTION_BYTES)
+    stream.seek(0)
+    text_stream = io.TextIOWrapper(stream, encoding=detect_csv_encoding(head), newline='')
+    return csv.DictReader(text_stream)
@@ -0,0 +1,160 @@
+from random import Random
+
+from settings import DRAW_SEED
+from typedefs.FunctionReturnTypes import BulkDrawResult, DrawResult, RaffleModificationStatus
+from typedefs.RaffleDatatypes import Participant, WinnerMapping
+from services.ParticipantsManager import ParticipantsManager
+from services.PrizesManager import PrizesManager
+from services.RaffleManager import RaffleManager
+from util.IndexedPool import IndexedPool
+from util.WeightedPool import WeightedPool
+from util.SingletonMetaclass import Singleton
+from util.SharedState import SharedState
+from util.SeedableCsprng import create_draw_rng
+
+
+# Singletonなので、インスタンスは1つしか作成されない
+class DrawManager(metaclass=Singleton):
+
+    def __init__(self):
+        """
+        サーバー側で当選者を抽選する
+        """
+
+        # （既存の）管理クラスオブジェを呼び出す
+        self.participants_manager = ParticipantsManager()
+        self.prizes_manager = PrizesManager()
+        self.raffle_manager = RaffleManager()
+
+        # 抽選から記録までを1つのトランザクションとして排他する
+        # （抽選した参加者がその間に不参加になったり、景品が他で抽選されたりしないように）
+        self.shared_state = SharedState()
+
+        # 抽選用の乱数生成器（リクエストでシードが指定されない場合に利用する）
+        self.rng: Random = create_draw_rng(DRAW_SEED)
+
+        return
+
+
+    # === 抽選 ===
+
+    def get_eligible_pool(self, exclude_prior_winners: bool) -> IndexedPool[Participant]:
+        """
+        抽選対象の参加者プールを取得する
+        当日不参加・Connpass不参加は常に除外
+        プールは管理クラスのものをそのまま返すので、shared_state.exclusive()の中で利用すること
+
+        @param exclude_prior_winners: 既に当選した参加者を除外するかどうか
+            除外すると誰も残らない場合（参加者数 < 景品数）は全員を対象に戻す（フロントエンドの従来の動作と同じ）
+        """
+        if exclude_prior_winners:
+            unwon_pool = self.participants_manager.get_unwon_attending_participants()
+            if len(unwon_pool) > 0:
+                return unwon_pool
+        return self.participants_manager.get_attending_participants()
+
+    def get_eligible_weighted_pool(self, exclude_prior_winners: bool) -> WeightedPool[Participant]:
+        """
+        重み付き抽選の対象の参加者プールを取得する（get_eligible_pool()の重み付き版）
+        """
+        if exclude_prior_winners:
+            unwon_pool = self.participants_manager.get_weighted_unwon_attending_participants()
+            if unwon_pool.total_weight > 0:
+                return unwon_pool
+        return self.participants_manager.get_weighted_attending_participants()
+
+    def draw_winner(self, prize_id: str, exclude_prior_winners: bool, overwrite: bool, weighted: bool = False, rng: Random | None = None) -> DrawResult:
+        """
+        景品の当選者を抽選し、そのまま当選として記録する
+
+        @param exclude_prior_winners: 既に当選した参加者を除外するかどうか
+        @param overwrite: 景品に既存の当選者がいる場合、再抽選して上書きするかどうか
+        @param weighted: 参加者の「抽選重み」に比例した確率で抽選するかどうか
+        @param rng: この抽選のみに利用する乱数生成器（create_draw_rng(seed)で作成する、Noneの場合はself.rng）
+        """
+        rng = self.rng if rng is None else rng
+        with self.shared_state.exclusive():
+            if not self.prizes_manager.prize_exists(prize_id):
+                return {"status": RaffleModificationStatus.NONEXISTENT_PRIZE_ID, "winner_id": None}
+            if not overwrite and self.raffle_manager.get_winner_for_prize(prize_id) is not None:
+                return {"status": RaffleModificationStatus.NOT_OVERWRITING, "winner_id": None}
+
+            if weighted:
+                winner = self.get_eligible_weighted_pool(exclude_prior_winners).choice(rng)
+            else:
+                winner = self.get_eligible_pool(exclude_prior_winners).choice(rng)
+            if winner is None:
+                return {"status": RaffleModificationStatus.NO_ELIGIBLE_PARTICIPANTS, "winner_id": None}
+
+            status = self.raffle_manager.set_winner_for_prize(prize_id=prize_id, winner_id=winner.registration_id, overwrite=overwrite)
+            if status != RaffleModificationStatus.PROCESSED_SUCCESSFULLY:
+                return {"status": status, "winner_id": None}
+            return {"status": status, "winner_id": winner.registration_id}
+
+    def draw_all_remaining_prizes(self, one_win_per_person: bool, weighted: bool = False, rng: Random | None = None) -> BulkDrawResult:
+        """
+        未抽選の全景品の当選者をまとめて抽選し、1回の保存で記録する（事前抽選・リハーサル用）
+
+        @param one_win_per_person: 1人1景品までにするかどうか
+            Trueの場合は重複なしで抽選し、対象者が足りなくなった場合は全員を対象に戻して続ける
+            Falseの場合は景品ごとに会場に居る全員から抽選する
+        @param weighted: 参加者の「抽選重み」に比例した確率で抽選するかどうか
+        @param rng: この抽選のみに利用する乱数生成器（create_draw_rng(seed)で作成する、Noneの場合はself.rng）
+        """
+        rng = self.rng if rng is None else rng
+        with self.shared_state.exclusive():
+            prize_ids = self.raffle_manager.get_unraffled_prize_ids()
+            attending_pool = self.participants_manager.get_attending_participants()
+            if len(prize_ids) > 0 and len(attending_pool) == 0:
+                return {"status": RaffleModificationStatus.NO_ELIGIBLE_PARTICIPANTS, "winner_mappings": []}
+
+            winner_mappings: list[WinnerMapping] = []
+            if weighted:
+                winner_mappings = self.__draw_weighted_winners(prize_ids, one_win_per_person, rng)
+                if winner_mappings is None:
+                    return {"status": RaffleModificationStatus.NO_ELIGIBLE_PARTICIPANTS, "winner_mappings": []}
+            elif one_win_per_person:
+                remaining_prize_ids = prize_ids
+                pool = self.get_eligible_pool(exclude_prior_winners=True)
+                while len(remaining_prize_ids) > 0:
+                    winners = pool.sample(len(remaining_prize_ids), rng)
+                    winner_mappings += [
+                        WinnerMapping(participant_id=winner.registration_id, prize_id=prize_id)
+                        for prize_id, winner in zip(remaining_prize_ids, winners)
+                    ]
+                    remaining_prize_ids = remaining_prize_ids[len(winners):]
+                    # 全員に行き渡った場合は全員を対象に戻す
+                    pool = attending_pool
+            else:
+                for prize_id in prize_ids:
+                    winner = attending_pool.choice(rng)
+                    winner_mappings.append(WinnerMapping(participant_id=winner.registration_id, prize_id=prize_id))
+
+            status = self.raffle_manager.set_winners_for_prizes(winner_mappings)
+            if status != RaffleModificationStatus.PROCESSED_SUCCESSFULLY:
+                return {"status": status, "winner_mappings": []}
+            return {"status": status, "winner_mappings": winner_mappings}
+
+    def __draw_weighted_winners(self, prize_ids: list[str], one_win_per_person: bool, rng: Random) -> list[WinnerMapping] | None:
+        """
+        重み付きで景品ごとの当選者を抽選する（記録はしない）
+        1人1景品の場合はプールの複製から当選者を取り除きながら抽選する（1件あたりO(log n)）
+        重みの合計が0で抽選できない場合はNoneを返す
+        """
+        attending_pool = self.participants_manager.get_weighted_attending_participants()
+        pool = self.get_eligible_weighted_pool(exclude_prior_winners=one_win_per_person)
+        if one_win_per_person:
+            pool = pool.copy()
+
+        winner_mappings: list[WinnerMapping] = []
+        for prize_id in prize_ids:
+            if pool.total_weight <= 0:
+                # 全員に行き渡った場合は全員を対象に戻す
+                if attending_pool.total_weight <= 0:
+                    return None
+                pool = attending_pool.copy()
+            winner = pool.choice(rng)
+            winner_mappings.append(WinnerMapping(participant_id=winner.registration_id, prize_id=prize_id))
+            if one_win_per_person:
+                pool.remove(winner.registration_id)
+        return winner_mappings
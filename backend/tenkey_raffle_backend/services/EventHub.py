@@ -0,0 +1,242 @@
+from collections import deque
+from itertools import islice
+import json
+import os
+from secrets import token_hex
+from threading import Condition, Thread
+import time
+from typing import Any
+
+from settings import EVENT_HISTORY_SIZE, EVENT_LOG_FILEPATH, EVENT_LOG_POLL_SECONDS, EVENT_MAX_SUBSCRIBERS
+from typedefs.RaffleDatatypes import RaffleEvent, RaffleEventType
+from util.SingletonMetaclass import Singleton
+from util.SharedState import SharedState
+from util.DurableWrite import write_file_atomically
+
+
+# Singletonなので、（プロセスごとに）インスタンスは1つしか作成されない
+class EventHub(metaclass=Singleton):
+    
+    def __init__(self):
+        """
+        管理クラスの変更イベントを購読者（SSE接続）に配信する
+        
+        イベントは全プロセス（gunicornのworker）で共有するログファイル（settings.EVENT_LOG_FILEPATH）に追記し、
+        通し番号もログで共通にする（別のworkerに再接続しても、Last-Event-IDから再開できる）
+        各プロセスは1つの監視スレッドでログへの追記を確認し、他のプロセスのイベントも自分の購読者に配信する
+        
+        購読者ごとのキューは持たず、全購読者が共有の履歴を通し番号で読み進める
+        ただしSSEの応答はWSGI（gunicornのgthread worker）で返すので、接続中は1接続につきworkerのスレッドを1つ占有する
+        そのため同時接続数はプロセスごとにsettings.EVENT_MAX_SUBSCRIBERSまでとする（多数の画面には?since=・ETagのポーリングを使う）
+        """
+        
+        # 直近のイベント（古いものから捨てられる、通し番号は連続）
+        self.history: deque[RaffleEvent] = deque(maxlen=EVENT_HISTORY_SIZE)
+        # 最後に読み込んだイベントの通し番号
+        self.sequence = 0
+        self.condition = Condition()
+        
+        # ログファイルのID（作成ごとに異なる、通し番号と組み合わせてイベントIDにする）
+        self.log_id: str | None = None
+        # 読み込み中のログファイルのinodeと、読み込み済みの位置・イベント数
+        self.log_inode: int | None = None
+        self.log_offset = 0
+        self.log_event_count = 0
+        
+        # 接続中の購読者数（SSE接続は応答中ずっとworkerのスレッドを占有するので、上限を設ける）
+        self.subscriber_count = 0
+        self.watcher: Thread | None = None
+        
+        # 発行は全プロセスで排他して行う（ログの通し番号を重複させないため）
+        self.shared_state = SharedState()
+        
+        return
+    
+    
+    # === 発行 ===
+    
+    def publish(self, event_type: RaffleEventType, data: dict[str, Any] | None = None) -> None:
+        """
+        イベントを1件発行する
+        """
+        self.publish_all([(event_type, data or {})])
+    
+    def publish_all(self, events: list[tuple[RaffleEventType, dict[str, Any]]]) -> None:
+        """
+        複数のイベントをまとめて発行する（ログへの追記と、購読者を起こすのは1回のみ）
+        変更と同じexclusive()の中で呼ぶと、イベントの順序が変更の順序と一致する
+        """
+        if len(events) == 0:
+            return
+        with self.shared_state.exclusive(), self.condition:
+            self.__read_log()
+            published = []
+            for event_type, data in events:
+                self.sequence += 1
+                published.append(RaffleEvent(sequence=self.sequence, type=event_type, data=data))
+            lines = ''.join(self.__format_log_line(event) for event in published)
+            with open(EVENT_LOG_FILEPATH, 'at', encoding='utf-8') as log_file:
+                log_file.write(lines)
+            self.history.extend(published)
+            self.log_offset += len(lines.encode('utf-8'))
+            self.log_event_count += len(published)
+            # ログが長くなったら、保持する分のみに切り詰める
+            if self.log_event_count > 2 * EVENT_HISTORY_SIZE:
+                self.__rotate_log()
+            self.condition.notify_all()
+    
+    
+    # === 購読 ===
+    
+    def subscribe(self) -> bool:
+        """
+        購読者として登録する（上限（settings.EVENT_MAX_SUBSCRIBERS）に達している場合はFalse）
+        登録した場合は、切断時にunsubscribe()を呼ぶこと
+        """
+        with self.condition:
+            if self.subscriber_count >= EVENT_MAX_SUBSCRIBERS:
+                return False
+            self.subscriber_count += 1
+            if self.watcher is None:
+                self.watcher = Thread(target=self.__watch_log, name='EventHub-watcher', daemon=True)
+                self.watcher.start()
+            return True
+    
+    def unsubscribe(self) -> None:
+        with self.condition:
+            self.subscriber_count -= 1
+    
+    def get_latest_position(self) -> tuple[str, int]:
+        """
+        ログのIDと、最後に発行されたイベントの通し番号を返す
+        ログが作り直された場合は通し番号が1から始まるので、再開時はIDも合わせて指定する
+        """
+        with self.condition:
+            self.__read_log()
+            assert self.log_id is not None
+            return (self.log_id, self.sequence)
+    
+    def get_events_since(self, log_id: str, sequence: int) -> list[RaffleEvent] | None:
+        """
+        指定の通し番号より後のイベントを返す
+        履歴から既に消えている、または別のログの通し番号で再開できない場合はNoneを返す
+        """
+        with self.condition:
+            self.__read_log()
+            return self.__events_since(log_id, sequence)
+    
+    def wait_for_events(self, log_id: str, sequence: int, timeout: float) -> list[RaffleEvent] | None:
+        """
+        指定の通し番号より後のイベントが発行されるまで最大timeout秒待って返す
+        （他のプロセスのイベントは監視スレッドが読み込んだ時点で届く）
+        タイムアウトした場合は[]、再開できない場合はNoneを返す
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.log_id != log_id or self.sequence != sequence, timeout)
+            return self.__events_since(log_id, sequence)
+    
+    def __events_since(self, log_id: str, sequence: int) -> list[RaffleEvent] | None:
+        """
+        self.conditionを取得した状態で呼ぶこと
+        """
+        if log_id != self.log_id or sequence > self.sequence:
+            return None
+        if sequence == self.sequence:
+            return []
+        oldest_sequence = self.history[0].sequence if len(self.history) > 0 else self.sequence + 1
+        if sequence + 1 < oldest_sequence:
+            return None
+        # 通し番号は連続しているので、履歴内の位置を計算できる
+        start = sequence + 1 - oldest_sequence
+        return list(islice(self.history, start, None))
+    
+    
+    # === ログファイル ===
+    
+    def __watch_log(self) -> None:
+        """
+        他のプロセスがログに追記したイベントを読み込み、購読者を起こす（監視スレッド）
+        確認はstat()のみで、変わっていない場合はファイルを読まない
+        """
+        while True:
+            time.sleep(EVENT_LOG_POLL_SECONDS)
+            try:
+                stat = os.stat(EVENT_LOG_FILEPATH)
+            except FileNotFoundError:
+                continue
+            if stat.st_ino == self.log_inode and stat.st_size == self.log_offset:
+                continue
+            with self.condition:
+                position = (self.log_id, self.sequence)
+                self.__read_log()
+                if (self.log_id, self.sequence) != position:
+                    self.condition.notify_all()
+    
+    def __read_log(self) -> None:
+        """
+        ログの未読のイベントを履歴に加える（ログが無い場合は作成する）
+        self.conditionを取得した状態で呼ぶこと
+        """
+        self.__create_log_if_missing()
+        with open(EVENT_LOG_FILEPATH, 'rb') as log_file:
+            inode = os.fstat(log_file.fileno()).st_ino
+            if inode != self.log_inode:
+                # 作成又は切り詰められたログは最初から読む
+                header = json.loads(log_file.readline())
+                if header['log_id'] != self.log_id:
+                    # 別のログになった場合は通し番号が続かないので、履歴を捨てる
+                    self.log_id = header['log_id']
+                    self.history.clear()
+                    self.sequence = 0
+                self.log_inode = inode
+                self.log_offset = log_file.tell()
+                self.log_event_count = 0
+            log_file.seek(self.log_offset)
+            content = log_file.read()
+        
+        # 書き込み途中の最終行（改行で終わらない行）は次回読む
+        complete_length = content.rfind(b'\n') + 1
+        for line in content[:complete_length].splitlines():
+            entry = json.loads(line)
+            self.log_event_count += 1
+            if entry['sequence'] <= self.sequence:
+                continue
+            if entry['sequence'] != self.sequence + 1:
+                # 読み込む前に切り詰められたイベントがある場合は、途中から再開できないよう履歴を捨てる
+                self.history.clear()
+            self.sequence = entry['sequence']
+            self.history.append(RaffleEvent(sequence=entry['sequence'], type=RaffleEventType(entry['type']), data=entry['data']))
+        self.log_offset += complete_length
+    
+    def __create_log_if_missing(self) -> None:
+        """
+        ログが無い場合は、IDを書いたヘッダー行のみのログを作成する
+        複数のプロセスが同時に作成しても1つのみが残るよう、一時ファイルからハードリンクで作成する
+        """
+        if os.path.exists(EVENT_LOG_FILEPATH):
+            return
+        temp_filepath = f'{EVENT_LOG_FILEPATH}.{token_hex(4)}.tmp'
+        with open(temp_filepath, 'wt', encoding='utf-8') as temp_file:
+            temp_file.write(json.dumps({"log_id": token_hex(4)}) + '\n')
+        try:
+            os.link(temp_filepath, EVENT_LOG_FILEPATH)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_filepath)
+    
+    def __rotate_log(self) -> None:
+        """
+        ログを直近の履歴（EVENT_HISTORY_SIZE件）のみに置き換える（IDは維持する）
+        self.conditionとexclusive()を取得した状態で呼ぶこと
+        """
+        write_file_atomically(EVENT_LOG_FILEPATH, lambda log_file: log_file.write(
+            json.dumps({"log_id": self.log_id}) + '\n' + ''.join(self.__format_log_line(event) for event in self.history)
+        ))
+        # 置き換えたログを読み込み済みとして扱う
+        self.log_inode = os.stat(EVENT_LOG_FILEPATH).st_ino
+        self.log_offset = os.path.getsize(EVENT_LOG_FILEPATH)
+        self.log_event_count = len(self.history)
+    
+    def __format_log_line(self, event: RaffleEvent) -> str:
+        return json.dumps({"sequence": event.sequence, "type": event.type, "data": event.data}) + '\n'
@@ -1,12 +1,18 @@
 
-from os import path
-import csv
+from bisect import bisect_left
+from itertools import islice
 
-from settings import CANCELS_TXT_FILEPATH, PARTICIPANT_CSV_FILEPATH
-from typedefs.FunctionReturnTypes import AttendanceModificationStatus
+from settings import DRAW_WEIGHT_PRECISION, PRIOR_WINNER_WEIGHT_FACTOR, CHANGE_LOG_SIZE
+from typedefs.FunctionReturnTypes import AttendanceModificationStatus, BatchAttendanceModificationResult, ParticipantsPage
 from util.SingletonMetaclass import Singleton
-from typedefs.RaffleDatatypes import Participant
-from services.CsvParser import parse_participants_csv
+from util.StartupTimer import StartupTimer
+from util.IndexedPool import IndexedPool
+from util.WeightedPool import WeightedPool
+from util.ChangeLog import ChangeLog
+from util.SharedState import SharedState
+from typedefs.RaffleDatatypes import Participant, ParticipantFilter, RaffleEventType
+from services.EventHub import EventHub
+from services.StorageBackend import StorageBackend, get_storage_backend
 
 
 # Singletonなので、インスタンスは1つしか作成されない
@@ -14,57 +20,74 @@ class ParticipantsManager(metaclass=Singleton):
 
     def __init__(self):
         """
-        作成時に既存ファイルを読み込む
+        作成時に既存データを読み込む
         """
         
+        # 変更イベントの配信
+        self.event_hub = EventHub()
+        
+        # データのバージョン（参加者リスト・不参加リストの変更ごとに増える）
+        # 全プロセス共通の世代番号（参加者リスト + 不参加リスト）
+        self.version: int = 0
+        
         # 全参加者リスト（不参加含む）
-        self.all_participants: list[Participant] = []
+        # 受付番号をキーとしたdict（挿入順＝CSVの行順を保持）
+        self.all_participants: dict[str, Participant] = {}
+        
+        # CSVの行順の参加者・受付番号リストと、受付番号 -> 行順のIndex（ページ分割用）
+        # 参加者リスト変更時はself.__rebuild_participant_order()で再作成
+        # 変更せずに作り直すので、取得関数はコピーせずにそのまま返す
+        self.participant_order: tuple[Participant, ...] = ()
+        self.participant_ids: tuple[str, ...] = ()
+        self.participant_positions: dict[str, int] = {}
         
         # 当日不参加の受付番号リスト
-        self.cancels: list[str] = [] 
+        # 順序付きセットとしてdictのキーのみを利用（値は常にNone）
+        self.cancels: dict[str, None] = {}
+        # 取得関数用の当日不参加の受付番号リスト（変更時にNoneにし、次の取得時に作り直す）
+        self.cancel_ids: tuple[str, ...] | None = None
+        
+        # 差分同期用の不参加リストの変更履歴（受付番号 -> 追加されたらTrue、削除されたらFalse）
+        self.cancels_change_log: ChangeLog[bool] = ChangeLog(CHANGE_LOG_SIZE)
         
         # 会場に居る全参加者リスト（participants - Connpass不参加 - 当日不参加）
-        # self.__update_attending_participants()で更新
-        self.attending_participants: list[Participant] = []
-        
-        
-        # 参加者リスト読み込み
-        if not path.exists(PARTICIPANT_CSV_FILEPATH):
-            print('既存のparts.csvはありません')
-        else:
-            print('既存のparts.csvを利用します')
-            participants_file = open(PARTICIPANT_CSV_FILEPATH, 'rt', newline='')
-            participants_reader = csv.DictReader(participants_file)
-            participants_return = parse_participants_csv(participants_reader)
-            if participants_return['error']:
-                print(participants_return['error'])
-                exit(1)
-            self.all_participants = participants_return['participants']
-            participants_file.close()
-        
-        # 不参加リスト
-        if not path.exists(CANCELS_TXT_FILEPATH):
-            print('既存のcancels.txtはありません')
-        else:
-            print('既存のcancels.txtを利用します')
-            cancels_file = open(CANCELS_TXT_FILEPATH, 'rt')
-            entries = cancels_file.read().splitlines()
-            for line_num, line in enumerate(entries):
-                # キャンセルリストの読み込み
-                # 空欄はスキップ
-                if line == "" or line.isspace():
-                    continue
-                # 数字列の場合は受付番号として登録
-                elif line.isdigit():
-                    self.cancels.append(line)
-                # その他は弾く
-                else:
-                    print(f'cancels.txtに受付番号ではない行があります（"{line}"、{line_num}行目）')
-                    exit(1)
+        # 参加者リスト変更時はself.__rebuild_attending_participants()で再作成
+        # 不参加の追加・削除時は差分のみ更新する
+        self.attending_participants: IndexedPool[Participant] = IndexedPool()
+        
+        # 既に景品に当選した参加者の受付番号（RaffleManagerから更新される）
+        self.prior_winners: dict[str, None] = {}
         
-        # 読み込み完了
-        # self.attending_participantsを更新
-        self.__update_attending_participants()
+        # 会場に居て、まだ何も当選していない参加者リスト（attending_participants - prior_winners）
+        # attending_participantsと同時に更新する
+        self.unwon_attending_participants: IndexedPool[Participant] = IndexedPool()
+        
+        # 重み付き抽選用（上の2つと同じ参加者を、重み付きで保持する）
+        # weighted_attending_participantsでは既に当選した参加者の重みにPRIOR_WINNER_WEIGHT_FACTORを掛ける
+        self.weighted_attending_participants: WeightedPool[Participant] = WeightedPool()
+        self.weighted_unwon_attending_participants: WeightedPool[Participant] = WeightedPool()
+        
+        
+        # 他のプロセスと共有するデータの排他制御と変更検知
+        self.shared_state = SharedState()
+        
+        # データの読み込み（他のプロセスが書き込んだ場合は読み込み直す）
+        with self.shared_state.exclusive():
+            # データの保存先（settings.STORAGE_BACKEND）
+            self.storage: StorageBackend = get_storage_backend()
+            participants_generation = self.shared_state.register('participants', self.reload_participants)
+            cancels_generation = self.shared_state.register('cancels', self.reload_cancels)
+            # 起動時の所要時間を記録する（読み込み・確認と、索引の作成）
+            with StartupTimer().measure('load:participants'):
+                self.__load_participants()
+            with StartupTimer().measure('load:cancels'):
+                self.__load_cancels()
+            self.version = participants_generation + cancels_generation
+        
+        # self.participant_order・self.attending_participantsを作成
+        with StartupTimer().measure('index:participants'):
+            self.__rebuild_participant_order()
+            self.__rebuild_attending_participants()
         
         # Done
         return
@@ -72,67 +95,250 @@ class ParticipantsManager(metaclass=Singleton):
     
     # === データ・ファイル管理関数 ===
     
-    def __update_attending_participants(self) -> None:
+    def __load_participants(self) -> None:
+        """
+        参加者リストを保存先から読み込む
+        """
+        self.all_participants = {participant.registration_id: participant for participant in self.storage.load_participants()}
+    
+    def __load_cancels(self) -> None:
+        """
+        不参加リストを保存先から読み込む
+        """
+        self.cancels = {self.__canonical_id(id): None for id in self.storage.load_cancels()}
+        self.cancel_ids = None
+    
+    def reload_participants(self, generation: int) -> None:
+        """
+        他のプロセスが書き込んだ参加者リストを読み込み直す（SharedStateから呼ばれる）
+        """
+        self.__load_participants()
+        self.__rebuild_participant_order()
+        self.__rebuild_attending_participants()
+        self.version = generation + self.shared_state.get_generation('cancels')
+    
+    def reload_cancels(self, generation: int) -> None:
+        """
+        他のプロセスが書き込んだ不参加リストを読み込み直す（SharedStateから呼ばれる）
+        読み込み前後の差分を変更履歴に記録する（他のプロセスの変更も差分同期で返せるように）
+        プールは作り直さず、add_cancels()・remove_cancels()と同じく変わった参加者のみを更新する
+        """
+        previous_cancels = self.cancels
+        self.__load_cancels()
+        changes = [(id, True) for id in self.cancels if id not in previous_cancels]
+        changes.extend((id, False) for id in previous_cancels if id not in self.cancels)
+        for id, cancelled in changes:
+            # 参加者リストの置き換え前に登録された不参加IDは存在しない場合がある
+            if not self.participant_exists(id):
+                continue
+            if cancelled:
+                self.__mark_not_attending(id)
+            else:
+                self.__mark_attending(id)
+        self.version = self.shared_state.get_generation('participants') + generation
+        self.cancels_change_log.record(self.version, changes)
+    
+    def __rebuild_participant_order(self) -> None:
         """
-        会場に居る参加者リスト（self.attending_participants）を更新  
-        参加者リスト又は不参加リストが更新された際は必ず呼ぶべき
+        参加者の並び（self.participant_order）を再作成
+        参加者リストが置き換えられた際は必ず呼ぶべき
         """
-        self.attending_participants = [participant for participant in self.all_participants 
-                if participant.connpass_attending and
-                   participant.registration_id not in self.cancels
-                ]
+        self.participant_order = tuple(self.all_participants.values())
+        self.participant_ids = tuple(self.all_participants.keys())
+        self.participant_positions = {participant.registration_id: index for index, participant in enumerate(self.participant_order)}
+    
+    def __rebuild_attending_participants(self) -> None:
+        """
+        会場に居る参加者リスト（self.attending_participants）を再作成  
+        参加者リストが置き換えられた際は必ず呼ぶべき
+        """
+        # 1件ずつ追加せず、各プールをまとめて作り直す（参加者数が多い場合の起動時間のため）
+        # プールは参加者を行番号（self.participant_orderのIndex）で持つので、先にself.__rebuild_participant_order()を呼ぶこと
+        attending = [row_number for row_number, participant in enumerate(self.participant_order) if participant.connpass_attending and participant.registration_id not in self.cancels]
+        unwon_attending = [row_number for row_number in attending if self.participant_ids[row_number] not in self.prior_winners]
+        self.attending_participants.reset(self.participant_order, self.participant_positions, attending)
+        self.unwon_attending_participants.reset(self.participant_order, self.participant_positions, unwon_attending)
+        self.weighted_attending_participants.reset(self.participant_order, self.participant_positions, [
+            (row_number, self.__draw_weight(self.participant_order[row_number], self.participant_ids[row_number] in self.prior_winners))
+            for row_number in attending
+        ])
+        self.weighted_unwon_attending_participants.reset(self.participant_order, self.participant_positions, [
+            (row_number, self.__draw_weight(self.participant_order[row_number], False))
+            for row_number in unwon_attending
+        ])
+    
+    def __canonical_id(self, id: str) -> str:
+        """
+        参加者リストの受付番号と同じ文字列オブジェクトを返す（存在しない場合はそのまま）
+        リクエストやファイルから読んだ受付番号を保持する前に通し、同じ受付番号を別々の文字列として保持しないようにする
+        """
+        participant = self.all_participants.get(id)
+        return participant.registration_id if participant is not None else id
+    
+    def __draw_weight(self, participant: Participant, prior_winner: bool) -> int:
+        """
+        重み付き抽選用の整数の重みを計算する
+        """
+        weight = participant.weight * (PRIOR_WINNER_WEIGHT_FACTOR if prior_winner else 1.0)
+        return round(weight * DRAW_WEIGHT_PRECISION)
+    
+    def __add_to_attending_pools(self, participant: Participant) -> None:
+        """
+        参加者を会場に居る参加者の各プールに追加する
+        """
+        id = participant.registration_id
+        prior_winner = id in self.prior_winners
+        self.attending_participants.add(id)
+        self.weighted_attending_participants.add(id, self.__draw_weight(participant, prior_winner))
+        if not prior_winner:
+            self.unwon_attending_participants.add(id)
+            self.weighted_unwon_attending_participants.add(id, self.__draw_weight(participant, False))
+    
+    def __mark_attending(self, id: str) -> None:
+        """
+        不参加から外れた参加者を会場に居る参加者リストに戻す  
+        Connpass上不参加の場合は何もしない
+        """
+        participant = self.all_participants[id]
+        if participant.connpass_attending:
+            self.__add_to_attending_pools(participant)
+    
+    def __mark_not_attending(self, id: str) -> None:
+        """
+        不参加になった参加者を会場に居る参加者リストから外す
+        """
+        self.attending_participants.remove(id)
+        self.unwon_attending_participants.remove(id)
+        self.weighted_attending_participants.remove(id)
+        self.weighted_unwon_attending_participants.remove(id)
         
     def __write_participants(self) -> None:
         """
-        ローカル保管の参加者CSVを書き出す
+        参加者リストを保存先に書き出す
         self.all_participantsを変更後に必ず行うべき
         """
-        participants_file = open(PARTICIPANT_CSV_FILEPATH, 'wt', newline='')
-        writer = csv.DictWriter(participants_file, fieldnames=['ユーザー名', '表示名', '参加ステータス', '受付番号'])
-        writer.writeheader()
-        for participant in self.all_participants:
-            writer.writerow({
-                'ユーザー名': participant.username, 
-                '表示名': participant.display_name, 
-                '参加ステータス': '参加' if participant.connpass_attending else '参加キャンセル', 
-                '受付番号': participant.registration_id
-            })
-        participants_file.close()
-        
+        with self.shared_state.exclusive():
+            self.version = self.shared_state.bump_generation('participants') + self.shared_state.get_generation('cancels')
+            self.storage.replace_participants(self.all_participants.values())
     
-    def __write_cancels(self) -> None:
+    def __write_cancels(self, changes: list[tuple[str, bool]] | None) -> None:
         """
-        当日不参加リストを書き出す
+        当日不参加リストを保存先に書き出す
         self.cancelsを変更後に必ず行うべき
+        
+        @param changes: 変更（受付番号, 追加されたか）のリスト、リスト全体が置き換えられた場合はNone
         """
-        cancels_file = open(CANCELS_TXT_FILEPATH, 'wt')
-        for entry in self.cancels:
-            cancels_file.write(f"{entry}\n")
-        cancels_file.close()
+        with self.shared_state.exclusive():
+            self.cancel_ids = None
+            version = self.shared_state.get_generation('participants') + self.shared_state.bump_generation('cancels')
+            # 変更履歴はバージョンを上げる前に記録する（バージョンを読んだ後に履歴を読めば取りこぼさない）
+            if changes is None:
+                self.cancels_change_log.reset(version)
+            else:
+                self.cancels_change_log.record(version, changes)
+            self.version = version
+            if changes is None:
+                self.storage.replace_cancels(self.cancels.keys())
+            else:
+                self.storage.apply_cancel_changes(changes, self.cancels.keys())
     
     
     # === 参加者情報取得 ===
     
-    def get_all_participants(self) -> list[Participant]:
+    def get_version(self) -> int:
+        """
+        データのバージョンを取得（参加者リスト・不参加リストが変更されるたびに増える）
+        """
+        return self.version
+    
+    def get_all_participants(self) -> tuple[Participant, ...]:
         """
         参加者リストを取得（不参加を含む）
+        変更時は作り直すので、コピーせずに返す
         """
-        return self.all_participants
+        return self.participant_order
     
-    def get_all_participant_ids(self) -> list[str]:
+    def get_all_participant_ids(self) -> tuple[str, ...]:
         """
         全参加者のIDだけを取得
+        変更時は作り直すので、コピーせずに返す
         """
-        return [participant.registration_id for participant in self.all_participants]
+        return self.participant_ids
     
     def get_participant_by_id(self, id: str) -> Participant | None:
         """
         参加者をIDから取得（存在しない場合はNone）
         """
-        return next(
-            (participant for participant in self.all_participants if participant.registration_id == id),
-            None
-        )
+        return self.all_participants.get(id)
+    
+    def get_attending_participants(self) -> IndexedPool[Participant]:
+        """
+        会場に居る参加者リストを取得
+        ランダムアクセス可能なプールを返すので、呼び出し側で編集しないこと
+        """
+        return self.attending_participants
+    
+    def get_unwon_attending_participants(self) -> IndexedPool[Participant]:
+        """
+        会場に居て、まだ何も当選していない参加者リストを取得
+        ランダムアクセス可能なプールを返すので、呼び出し側で編集しないこと
+        """
+        return self.unwon_attending_participants
+    
+    def get_weighted_attending_participants(self) -> WeightedPool[Participant]:
+        """
+        会場に居る参加者の重み付きプールを取得（既に当選した参加者はPRIOR_WINNER_WEIGHT_FACTOR倍の重み）
+        呼び出し側で編集しないこと
+        """
+        return self.weighted_attending_participants
+    
+    def get_weighted_unwon_attending_participants(self) -> WeightedPool[Participant]:
+        """
+        会場に居て、まだ何も当選していない参加者の重み付きプールを取得
+        呼び出し側で編集しないこと
+        """
+        return self.weighted_unwon_attending_participants
+
+    def get_participants_page(self, filter: ParticipantFilter, after_id: str | None, limit: int) -> ParticipantsPage | None:
+        """
+        条件に合う参加者をCSVの行順にlimit件まで取得する（カーソル方式のページ分割）
+        
+        @param after_id: 前のページの最後の参加者の受付番号（最初のページの場合はNone）
+            存在しない受付番号の場合（参加者リストが置き換えられた等）はNoneを返す
+        """
+        with self.shared_state.shared():
+            start = 0
+            if after_id is not None:
+                if after_id not in self.participant_positions:
+                    return None
+                start = self.participant_positions[after_id] + 1
+            
+            page: list[Participant] = []
+            if filter in (ParticipantFilter.WINNERS, ParticipantFilter.CANCELLED):
+                # 当選者・当日不参加者は少ないので、該当する参加者の位置だけを並べて探す
+                ids = self.prior_winners if filter == ParticipantFilter.WINNERS else self.cancels
+                positions = sorted(self.participant_positions[id] for id in ids if id in self.participant_positions)
+                for position in positions[bisect_left(positions, start):][:limit]:
+                    page.append(self.participant_order[position])
+            else:
+                for participant in islice(self.participant_order, start, None):
+                    if len(page) >= limit:
+                        break
+                    if filter == ParticipantFilter.ATTENDING and participant.registration_id not in self.attending_participants:
+                        continue
+                    if filter == ParticipantFilter.NOT_ATTENDING and participant.registration_id in self.attending_participants:
+                        continue
+                    page.append(participant)
+            
+            # 件数が足りている場合は続きがあるかもしれないので、最後の参加者をカーソルとして返す
+            next_cursor = page[-1].registration_id if len(page) >= limit else None
+            return {"participants": page, "next_cursor": next_cursor}
+    
+    def participant_exists(self, id: str) -> bool:
+        """
+        参加者IDが存在するかを確認
+        """
+        return id in self.all_participants
     
     
     # === 参加者情報編集 ===
@@ -141,65 +347,178 @@ class ParticipantsManager(metaclass=Singleton):
         """
         新たな参加者リストを読み込み・置き換え
         """
-        self.all_participants = new_participants
-        self.__write_participants()
-        self.__update_attending_participants()
-        return
+        with self.shared_state.exclusive():
+            self.all_participants = {participant.registration_id: participant for participant in new_participants}
+            self.__write_participants()
+            self.__rebuild_participant_order()
+            self.__rebuild_attending_participants()
+            self.event_hub.publish(RaffleEventType.PARTICIPANTS_IMPORTED, {"count": len(self.all_participants)})
+            return
     
     def wipe_participants_list(self) -> None:
         """
         参加者リストの削除
         """
-        self.all_participants = []
-        self.__write_participants()
-        self.__update_attending_participants()
-        return
+        with self.shared_state.exclusive():
+            self.all_participants = {}
+            self.__write_participants()
+            self.__rebuild_participant_order()
+            self.__rebuild_attending_participants()
+            self.event_hub.publish(RaffleEventType.PARTICIPANTS_IMPORTED, {"count": 0})
+            return
         
         
+    # === 当選者の管理（RaffleManagerから呼ばれる） ===
+    
+    def mark_prior_winner(self, id: str) -> None:
+        """
+        参加者が初めて景品に当選した際に呼ぶ
+        """
+        with self.shared_state.exclusive():
+            self.prior_winners[id] = None
+            self.unwon_attending_participants.remove(id)
+            self.weighted_unwon_attending_participants.remove(id)
+            if id in self.weighted_attending_participants:
+                self.weighted_attending_participants.set_weight(id, self.__draw_weight(self.all_participants[id], True))
+    
+    def unmark_prior_winner(self, id: str) -> None:
+        """
+        参加者の当選が全て取り消された際に呼ぶ
+        """
+        with self.shared_state.exclusive():
+            self.prior_winners.pop(id, None)
+            if id in self.attending_participants:
+                participant = self.all_participants[id]
+                self.unwon_attending_participants.add(id)
+                self.weighted_unwon_attending_participants.add(id, self.__draw_weight(participant, False))
+                self.weighted_attending_participants.set_weight(id, self.__draw_weight(participant, False))
+    
+    def reset_prior_winners(self, ids: list[str]) -> None:
+        """
+        当選者リストが置き換えられた際に呼ぶ
+        プールは作り直さず、当選者が変わった参加者のみを更新する（起動時・読み込み直し時は大半の参加者が変わらないため）
+        """
+        with self.shared_state.exclusive():
+            new_prior_winners = {id: None for id in ids}
+            for id in [id for id in self.prior_winners if id not in new_prior_winners]:
+                self.unmark_prior_winner(id)
+            for id in new_prior_winners:
+                if id not in self.prior_winners:
+                    self.mark_prior_winner(id)
+            self.prior_winners = new_prior_winners
+    
+    
     # === キャンセル（当日不参加）管理 ===
     
-    def get_all_cancel_ids(self) -> list[str]:
+    def get_all_cancel_ids(self) -> tuple[str, ...]:
         """
         全ての当日不参加者のIDを取得
+        変更されるまでは同じタプルを返す
+        """
+        with self.shared_state.shared():
+            cancel_ids = self.cancel_ids
+            if cancel_ids is None:
+                cancel_ids = tuple(self.cancels.keys())
+                self.cancel_ids = cancel_ids
+            return cancel_ids
+    
+    def get_cancel_changes_since(self, version: int) -> dict[str, bool] | None:
+        """
+        指定のバージョンより後に変更された受付番号と、不参加リストに追加されたか（削除された場合はFalse）を返す
+        変更履歴が足りない場合はNoneを返す
         """
-        return self.cancels
+        return self.cancels_change_log.changes_since(version)
     
     def add_cancel(self, id: str) -> AttendanceModificationStatus:
         """
         当日不参加リストにIDを追加する
         """
         
-        if not self.get_participant_by_id(id):
-            return AttendanceModificationStatus.NONEXISTENT_ID
-        if id in self.cancels:
-            return AttendanceModificationStatus.ALREADY_PROCESSED
-        else:
-            self.cancels.append(id)
-            self.__write_cancels()
-            self.__update_attending_participants()
-            return AttendanceModificationStatus.PROCESSED_SUCCESSFULLY
+        with self.shared_state.exclusive():
+            if not self.participant_exists(id):
+                return AttendanceModificationStatus.NONEXISTENT_ID
+            if id in self.cancels:
+                return AttendanceModificationStatus.ALREADY_PROCESSED
+            else:
+                self.cancels[self.__canonical_id(id)] = None
+                self.__write_cancels([(id, True)])
+                self.__mark_not_attending(id)
+                self.event_hub.publish(RaffleEventType.CANCEL_ADDED, {"participant_id": id})
+                return AttendanceModificationStatus.PROCESSED_SUCCESSFULLY
         
     def remove_cancel(self, id: str) -> AttendanceModificationStatus:
         """
         当日不参加リストからIDを削除する
         """
         
-        if not self.get_participant_by_id(id):
-            return AttendanceModificationStatus.NONEXISTENT_ID
-        if id not in self.cancels:
-            return AttendanceModificationStatus.ALREADY_PROCESSED
-        else:
-            self.cancels.remove(id)
-            self.__write_cancels()
-            self.__update_attending_participants()
-            return AttendanceModificationStatus.PROCESSED_SUCCESSFULLY
+        with self.shared_state.exclusive():
+            if not self.participant_exists(id):
+                return AttendanceModificationStatus.NONEXISTENT_ID
+            if id not in self.cancels:
+                return AttendanceModificationStatus.ALREADY_PROCESSED
+            else:
+                del self.cancels[id]
+                self.__write_cancels([(id, False)])
+                self.__mark_attending(id)
+                self.event_hub.publish(RaffleEventType.CANCEL_REMOVED, {"participant_id": id})
+                return AttendanceModificationStatus.PROCESSED_SUCCESSFULLY
+        
+    def add_cancels(self, ids: list[str]) -> BatchAttendanceModificationResult:
+        """
+        当日不参加リストに複数のIDをまとめて追加する  
+        ファイルの書き出しは最後に1回のみ行う
+        """
+        with self.shared_state.exclusive():
+            result: BatchAttendanceModificationResult = {"success": [], "skipped": [], "nonexistent_ids": []}
+            for id in ids:
+                if not self.participant_exists(id):
+                    result['nonexistent_ids'].append(id)
+                elif id in self.cancels:
+                    result['skipped'].append(id)
+                else:
+                    self.cancels[self.__canonical_id(id)] = None
+                    self.__mark_not_attending(id)
+                    result['success'].append(id)
+            
+            if len(result['success']) > 0:
+                self.__write_cancels([(id, True) for id in result['success']])
+                self.event_hub.publish_all([(RaffleEventType.CANCEL_ADDED, {"participant_id": id}) for id in result['success']])
+            return result
+    
+    def remove_cancels(self, ids: list[str]) -> BatchAttendanceModificationResult:
+        """
+        当日不参加リストから複数のIDをまとめて削除する  
+        ファイルの書き出しは最後に1回のみ行う
+        """
+        with self.shared_state.exclusive():
+            result: BatchAttendanceModificationResult = {"success": [], "skipped": [], "nonexistent_ids": []}
+            for id in ids:
+                if not self.participant_exists(id):
+                    result['nonexistent_ids'].append(id)
+                elif id not in self.cancels:
+                    result['skipped'].append(id)
+                else:
+                    del self.cancels[id]
+                    self.__mark_attending(id)
+                    result['success'].append(id)
+            
+            if len(result['success']) > 0:
+                self.__write_cancels([(id, False) for id in result['success']])
+                self.event_hub.publish_all([(RaffleEventType.CANCEL_REMOVED, {"participant_id": id}) for id in result['success']])
+            return result
         
     def wipe_cancels(self) -> None:
         """
         当日不参加IDリストをリセット
         """
-        self.cancels = []
-        self.__write_cancels()
-        self.__update_attending_participants()
-        return
+        with self.shared_state.exclusive():
+            previous_cancels = self.cancels
+            self.cancels = {}
+            self.__write_cancels(None)
+            for id in previous_cancels:
+                # 参加者リストの置き換え前に登録された不参加IDは存在しない場合がある
+                if self.participant_exists(id):
+                    self.__mark_attending(id)
+            self.event_hub.publish(RaffleEventType.CANCELS_WIPED)
+            return
     
\ No newline at end of file
@@ -1,11 +1,12 @@
 
-from os import path
-import csv
+from typing import Iterable
 
-from settings import PRIZES_CSV_FILEPATH
 from util.SingletonMetaclass import Singleton
-from typedefs.RaffleDatatypes import Prize
-from services.CsvParser import parse_prizes_csv
+from util.SharedState import SharedState
+from util.StartupTimer import StartupTimer
+from typedefs.RaffleDatatypes import Prize, PrizeGroup, PrizeGroupKey, RaffleEventType
+from services.EventHub import EventHub
+from services.StorageBackend import StorageBackend, get_storage_backend
 
 
 # Singletonなので、インスタンスは1つしか作成されない
@@ -13,70 +14,139 @@ class PrizesManager(metaclass=Singleton):
 
     def __init__(self):
         """
-        作成時に既存ファイルを読み込む
+        作成時に既存データを読み込む
         """
         
+        # 変更イベントの配信
+        self.event_hub = EventHub()
+        
+        # データのバージョン（景品リストの変更ごとに増える）
+        # 全プロセス共通の世代番号
+        self.version: int = 0
+        
         # 景品リスト
-        self.prizes: list[Prize] = []
+        # 景品IDをキーとしたdict（挿入順＝CSVの行順を保持）
+        self.prizes: dict[str, Prize] = {}
         
-        # 景品リスト読み込み
-        if not path.exists(PRIZES_CSV_FILEPATH):
-            print('既存のprizes.csvはありません')
-        else:
-            print('既存のprizes.csvを利用します')
-            prizes_file = open(PRIZES_CSV_FILEPATH, 'rt', newline='')
-            prizes_reader = csv.DictReader(prizes_file)
-            prizes_return = parse_prizes_csv(prizes_reader)
-            if prizes_return['error']:
-                print(prizes_return['error'])
-                exit(1)
-            self.prizes = prizes_return['prizes']
-            prizes_file.close()
+        # 景品の一覧と景品グループの索引
+        # self.__rebuild_group_index()で更新
+        # 変更せずに作り直すので、取得関数はコピーせずにそのまま返す
+        # CSVの行順の景品・景品IDリスト
+        self.prize_order: tuple[Prize, ...] = ()
+        self.prize_ids: tuple[str, ...] = ()
+        # グループキー -> 景品IDリスト（CSVの行順）
+        self.prize_groups: dict[PrizeGroupKey, tuple[str, ...]] = {}
+        # 景品ID -> グループキー（同じグループの景品は同じタプルを共有する）
+        self.group_key_by_prize: dict[str, PrizeGroupKey] = {}
+        # 全景品グループ
+        self.all_prize_groups: tuple[PrizeGroup, ...] = ()
+        
+        # 他のプロセスと共有するデータの排他制御と変更検知
+        self.shared_state = SharedState()
+        
+        # 景品リスト読み込み（他のプロセスが書き込んだ場合は読み込み直す）
+        with self.shared_state.exclusive():
+            # データの保存先（settings.STORAGE_BACKEND）
+            self.storage: StorageBackend = get_storage_backend()
+            self.version = self.shared_state.register('prizes', self.reload_prizes)
+            # 起動時の所要時間を記録する（読み込み・確認と、索引の作成）
+            with StartupTimer().measure('load:prizes'):
+                self.__load_prizes()
         
         # 読み込み完了
+        # 景品グループの索引を作成
+        with StartupTimer().measure('index:prizes'):
+            self.__rebuild_group_index()
         return
     
-    # === ファイル管理関数 ===
+    # === データ・ファイル管理関数 ===
+    
+    def __load_prizes(self) -> None:
+        """
+        景品リストを保存先から読み込む
+        """
+        self.prizes = self.__index_prizes(self.storage.load_prizes())
+    
+    def __index_prizes(self, prizes: Iterable[Prize]) -> dict[str, Prize]:
+        """
+        景品IDをキーとしたdictを作成する
+        同じ景品名・提供元の景品が多いので、同じ値は1つの文字列オブジェクトを共有させる
+        """
+        strings: dict[str, str] = {}
+        return {
+            prize.id: prize._replace(provider=strings.setdefault(prize.provider, prize.provider), display_name=strings.setdefault(prize.display_name, prize.display_name))
+            for prize in prizes
+        }
+    
+    def reload_prizes(self, generation: int) -> None:
+        """
+        他のプロセスが書き込んだ景品リストを読み込み直す（SharedStateから呼ばれる）
+        """
+        self.__load_prizes()
+        self.__rebuild_group_index()
+        self.version = generation
+    
+    def __rebuild_group_index(self) -> None:
+        """
+        景品の一覧と景品グループの索引を作り直す  
+        self.prizesを変更後に必ず行うべき
+        """
+        self.prize_order = tuple(self.prizes.values())
+        self.prize_ids = tuple(self.prizes.keys())
+        prize_groups: dict[PrizeGroupKey, list[str]] = {}
+        for prize in self.prize_order:
+            prize_groups.setdefault((prize.display_name, prize.provider), []).append(prize.id)
+        self.prize_groups = {group_key: tuple(prize_ids) for group_key, prize_ids in prize_groups.items()}
+        self.group_key_by_prize = {prize_id: group_key for group_key, prize_ids in self.prize_groups.items() for prize_id in prize_ids}
+        self.all_prize_groups = tuple(
+            PrizeGroup(display_name=display_name, provider=provider, prize_ids=prize_ids)
+            for (display_name, provider), prize_ids in self.prize_groups.items()
+        )
+    
     def __write_prizes(self) -> None:
         """
-        ローカル保管の景品CSVを書き出す
+        景品リストを保存先に書き出す
         self.prizesを変更後に必ず行うべき
         """
-        prizes_file = open(PRIZES_CSV_FILEPATH, 'wt', newline='')
-        writer = csv.DictWriter(prizes_file, fieldnames=['管理No', '提供元', '景品名'])
-        writer.writeheader()
-        for prize in self.prizes:
-            writer.writerow({
-                '管理No': prize.id, 
-                '提供元': prize.provider, 
-                '景品名': prize.display_name
-                })
-        prizes_file.close()
+        with self.shared_state.exclusive():
+            self.version = self.shared_state.bump_generation('prizes')
+            self.storage.replace_prizes(self.prizes.values())
     
     
     # === 景品情報取得 ===
+    
+    def get_version(self) -> int:
+        """
+        データのバージョンを取得（景品リストが変更されるたびに増える）
+        """
+        return self.version
         
-    def get_all_prizes(self) -> list[Prize]:
+    def get_all_prizes(self) -> tuple[Prize, ...]:
         """
         全景品リストを取得
+        変更時は作り直すので、コピーせずに返す
         """
-        return self.prizes
+        return self.prize_order
     
-    def get_all_prize_ids(self) -> list[str]:
+    def get_all_prize_ids(self) -> tuple[str, ...]:
         """
         全景品IDを取得
+        変更時は作り直すので、コピーせずに返す
         """
-        return [prize.id for prize in self.prizes]
+        return self.prize_ids
     
     def get_prize_by_id(self, id: str) -> Prize | None:
         """
         景品をIDで取得  
         存在しない場合はNoneを返す
         """
-        return next(
-            (prize for prize in self.prizes if prize.id == id),
-            None
-        )
+        return self.prizes.get(id)
+    
+    def prize_exists(self, id: str) -> bool:
+        """
+        景品IDが存在するかを確認
+        """
+        return id in self.prizes
         
     def get_prize_group(self, prize_id: str) -> list[str] | None:
         """
@@ -84,32 +154,58 @@ class PrizesManager(metaclass=Singleton):
         グループが存在しない場合又は[]を返す
         景品自体が存在しない場合はNoneを返す  
         """
-        lookup_prize = self.get_prize_by_id(prize_id)
-        if not lookup_prize:
+        group_key = self.group_key_by_prize.get(prize_id)
+        if group_key is None:
             return None
-        prize_group = [prize.id for prize in self.prizes if (prize.display_name == lookup_prize.display_name and prize.provider == lookup_prize.provider)]
+        prize_group = self.prize_groups[group_key]
         # prize_groupの景品が1つより多い場合は返す
         if len(prize_group) > 1:
-            return prize_group
+            return list(prize_group)
         # そうでない場合はGroupは存在しないので返さない
         else:
             return []
     
+    def get_prize_group_key(self, prize_id: str) -> PrizeGroupKey | None:
+        """
+        景品のグループキーを取得  
+        景品が存在しない場合はNoneを返す
+        """
+        return self.group_key_by_prize.get(prize_id)
+    
+    def get_prize_ids_in_group(self, group_key: PrizeGroupKey) -> tuple[str, ...]:
+        """
+        グループキーに含まれる景品IDリストを取得（1つのみの場合も含む）  
+        """
+        return self.prize_groups.get(group_key, ())
+    
+    def get_all_prize_groups(self) -> tuple[PrizeGroup, ...]:
+        """
+        全景品グループを取得（景品が1つのみのグループも含む）
+        変更時は作り直すので、コピーせずに返す
+        """
+        return self.all_prize_groups
+    
     # === 景品情報編集 ===
     
     def import_new_prizes_list(self, new_prizes: list[Prize]) -> None:
         """
         新たな景品リストを読み込み・置き換え
         """
-        self.prizes = new_prizes
-        self.__write_prizes()
-        return
+        with self.shared_state.exclusive():
+            self.prizes = self.__index_prizes(new_prizes)
+            self.__rebuild_group_index()
+            self.__write_prizes()
+            self.event_hub.publish(RaffleEventType.PRIZES_IMPORTED, {"count": len(self.prizes)})
+            return
     
     def wipe_prizes_list(self) -> None:
         """
         景品リストの削除
         """
-        self.prizes = []
-        self.__write_prizes()
-        return
+        with self.shared_state.exclusive():
+            self.prizes = {}
+            self.__rebuild_group_index()
+            self.__write_prizes()
+            self.event_hub.publish(RaffleEventType.PRIZES_IMPORTED, {"count": 0})
+            return
     
\ No newline at end of file
@@ -1,14 +1,18 @@
+import threading
+import traceback
+from typing import Iterable
 
-from os import path
-import csv
-
-from settings import WINNERS_CSV_FILEPATH
+from settings import CHANGE_LOG_SIZE
 from typedefs.FunctionReturnTypes import RaffleModificationStatus
-from typedefs.RaffleDatatypes import Participant, Prize, WinnerMapping
+from typedefs.RaffleDatatypes import Participant, Prize, PrizeGroupKey, PrizeGroupProgress, RaffleEventType, WinnerMapping
+from services.EventHub import EventHub
 from services.PrizesManager import PrizesManager
 from services.ParticipantsManager import ParticipantsManager
+from services.StorageBackend import StorageBackend, get_storage_backend
 from util.SingletonMetaclass import Singleton
-from services.CsvParser import parse_winners_csv
+from util.ChangeLog import ChangeLog
+from util.SharedState import SharedState
+from util.StartupTimer import StartupTimer
 
 
 # Singletonなので、インスタンスは1つしか作成されない
@@ -16,66 +20,219 @@ class RaffleManager(metaclass=Singleton):
 
     def __init__(self):
         """
-        作成時に既存ファイルを読み込む
+        作成時に既存データを読み込む
         """
         
+        # 変更イベントの配信
+        self.event_hub = EventHub()
+        
+        # データのバージョン（当選者リストの変更ごとに増える）
+        # 全プロセス共通の世代番号
+        self.version: int = 0
+        
+        # 差分同期用の変更履歴（景品ID -> 当選者ID、削除の場合はNone）
+        self.change_log: ChangeLog[str | None] = ChangeLog(CHANGE_LOG_SIZE)
+        
         # 当選者リスト
-        self.winner_mappings: list[WinnerMapping] = []
+        # 景品IDをキーとしたdict（挿入順＝当選順を保持）
+        self.winner_mappings: dict[str, WinnerMapping] = {}
+        # 取得関数用の当選者リスト（変更時にNoneにし、次の取得時に作り直す）
+        self.winner_mappings_snapshot: tuple[WinnerMapping, ...] | None = None
+        
+        # 逆引き用：参加者ID -> 当選した景品IDの順序付きセット
+        self.prizes_by_winner: dict[str, dict[str, None]] = {}
+        
+        # 景品グループごとの抽選済み景品数
+        self.raffled_count_by_group: dict[PrizeGroupKey, int] = {}
+        
+        # 溜まった変更の整理（ジャーナルのwinners.csvへのまとめ）は、リクエストの処理中ではなくバックグラウンドのスレッドで行う
+        # 変更の保存後・起動時に起こし、整理が必要かはスレッドで確認する
+        self.compaction_requested = threading.Event()
+        self.compactor: threading.Thread | None = None
         
         # （既存の）参加者・景品管理クラスオブジェを呼び出す
         self.participants_manager = ParticipantsManager()
         self.prizes_manager = PrizesManager()
                     
-        # 当選リストの読み込み
-        if not path.exists(WINNERS_CSV_FILEPATH):
-            print('既存のwinners.csvはありません')
-        else:
-            print('既存のwinners.csvを利用します')
-            winners_file = open(WINNERS_CSV_FILEPATH, 'rt', newline='')
-            winners_reader = csv.DictReader(winners_file)
-            winners_return = parse_winners_csv(winners_reader, self.participants_manager.get_all_participants(), self.prizes_manager.get_all_prizes())
-            if winners_return['error']:
-                print(winners_return['error'])
-                exit(1)
-            self.winner_mappings = winners_return['winner_mappings']
-            
-            winners_file.close()
+        # 他のプロセスと共有するデータの排他制御と変更検知
+        self.shared_state = SharedState()
+        
+        # 当選リストの読み込み（他のプロセスが書き込んだ場合は読み込み直す）
+        # 参加者・景品リストを読み込み直した場合も、索引を作り直すため読み込み直す
+        # （不参加リストの変更では当選者リストも索引も変わらないので、読み込み直さない）
+        with self.shared_state.exclusive():
+            # データの保存先（settings.STORAGE_BACKEND）
+            self.storage: StorageBackend = get_storage_backend()
+            self.version = self.shared_state.register('winners', self.reload_winners, depends_on=['participants', 'prizes'])
+            # 起動時の所要時間を記録する（読み込み・確認と索引の作成）
+            with StartupTimer().measure('load:winners'):
+                self.__load_winners()
+        
+        # 起動前に溜まった変更も整理する
+        self.__request_compaction()
         
         # 読み込み完了
         return
     
     
-    # === ファイル管理関数 ===
-    def __write_winners(self) -> None:
+    # === データ・ファイル管理関数 ===
+    
+    def __load_winners(self) -> None:
+        """
+        当選者リストを保存先から読み込む
+        """
+        winner_mappings = self.storage.load_winners(self.participants_manager.get_all_participants(), self.prizes_manager.get_all_prizes())
+        self.__rebuild_winner_index(winner_mappings)
+    
+    def reload_winners(self, generation: int) -> None:
+        """
+        他のプロセスが書き込んだ当選者リストを読み込み直す（SharedStateから呼ばれる）
+        読み込み前後の差分を変更履歴に記録する（他のプロセスの変更も差分同期で返せるように）
+        """
+        previous_mappings = self.winner_mappings
+        self.__load_winners()
+        changes: list[tuple[str, str | None]] = [
+            (prize_id, mapping.participant_id)
+            for prize_id, mapping in self.winner_mappings.items()
+            if previous_mappings.get(prize_id) != mapping
+        ]
+        changes.extend((prize_id, None) for prize_id in previous_mappings if prize_id not in self.winner_mappings)
+        self.version = generation
+        self.change_log.record(generation, changes)
+    
+    def __rebuild_winner_index(self, winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        当選者リストから景品ID・参加者IDの索引を作り直す
+        """
+        self.winner_mappings = {}
+        self.winner_mappings_snapshot = None
+        self.prizes_by_winner = {}
+        self.raffled_count_by_group = {}
+        for mapping in winner_mappings:
+            self.__index_mapping(mapping)
+        self.participants_manager.reset_prior_winners(list(self.prizes_by_winner.keys()))
+    
+    def __index_mapping(self, mapping: WinnerMapping) -> None:
+        """
+        当選を索引に登録する（既存の当選がある場合は上書き、順序は維持）
+        """
+        self.__unindex_winner(mapping.prize_id)
+        self.winner_mappings[mapping.prize_id] = mapping
+        self.winner_mappings_snapshot = None
+        if mapping.participant_id not in self.prizes_by_winner:
+            self.prizes_by_winner[mapping.participant_id] = {}
+            self.participants_manager.mark_prior_winner(mapping.participant_id)
+        self.prizes_by_winner[mapping.participant_id][mapping.prize_id] = None
+        group_key = self.prizes_manager.get_prize_group_key(mapping.prize_id)
+        self.raffled_count_by_group[group_key] = self.raffled_count_by_group.get(group_key, 0) + 1
+    
+    def __unindex_winner(self, prize_id: str) -> WinnerMapping | None:
+        """
+        景品の当選者を逆引き索引から外す
+        """
+        existing_mapping = self.winner_mappings.get(prize_id)
+        if existing_mapping is None:
+            return None
+        self.winner_mappings_snapshot = None
+        won_prizes = self.prizes_by_winner[existing_mapping.participant_id]
+        del won_prizes[prize_id]
+        if len(won_prizes) == 0:
+            del self.prizes_by_winner[existing_mapping.participant_id]
+            self.participants_manager.unmark_prior_winner(existing_mapping.participant_id)
+        group_key = self.prizes_manager.get_prize_group_key(prize_id)
+        self.raffled_count_by_group[group_key] -= 1
+        return existing_mapping
+    
+    def __persist_mutations(self, mutations: list[tuple[str, str, str]]) -> None:
         """
-        当選者CSVを書き出す
+        当選者リストの変更（操作, 景品ID, 参加者ID）を保存する
         self.winner_mappingsを変更後に必ず行うべき
         """
-        winners_file = open(WINNERS_CSV_FILEPATH, 'wt', newline='')
-        writer = csv.DictWriter(winners_file, fieldnames=['景品ID', '当選者受付番号'])
-        writer.writeheader()
-        for mapping in self.winner_mappings:
-            writer.writerow({
-                '景品ID': mapping.prize_id, 
-                '当選者受付番号': mapping.participant_id
-                })
-        winners_file.close()
+        with self.shared_state.exclusive():
+            version = self.shared_state.bump_generation('winners')
+            # 変更履歴はバージョンを上げる前に記録する（バージョンを読んだ後に履歴を読めば取りこぼさない）
+            self.change_log.record(version, [
+                (prize_id, participant_id if action == 'SET' else None)
+                for action, prize_id, participant_id in mutations
+            ])
+            self.version = version
+            self.storage.apply_winner_mutations(mutations, self.winner_mappings.values())
+            # 追記が確定した後に起こす（確定前のジャーナルで整理が必要かを確認しないように）
+            self.shared_state.after_exclusive(self.__request_compaction)
+    
+    def __request_compaction(self) -> None:
+        """
+        溜まった変更を整理するスレッドを起こす（初回はスレッドを開始する）
+        """
+        if self.compactor is None:
+            self.compactor = threading.Thread(target=self.__compact_in_background, name='winners-compaction', daemon=True)
+            self.compactor.start()
+        self.compaction_requested.set()
+    
+    def __compact_in_background(self) -> None:
+        """
+        起こされる度に、必要であれば溜まった変更を整理する（整理用のスレッド）
+        確認はロックの外で行い、整理が必要な場合のみ全プロセスで排他する
+        """
+        while True:
+            self.compaction_requested.wait()
+            self.compaction_requested.clear()
+            try:
+                if not self.storage.winners_compaction_due():
+                    continue
+                with self.shared_state.exclusive():
+                    # 他のプロセスの変更を読み込んでからまとめる（読み込んでいない変更をジャーナルと共に消さないように）
+                    self.shared_state.sync()
+                    # 他のプロセスが先に整理した場合は何もしない
+                    if self.storage.winners_compaction_due():
+                        self.storage.compact_winners(self.winner_mappings.values())
+            except Exception:
+                traceback.print_exc()
     
     
     # === 抽選状況の管理・編集 ===
     
-    def get_prize_winner_mappings(self) -> list[WinnerMapping]:
+    def get_version(self) -> int:
+        """
+        データのバージョンを取得（当選者リストが変更されるたびに増える）
+        """
+        return self.version
+    
+    def get_winner_changes_since(self, version: int) -> dict[str, str | None] | None:
+        """
+        指定のバージョンより後に変更された景品IDと、その当選者ID（削除された場合はNone）を返す
+        変更履歴が足りない場合はNoneを返す
+        """
+        return self.change_log.changes_since(version)
+    
+    def get_prize_winner_mappings(self) -> tuple[WinnerMapping, ...]:
         """
         現在存在する抽選結果を取得
+        変更されるまでは同じタプルを返す
         """
-        return self.winner_mappings
+        with self.shared_state.shared():
+            winner_mappings_snapshot = self.winner_mappings_snapshot
+            if winner_mappings_snapshot is None:
+                winner_mappings_snapshot = tuple(self.winner_mappings.values())
+                self.winner_mappings_snapshot = winner_mappings_snapshot
+            return winner_mappings_snapshot
+    
+    def has_winner_mappings(self) -> bool:
+        """
+        抽選結果が1件でも存在するかを確認
+        """
+        return len(self.winner_mappings) > 0
     
     def wipe_prize_winner_mappings(self) -> None:
         """
         抽選結果をリセット
         """
-        self.winner_mappings = []
-        self.__write_winners()
+        with self.shared_state.exclusive():
+            self.__rebuild_winner_index([])
+            self.version = self.shared_state.bump_generation('winners')
+            self.change_log.reset(self.version)
+            self.storage.replace_winners(self.winner_mappings.values())
+            self.event_hub.publish(RaffleEventType.WINNERS_WIPED)
         return
     
     def get_winner_for_prize(self, prize_id: str) -> str | None:
@@ -83,7 +240,16 @@ class RaffleManager(metaclass=Singleton):
         景品IDに対して当選者IDを返す
         当選者がいない場合はNoneを返す
         """
-        return next((entry.participant_id for entry in self.winner_mappings if entry.prize_id == prize_id), None)
+        mapping = self.winner_mappings.get(prize_id)
+        return mapping.participant_id if mapping else None
+    
+    def get_prizes_for_winner(self, participant_id: str) -> list[str]:
+        """
+        参加者IDに対して当選した景品IDリストを返す（当選順）
+        当選していない場合は[]を返す
+        """
+        with self.shared_state.shared():
+            return list(self.prizes_by_winner.get(participant_id, {}).keys())
     
     def set_winner_for_prize(self, prize_id: str, winner_id: str, overwrite: bool) -> RaffleModificationStatus:
         """
@@ -93,47 +259,114 @@ class RaffleManager(metaclass=Singleton):
         @param overwrite: 景品IDに既存の当選者がいる場合、上書きするかどうか
         """
         
-        if prize_id not in self.prizes_manager.get_all_prize_ids():
-            return RaffleModificationStatus.NONEXISTENT_PRIZE_ID
-        if winner_id not in self.participants_manager.get_all_participant_ids():
-            return RaffleModificationStatus.NONEXISTENT_PARTICIPANT_ID
-        
-        # 景品が既に抽選されているかを確認、Indexを取得
-        existing_prize_index = next(
-            (index for (index, mapping) in enumerate(self.winner_mappings) if mapping.prize_id == prize_id),
-            None
-        )
-        
-        if existing_prize_index != None:
-            if overwrite:
-                self.winner_mappings[existing_prize_index] = self.winner_mappings[existing_prize_index]._replace(participant_id=winner_id)
-            else:
+        with self.shared_state.exclusive():
+            if not self.prizes_manager.prize_exists(prize_id):
+                return RaffleModificationStatus.NONEXISTENT_PRIZE_ID
+            if not self.participants_manager.participant_exists(winner_id):
+                return RaffleModificationStatus.NONEXISTENT_PARTICIPANT_ID
+            
+            # 景品が既に抽選されているかを確認
+            if prize_id in self.winner_mappings and not overwrite:
                 return RaffleModificationStatus.NOT_OVERWRITING
-
-        else:
-            self.winner_mappings.append(WinnerMapping(participant_id=winner_id, prize_id=prize_id))
-                
-        self.__write_winners()
-        return RaffleModificationStatus.PROCESSED_SUCCESSFULLY
+            
+            # 上書きの場合も元の位置を維持する
+            self.__index_mapping(WinnerMapping(participant_id=winner_id, prize_id=prize_id))
+                    
+            self.__persist_mutations([('SET', prize_id, winner_id)])
+            self.event_hub.publish(RaffleEventType.WINNER_SET, {"prize_id": prize_id, "winner_id": winner_id})
+            return RaffleModificationStatus.PROCESSED_SUCCESSFULLY
+    
+    def set_winners_for_prizes(self, winner_mappings: list[WinnerMapping]) -> RaffleModificationStatus:
+        """
+        複数の未抽選の景品に対して当選者IDをまとめて書き込む  
+        1件でも問題がある場合は何も書き込まない  
+        保存は最後に1回のみ行う
+        """
+        with self.shared_state.exclusive():
+            seen_prize_ids: set[str] = set()
+            for mapping in winner_mappings:
+                if not self.prizes_manager.prize_exists(mapping.prize_id):
+                    return RaffleModificationStatus.NONEXISTENT_PRIZE_ID
+                if not self.participants_manager.participant_exists(mapping.participant_id):
+                    return RaffleModificationStatus.NONEXISTENT_PARTICIPANT_ID
+                if mapping.prize_id in self.winner_mappings or mapping.prize_id in seen_prize_ids:
+                    return RaffleModificationStatus.NOT_OVERWRITING
+                seen_prize_ids.add(mapping.prize_id)
+            
+            for mapping in winner_mappings:
+                self.__index_mapping(mapping)
+            
+            if len(winner_mappings) > 0:
+                self.__persist_mutations([('SET', mapping.prize_id, mapping.participant_id) for mapping in winner_mappings])
+                self.event_hub.publish_all([
+                    (RaffleEventType.WINNER_SET, {"prize_id": mapping.prize_id, "winner_id": mapping.participant_id})
+                    for mapping in winner_mappings
+                ])
+            return RaffleModificationStatus.PROCESSED_SUCCESSFULLY
+    
+    def get_unraffled_prize_ids(self) -> list[str]:
+        """
+        まだ抽選されていない景品IDリストを返す（CSVの行順）
+        """
+        with self.shared_state.shared():
+            return [prize_id for prize_id in self.prizes_manager.get_all_prize_ids() if prize_id not in self.winner_mappings]
     
     def delete_winner_for_prize(self, prize_id: str) -> RaffleModificationStatus:
         """
         抽選済みの景品の当選者を削除する  
         成功した場合はTrue、景品が抽選済みでない場合はFalseを返す
         """
-        if prize_id not in self.prizes_manager.get_all_prize_ids():
-            return RaffleModificationStatus.NONEXISTENT_PRIZE_ID
-        
-        # 景品が既に抽選されているかを確認、Indexを取得
-        existing_prize_index = next(
-            (index for (index, mapping) in enumerate(self.winner_mappings) if mapping.prize_id == prize_id),
-            None
-        )
-        
-        if existing_prize_index == None:
-            return RaffleModificationStatus.PRIZE_NOT_RAFFLED
-        
-        del self.winner_mappings[existing_prize_index]
-        self.__write_winners()
-        return RaffleModificationStatus.PROCESSED_SUCCESSFULLY
-        
+        with self.shared_state.exclusive():
+            if not self.prizes_manager.prize_exists(prize_id):
+                return RaffleModificationStatus.NONEXISTENT_PRIZE_ID
+            
+            # 景品が既に抽選されているかを確認
+            if prize_id not in self.winner_mappings:
+                return RaffleModificationStatus.PRIZE_NOT_RAFFLED
+            
+            self.__unindex_winner(prize_id)
+            del self.winner_mappings[prize_id]
+            self.__persist_mutations([('DELETE', prize_id, '')])
+            self.event_hub.publish(RaffleEventType.WINNER_DELETED, {"prize_id": prize_id})
+            return RaffleModificationStatus.PROCESSED_SUCCESSFULLY
+    
+    
+    # === 景品グループの抽選状況 ===
+    
+    def get_remaining_prizes_in_group(self, prize_id: str) -> list[str] | None:
+        """
+        指定された景品と同じグループで、まだ抽選されていない景品IDリストを返す（CSVの行順）  
+        景品自体が存在しない場合はNoneを返す
+        """
+        with self.shared_state.shared():
+            group_key = self.prizes_manager.get_prize_group_key(prize_id)
+            if group_key is None:
+                return None
+            return [id for id in self.prizes_manager.get_prize_ids_in_group(group_key) if id not in self.winner_mappings]
+    
+    def get_remaining_count_in_group(self, prize_id: str) -> int | None:
+        """
+        指定された景品と同じグループで、まだ抽選されていない景品数を返す  
+        景品自体が存在しない場合はNoneを返す
+        """
+        group_key = self.prizes_manager.get_prize_group_key(prize_id)
+        if group_key is None:
+            return None
+        total = len(self.prizes_manager.get_prize_ids_in_group(group_key))
+        return total - self.raffled_count_by_group.get(group_key, 0)
+    
+    def get_prize_groups_progress(self) -> list[PrizeGroupProgress]:
+        """
+        全景品グループの景品数・未抽選数を返す
+        """
+        with self.shared_state.shared():
+            return [
+                PrizeGroupProgress(
+                    provider=group.provider,
+                    display_name=group.display_name,
+                    prize_ids=group.prize_ids,
+                    total=len(group.prize_ids),
+                    remaining=len(group.prize_ids) - self.raffled_count_by_group.get((group.display_name, group.provider), 0)
+                )
+                for group in self.prizes_manager.get_all_prize_groups()
+            ]
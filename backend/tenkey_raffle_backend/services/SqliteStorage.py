@@ -0,0 +1,206 @@
+from contextlib import contextmanager
+import sqlite3
+from typing import Iterable, Iterator, Sequence
+
+from settings import SQLITE_DB_FILEPATH
+from typedefs.RaffleDatatypes import Participant, Prize, WinnerMapping
+from services.StorageBackend import DataLoadError, StorageBackend
+from services.CsvStorage import CsvStorage
+from util.SingletonMetaclass import Singleton
+
+
+# データベースの構造のバージョン（PRAGMA user_versionに記録する）
+SCHEMA_VERSION = 1
+
+# 行の順序（CSVの行順・当選順）はrowidで保持する
+# rowidは常に既存の最大値より大きくなるので、追加した行は末尾になり、UPSERTでの上書きは位置を維持する
+SCHEMA = """
+CREATE TABLE participants (
+    registration_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    connpass_attending INTEGER NOT NULL,
+    weight REAL NOT NULL
+);
+CREATE UNIQUE INDEX participants_registration_id ON participants (registration_id);
+
+CREATE TABLE cancels (
+    registration_id TEXT NOT NULL
+);
+CREATE UNIQUE INDEX cancels_registration_id ON cancels (registration_id);
+
+CREATE TABLE prizes (
+    id TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    display_name TEXT NOT NULL
+);
+CREATE UNIQUE INDEX prizes_id ON prizes (id);
+CREATE INDEX prizes_group ON prizes (display_name, provider);
+
+CREATE TABLE winners (
+    prize_id TEXT NOT NULL,
+    participant_id TEXT NOT NULL
+);
+CREATE UNIQUE INDEX winners_prize_id ON winners (prize_id);
+CREATE INDEX winners_participant_id ON winners (participant_id);
+"""
+
+
+# Singletonなので、インスタンスは1つしか作成されない
+class SqliteStorage(StorageBackend, metaclass=Singleton):
+
+    def __init__(self):
+        """
+        SQLiteのデータベース（settings.SQLITE_DB_FILEPATH）に保存する
+        変更は1行ずつの書き込みで、複数行の変更も1つのトランザクションで確定させる
+        読み込み時は保存時に確認済みの内容をそのまま使い、CSVの解析・確認は行わない
+
+        データベースの作成時に既存のCSV・TXTファイルがあれば取り込む
+        （CSVはインポート・エクスポートの形式として、export_csv_files()・import_csv_files()で読み書きできる）
+        """
+
+        # 呼び出しは全てSharedState().exclusive()の中なので、スレッド間で1つの接続を使う
+        # トランザクションはself.__transaction()で明示的に開始する
+        self.connection = sqlite3.connect(SQLITE_DB_FILEPATH, check_same_thread=False, isolation_level=None)
+        # 書き込み中も他のプロセスが読み込めるようにする
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        # コミット毎にfsyncする（CSVのwrite_file_atomically()と同じ耐久性）
+        self.connection.execute('PRAGMA synchronous = FULL')
+
+        user_version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if user_version == 0:
+            # テーブルの作成・CSVの取り込み・バージョンの記録を1つのトランザクションで行う
+            # 取り込みに失敗した場合は全て取り消されるので、次回の起動時にもう一度取り込む
+            with self.__transaction():
+                # executescript()は実行前にコミットしてしまうので、1文ずつ実行する
+                for statement in SCHEMA.split(';'):
+                    if not statement.isspace():
+                        self.connection.execute(statement)
+                self.import_csv_files()
+                self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        elif user_version != SCHEMA_VERSION:
+            raise DataLoadError(f'{SQLITE_DB_FILEPATH}のバージョン（{user_version}）に対応していません')
+
+        return
+
+
+    # === トランザクション ===
+
+    @contextmanager
+    def __transaction(self) -> Iterator[None]:
+        """
+        中の書き込みを1つのトランザクションとして確定させる（例外の場合は全て取り消す）
+        入れ子の場合は外側のトランザクションにまとめる
+        """
+        if self.connection.in_transaction:
+            yield
+            return
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+
+    # === 参加者リスト ===
+
+    def load_participants(self) -> list[Participant]:
+        rows = self.connection.execute('SELECT registration_id, username, display_name, connpass_attending, weight FROM participants ORDER BY rowid')
+        return [
+            Participant(registration_id=registration_id, username=username, display_name=display_name, connpass_attending=bool(connpass_attending), weight=weight)
+            for registration_id, username, display_name, connpass_attending, weight in rows
+        ]
+
+    def replace_participants(self, participants: Iterable[Participant]) -> None:
+        with self.__transaction():
+            self.connection.execute('DELETE FROM participants')
+            self.connection.executemany(
+                'INSERT INTO participants (registration_id, username, display_name, connpass_attending, weight) VALUES (?, ?, ?, ?, ?)',
+                ((participant.registration_id, participant.username, participant.display_name, int(participant.connpass_attending), participant.weight) for participant in participants)
+            )
+
+
+    # === 不参加リスト ===
+
+    def load_cancels(self) -> list[str]:
+        return [registration_id for (registration_id,) in self.connection.execute('SELECT registration_id FROM cancels ORDER BY rowid')]
+
+    def replace_cancels(self, cancels: Iterable[str]) -> None:
+        with self.__transaction():
+            self.connection.execute('DELETE FROM cancels')
+            self.connection.executemany('INSERT INTO cancels (registration_id) VALUES (?)', ((registration_id,) for registration_id in cancels))
+
+    def apply_cancel_changes(self, changes: list[tuple[str, bool]], cancels: Iterable[str]) -> None:
+        with self.__transaction():
+            for registration_id, added in changes:
+                if added:
+                    self.connection.execute('INSERT OR IGNORE INTO cancels (registration_id) VALUES (?)', (registration_id,))
+                else:
+                    self.connection.execute('DELETE FROM cancels WHERE registration_id = ?', (registration_id,))
+
+
+    # === 景品リスト ===
+
+    def load_prizes(self) -> list[Prize]:
+        rows = self.connection.execute('SELECT id, provider, display_name FROM prizes ORDER BY rowid')
+        return [Prize(provider=provider, display_name=display_name, id=id) for id, provider, display_name in rows]
+
+    def replace_prizes(self, prizes: Iterable[Prize]) -> None:
+        with self.__transaction():
+            self.connection.execute('DELETE FROM prizes')
+            self.connection.executemany('INSERT INTO prizes (id, provider, display_name) VALUES (?, ?, ?)', ((prize.id, prize.provider, prize.display_name) for prize in prizes))
+
+
+    # === 当選者リスト ===
+
+    def load_winners(self, participants: Sequence[Participant], prizes: Sequence[Prize]) -> list[WinnerMapping]:
+        rows = self.connection.execute('SELECT participant_id, prize_id FROM winners ORDER BY rowid')
+        return [WinnerMapping(participant_id=participant_id, prize_id=prize_id) for participant_id, prize_id in rows]
+
+    def replace_winners(self, winner_mappings: Iterable[WinnerMapping]) -> None:
+        with self.__transaction():
+            self.connection.execute('DELETE FROM winners')
+            self.connection.executemany('INSERT INTO winners (prize_id, participant_id) VALUES (?, ?)', ((mapping.prize_id, mapping.participant_id) for mapping in winner_mappings))
+
+    def apply_winner_mutations(self, mutations: list[tuple[str, str, str]], winner_mappings: Iterable[WinnerMapping]) -> None:
+        with self.__transaction():
+            for action, prize_id, participant_id in mutations:
+                if action == 'SET':
+                    # 上書きの場合はrowid（当選順）を維持する
+                    self.connection.execute(
+                        'INSERT INTO winners (prize_id, participant_id) VALUES (?, ?) ON CONFLICT (prize_id) DO UPDATE SET participant_id = excluded.participant_id',
+                        (prize_id, participant_id)
+                    )
+                else:
+                    self.connection.execute('DELETE FROM winners WHERE prize_id = ?', (prize_id,))
+
+
+    # === CSVのインポート・エクスポート ===
+
+    def import_csv_files(self) -> None:
+        """
+        settings.DATA_PATH内のCSV・TXTファイルを読み込み、データベースの内容を置き換える
+        ファイルの内容はCsvStorageと同様に確認する
+        """
+        csv_storage = CsvStorage()
+        participants = csv_storage.load_participants()
+        cancels = csv_storage.load_cancels()
+        prizes = csv_storage.load_prizes()
+        winner_mappings = csv_storage.load_winners(participants, prizes)
+        with self.__transaction():
+            self.replace_participants(participants)
+            self.replace_cancels(cancels)
+            self.replace_prizes(prizes)
+            self.replace_winners(winner_mappings)
+
+    def export_csv_files(self) -> None:
+        """
+        データベースの内容をsettings.DATA_PATH内のCSV・TXTファイルに書き出す
+        """
+        csv_storage = CsvStorage()
+        csv_storage.replace_participants(self.load_participants())
+        csv_storage.replace_cancels(self.load_cancels())
+        csv_storage.replace_prizes(self.load_prizes())
+        csv_storage.replace_winners(self.load_winners([], []))
@@ -0,0 +1,81 @@
+import threading
+import traceback
+
+from typedefs.RaffleDatatypes import StartupStatus
+from services.DrawManager import DrawManager
+from services.StorageBackend import DataLoadError
+from util.SingletonMetaclass import Singleton
+from util.StartupTimer import StartupTimer
+
+
+# Singletonなので、（プロセスごとに）インスタンスは1つしか作成されない
+class StartupManager(metaclass=Singleton):
+
+    def __init__(self):
+        """
+        管理クラスの作成（既存データの読み込み・確認と索引の作成）を、モジュールの読み込み時ではなく
+        start_warm_up()（バックグラウンド）又は最初のwait_until_ready()で行う
+        読み込み中もサーバーは起動し、死活・準備状態の確認には答えられる
+        """
+
+        self.status: StartupStatus = StartupStatus.NOT_STARTED
+        # 読み込みに失敗した場合のエラー
+        self.error: str | None = None
+
+        # 読み込みを開始する1スレッドを決める
+        self.lock = threading.Lock()
+        # 読み込みが終わった（成功・失敗どちらも）
+        self.finished = threading.Event()
+
+        return
+
+    def start_warm_up(self) -> None:
+        """
+        バックグラウンドで既存データの読み込みを開始する（開始済みの場合は何もしない）
+        """
+        if self.__claim():
+            threading.Thread(target=self.__warm_up, name='warm-up', daemon=True).start()
+
+    def wait_until_ready(self) -> bool:
+        """
+        既存データの読み込みが終わるまで待つ（開始されていない場合はこのスレッドで読み込む）
+        読み込めた場合はTrue、失敗した場合はFalseを返す
+
+        管理クラスの作成はSharedStateのロックを取得するので、ロックを取得する前に呼ぶこと
+        """
+        if self.status == StartupStatus.READY:
+            return True
+        if self.__claim():
+            self.__warm_up()
+        else:
+            self.finished.wait()
+        return self.status == StartupStatus.READY
+
+    def __claim(self) -> bool:
+        """
+        読み込みを開始するスレッドならTrue（最初の1回のみ）
+        """
+        with self.lock:
+            if self.status != StartupStatus.NOT_STARTED:
+                return False
+            self.status = StartupStatus.STARTING
+            return True
+
+    def __warm_up(self) -> None:
+        """
+        全ての管理クラスを作成する（DrawManagerが参加者・景品・当選者の管理クラスを作成する）
+        """
+        try:
+            DrawManager()
+        except Exception as e:
+            # 壊れたファイル等はメッセージのみ、予期しないエラーはトレースバックも表示する
+            if not isinstance(e, DataLoadError):
+                traceback.print_exc()
+            self.error = str(e)
+            self.status = StartupStatus.FAILED
+            print(f'既存データを読み込めませんでした：{self.error}')
+        else:
+            self.status = StartupStatus.READY
+            print(f'起動時間：{StartupTimer().report()}')
+        finally:
+            self.finished.set()
@@ -0,0 +1,128 @@
+from typing import Iterable, Sequence
+
+from settings import STORAGE_BACKEND
+from typedefs.RaffleDatatypes import Participant, Prize, WinnerMapping
+
+
+class DataLoadError(Exception):
+    """
+    保存されたデータを読み込めない（ファイルが壊れている等）
+    メッセージは利用者向けの説明
+    """
+
+
+class StorageBackend:
+    """
+    管理クラスのデータの保存先
+    参加者リスト・不参加リスト・景品リスト・当選者リストの読み込みと書き込みを行う
+
+    全ての関数はSharedState().exclusive()の中で呼ぶこと
+    読み込みに失敗した場合（ファイルが壊れている等）はDataLoadErrorを送出する
+
+    変更を適用する関数（apply_*）には変更後の全件も渡すので、
+    全体を書き直す保存先は全件を、行単位で書き込める保存先は変更のみを使う
+    """
+
+    # === 参加者リスト ===
+
+    def load_participants(self) -> list[Participant]:
+        """
+        参加者リストを読み込む（保存されていない場合は[]）
+        """
+        raise NotImplementedError
+
+    def replace_participants(self, participants: Iterable[Participant]) -> None:
+        """
+        参加者リストを置き換える
+        """
+        raise NotImplementedError
+
+    # === 不参加リスト ===
+
+    def load_cancels(self) -> list[str]:
+        """
+        当日不参加の受付番号リストを読み込む（保存されていない場合は[]）
+        """
+        raise NotImplementedError
+
+    def replace_cancels(self, cancels: Iterable[str]) -> None:
+        """
+        当日不参加リストを置き換える
+        """
+        raise NotImplementedError
+
+    def apply_cancel_changes(self, changes: list[tuple[str, bool]], cancels: Iterable[str]) -> None:
+        """
+        当日不参加リストの変更（受付番号, 追加されたか）を保存する
+
+        @param cancels: 変更後の当日不参加リスト
+        """
+        raise NotImplementedError
+
+    # === 景品リスト ===
+
+    def load_prizes(self) -> list[Prize]:
+        """
+        景品リストを読み込む（保存されていない場合は[]）
+        """
+        raise NotImplementedError
+
+    def replace_prizes(self, prizes: Iterable[Prize]) -> None:
+        """
+        景品リストを置き換える
+        """
+        raise NotImplementedError
+
+    # === 当選者リスト ===
+
+    def load_winners(self, participants: Sequence[Participant], prizes: Sequence[Prize]) -> list[WinnerMapping]:
+        """
+        当選者リストを当選順で読み込む（保存されていない場合は[]）
+
+        @param participants, prizes: 読み込み済みの参加者・景品リスト（存在しないIDの確認用）
+        """
+        raise NotImplementedError
+
+    def replace_winners(self, winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        当選者リストを置き換える
+        """
+        raise NotImplementedError
+
+    def apply_winner_mutations(self, mutations: list[tuple[str, str, str]], winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        当選者リストの変更（'SET'又は'DELETE', 景品ID, 参加者ID）を保存する
+        上書きの場合も元の位置（当選順）を維持する
+
+        @param winner_mappings: 変更後の当選者リスト
+        """
+        raise NotImplementedError
+
+    def winners_compaction_due(self) -> bool:
+        """
+        溜まった変更を整理する（compact_winners()を呼ぶ）必要があるか
+        exclusive()の外で呼んでもよいが、整理する前にexclusive()の中で再度確認すること
+        """
+        return False
+
+    def compact_winners(self, winner_mappings: Iterable[WinnerMapping]) -> None:
+        """
+        溜まった変更を整理する（必要な保存先のみ、RaffleManagerがバックグラウンドで呼ぶ）
+
+        @param winner_mappings: 現在の当選者リスト
+        """
+        return
+
+
+def get_storage_backend() -> StorageBackend:
+    """
+    settings.STORAGE_BACKENDで指定された保存先を返す（プロセスごとに1つ）
+    使わない方の保存先のモジュール（sqlite3等）は読み込まない
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        from services.SqliteStorage import SqliteStorage
+        return SqliteStorage()
+    elif STORAGE_BACKEND == 'csv':
+        from services.CsvStorage import CsvStorage
+        return CsvStorage()
+    raise ValueError(f'STORAGE_BACKENDの値が不正です（{STORAGE_BACKEND}）')
@@ -3,4 +3,65 @@ DATA_PATH = './data'
 WINNERS_CSV_FILEPATH = DATA_PATH + '/winners.csv'
 PARTICIPANT_CSV_FILEPATH = DATA_PATH + '/parts.csv'
 PRIZES_CSV_FILEPATH = DATA_PATH + '/prizes.csv'
-CANCELS_TXT_FILEPATH = DATA_PATH + '/cancels.txt'
\ No newline at end of file
+CANCELS_TXT_FILEPATH = DATA_PATH + '/cancels.txt'
+WINNERS_JOURNAL_FILEPATH = DATA_PATH + '/winners.journal'
+SQLITE_DB_FILEPATH = DATA_PATH + '/raffle.sqlite3'
+SNAPSHOT_PATH = DATA_PATH + '/snapshots'
+# 複数プロセスで共有する際のロックファイルと、保存単位ごとの世代番号
+SHARED_LOCK_FILEPATH = DATA_PATH + '/.lock'
+SHARED_GENERATIONS_FILEPATH = DATA_PATH + '/generations.json'
+
+# データの保存先（'csv'：DATA_PATH内のCSV・TXTファイル、'sqlite'：SQLITE_DB_FILEPATHのデータベース）
+# 'sqlite'でデータベースを新規作成する場合は、既存のCSV・TXTファイルを取り込む
+STORAGE_BACKEND = 'csv'
+
+# （'csv'の場合）当選者の変更をwinners.csvの全体書き換えではなく、ジャーナルへの追記で保存するか
+WINNERS_JOURNAL_ENABLED = True
+# ジャーナル（全プロセス共通）がこの件数に達したら、バックグラウンドでwinners.csvにまとめる
+WINNERS_JOURNAL_COMPACTION_THRESHOLD = 100
+
+# （'csv'の場合）解析・確認済みのデータをバイナリのスナップショットとしてSNAPSHOT_PATHに保存し、
+# 起動時に元ファイルが変わっていなければ（サイズ・更新時刻・ハッシュが一致すれば）CSVを解析せずに利用するか
+CSV_SNAPSHOT_ENABLED = True
+
+# 起動直後にバックグラウンドで既存データの読み込みを始めるか
+# Falseの場合は最初のリクエスト（又はGET /api/v1/ready）で読み込む
+WARM_UP_ON_BOOT = True
+
+# グループコミットの待ち時間（秒）
+# 0の場合は待たずに書き出すが、書き出し中に届いた変更は次の1回にまとめられる
+# 待ち時間中は同じプロセスの他のリクエストの変更を受け付けるが、他のプロセスの書き込みは待たされる
+GROUP_COMMIT_WINDOW_SECONDS = 0.0
+
+# アップロードされるCSVの上限
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+MAX_CSV_ROWS = 100000
+
+# サーバー側抽選の乱数シード（リハーサル用、Noneの場合はOSの乱数を利用）
+DRAW_SEED: str | None = None
+
+# 重み付き抽選：重みを整数として扱う際の精度（重み1 = 1000）
+DRAW_WEIGHT_PRECISION = 1000
+# 参加者CSVの「抽選重み」の上限（整数にした重みの合計を64bitの配列で保持するため）
+MAX_DRAW_WEIGHT = 1000000
+# 重み付き抽選で、既に当選した参加者の重みに掛ける倍率（1人1景品の抽選では当選者は常に除外される）
+PRIOR_WINNER_WEIGHT_FACTOR = 1.0
+
+# 参加者リストのページ分割（?limit=）：既定の件数と上限
+PARTICIPANTS_PAGE_SIZE_DEFAULT = 100
+PARTICIPANTS_PAGE_SIZE_MAX = 1000
+
+# 差分同期（?since=）用に保持する変更数（これより古いバージョンからは全件を返す）
+CHANGE_LOG_SIZE = 1000
+
+# 変更イベント（SSE）：全プロセスで共有するイベントのログ
+EVENT_LOG_FILEPATH = DATA_PATH + '/events.log'
+# 変更イベント（SSE）：他のプロセスが発行したイベントを確認する間隔（秒、プロセスごとに1スレッドでstat()するのみ）
+EVENT_LOG_POLL_SECONDS = 0.05
+# 変更イベント（SSE）：再接続時の再送用に保持するイベント数
+EVENT_HISTORY_SIZE = 1000
+# 変更イベント（SSE）：プロセスごとの同時接続数の上限（超えた場合は503）
+# SSE接続は接続中ずっとgunicornのスレッドを1つ占有する（1接続1スレッド）ので、--threadsより小さくしてAPIの処理用のスレッドを残す
+EVENT_MAX_SUBSCRIBERS = 8
+# 変更イベント（SSE）：イベントが無い場合に接続維持のコメントを送る間隔（秒）
+EVENT_KEEPALIVE_SECONDS = 15.0
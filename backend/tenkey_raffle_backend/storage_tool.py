@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+from settings import DATA_PATH, STORAGE_BACKEND
+
+Path(DATA_PATH).mkdir(parents=True, exist_ok=True)
+
+
+from util.SharedState import SharedState
+from typedefs.RaffleDatatypes import RaffleEventType
+from services.EventHub import EventHub
+from services.StorageBackend import DataLoadError
+from services.SqliteStorage import SqliteStorage
+
+
+# SQLiteのデータベースとCSV・TXTファイル（DATA_PATH内）の間でデータを移す
+#   python storage_tool.py export : データベースの内容をCSV・TXTファイルに書き出す
+#   python storage_tool.py import : CSV・TXTファイルの内容でデータベースを置き換える
+# サーバーの起動中でも利用でき、各プロセスは次のリクエストで読み込み直す
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ('export', 'import'):
+        print('使い方: python storage_tool.py export|import')
+        exit(1)
+    if STORAGE_BACKEND != 'sqlite':
+        print('STORAGE_BACKENDが\'sqlite\'ではないため、CSV・TXTファイルがそのまま保存先です')
+        exit(1)
+
+    shared_state = SharedState()
+    with shared_state.exclusive():
+        try:
+            if sys.argv[1] == 'export':
+                SqliteStorage().export_csv_files()
+                print('データベースの内容をCSV・TXTファイルに書き出しました')
+            else:
+                SqliteStorage().import_csv_files()
+                # 起動中のプロセスに読み込み直させる
+                for key in ('participants', 'cancels', 'prizes', 'winners'):
+                    shared_state.bump_generation(key)
+                # 変更イベントの購読者（表示用ブラウザ等）に全て取得し直させる
+                EventHub().publish(RaffleEventType.RELOADED, {"source": "storage_tool"})
+                print('CSV・TXTファイルの内容でデータベースを置き換えました')
+        except DataLoadError as e:
+            print(e)
+            exit(1)
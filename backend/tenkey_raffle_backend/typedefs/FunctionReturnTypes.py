@@ -1,4 +1,7 @@
 from enum import Enum
+from typing import TypedDict
+
+from typedefs.RaffleDatatypes import Participant, WinnerMapping
 
 
 class AttendanceModificationStatus(Enum):
@@ -6,10 +9,27 @@ class AttendanceModificationStatus(Enum):
     ALREADY_PROCESSED = 1      # 既に指定の設定に設定済み、処理する必要なし
     NONEXISTENT_ID = 2         # 指定された参加者IDが存在しない
 
+class BatchAttendanceModificationResult(TypedDict):
+    success: list[str]         # 問題なく処理されたID
+    skipped: list[str]         # 既に指定の設定に設定済みのID
+    nonexistent_ids: list[str] # 存在しない参加者ID
+
+class ParticipantsPage(TypedDict):
+    participants: list[Participant] # このページの参加者（CSVの行順）
+    next_cursor: str | None         # 次のページのカーソル（最後のページの場合はNone）
+
 class RaffleModificationStatus(Enum):
     PROCESSED_SUCCESSFULLY = 0     # 問題なく処理された
     NONEXISTENT_PRIZE_ID = 1       # 存在しない景品を指定された
     NONEXISTENT_PARTICIPANT_ID = 2 # 存在しない参加者を指定された
     NOT_OVERWRITING = 3            # 既に当選記録が存在するので上書きしなかった
     PRIZE_NOT_RAFFLED = 4          # 指定された景品は抽選されてない
-    
\ No newline at end of file
+    NO_ELIGIBLE_PARTICIPANTS = 5   # 抽選対象の参加者がいない
+
+class DrawResult(TypedDict):
+    status: RaffleModificationStatus # 抽選結果の状態
+    winner_id: str | None            # 当選者の受付番号（当選者が決まらなかった場合はNone）
+    
+class BulkDrawResult(TypedDict):
+    status: RaffleModificationStatus     # 抽選結果の状態
+    winner_mappings: list[WinnerMapping] # 新たに記録された当選（失敗した場合は[]）
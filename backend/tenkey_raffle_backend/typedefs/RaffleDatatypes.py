@@ -1,16 +1,62 @@
-from typing import NamedTuple
+from enum import StrEnum
+from typing import Any, NamedTuple
 
 class Participant(NamedTuple):
     registration_id: str     # バーコードに利用される数字ID（CSVの「受付番号」）
     username: str            # Connpassのアカウント名（CSVの「ユーザー名」）
     display_name: str        # 表示名（CSVの「表示名」）
     connpass_attending: bool # Connpass上参加しているか（CSVの「参加ステータス」が「参加」ならTrue、「参加キャンセル」ならFalse）
+    weight: float = 1.0      # 重み付き抽選での重み（CSVの「抽選重み」、列が無い場合は1）
     
 class Prize(NamedTuple):
     provider: str     # 提供者名
     display_name: str # 表示名
     id: str           # 管理用ID
 
+# 景品グループのキー（同一の表示名と提供元の景品は同じグループ）
+type PrizeGroupKey = tuple[str, str] # (表示名, 提供者名)
+
+class PrizeGroup(NamedTuple):
+    provider: str              # 提供者名
+    display_name: str          # 表示名
+    prize_ids: tuple[str, ...] # グループに含まれる景品ID（CSVの行順）
+
+class PrizeGroupProgress(NamedTuple):
+    provider: str              # 提供者名
+    display_name: str          # 表示名
+    prize_ids: tuple[str, ...] # グループに含まれる景品ID（CSVの行順）
+    total: int                 # グループの景品数
+    remaining: int             # 未抽選の景品数
+
 class WinnerMapping(NamedTuple):
     participant_id: str  # 当選者の受付番号
-    prize_id: str        # 景品のID
\ No newline at end of file
+    prize_id: str        # 景品のID
+
+class ParticipantFilter(StrEnum):
+    ALL = 'all'                     # 全参加者
+    ATTENDING = 'attending'         # 会場に居る参加者
+    CANCELLED = 'cancelled'         # 当日不参加の参加者（/api/v1/participants/cancels/allと同じ）
+    NOT_ATTENDING = 'not_attending' # 会場に居ない参加者（Connpass不参加・当日不参加）
+    WINNERS = 'winners'             # 1つ以上の景品に当選した参加者
+
+class RaffleEventType(StrEnum):
+    WINNER_SET = 'winner_set'                       # 当選が記録された（{prize_id, winner_id}）
+    WINNER_DELETED = 'winner_deleted'               # 当選が削除された（{prize_id}）
+    WINNERS_WIPED = 'winners_wiped'                 # 抽選結果がリセットされた
+    CANCEL_ADDED = 'cancel_added'                   # 当日不参加が登録された（{participant_id}）
+    CANCEL_REMOVED = 'cancel_removed'               # 当日不参加が取り消された（{participant_id}）
+    CANCELS_WIPED = 'cancels_wiped'                 # 当日不参加リストがリセットされた
+    PARTICIPANTS_IMPORTED = 'participants_imported' # 参加者リストが置き換えられた（{count}、削除の場合は0）
+    PRIZES_IMPORTED = 'prizes_imported'             # 景品リストが置き換えられた（{count}、削除の場合は0）
+    RELOADED = 'reloaded'                           # 保存先が管理クラスを通さずに置き換えられた（{source}、内容は全て取得し直すこと）
+
+class RaffleEvent(NamedTuple):
+    sequence: int          # 通し番号（イベントのログごとに1から、全プロセスで共通）
+    type: RaffleEventType  # イベントの種類
+    data: dict[str, Any]   # イベントの内容
+
+class StartupStatus(StrEnum):
+    NOT_STARTED = 'not_started' # 既存データをまだ読み込んでいない
+    STARTING = 'starting'       # 既存データを読み込み中
+    READY = 'ready'             # 読み込み完了、リクエストを処理できる
+    FAILED = 'failed'           # 読み込みに失敗した（ファイルが壊れている等、修正後に再起動が必要）
@@ -0,0 +1,55 @@
+from collections import deque
+from threading import Lock
+
+
+class ChangeLog[T]:
+    """
+    バージョンごとの変更（キー, 値）を一定数だけ保持する
+    あるバージョン以降の変更をキーごとにまとめて取得できる（差分同期用）
+    古い変更が捨てられた後は、それより前のバージョンからの差分は取得できない
+    """
+
+    def __init__(self, max_entries: int):
+        self.__max_entries = max_entries
+        # (バージョン, キー, 値)（古い順）
+        self.__entries: deque[tuple[int, str, T]] = deque()
+        # このバージョン以降の変更は全て保持している
+        self.__base_version = 0
+        self.__lock = Lock()
+
+    def record(self, version: int, changes: list[tuple[str, T]]) -> None:
+        """
+        バージョンでの変更を記録する（バージョンは増える順に記録すること）
+        """
+        with self.__lock:
+            for key, value in changes:
+                self.__entries.append((version, key, value))
+            while len(self.__entries) > self.__max_entries:
+                dropped_version, _, _ = self.__entries.popleft()
+                self.__base_version = dropped_version
+
+    def reset(self, version: int) -> None:
+        """
+        全体が置き換えられた場合に呼ぶ
+        このバージョンより前からの差分は取得できなくなる
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__base_version = version
+
+    def changes_since(self, version: int) -> dict[str, T] | None:
+        """
+        指定のバージョンより後の変更を、キーごとに最新の値にまとめて返す
+        変更が既に捨てられている場合はNoneを返す
+        """
+        with self.__lock:
+            if version < self.__base_version:
+                return None
+            changes: dict[str, T] = {}
+            # 新しい順に辿り、指定のバージョン以前に達したら終了
+            for entry_version, key, value in reversed(self.__entries):
+                if entry_version <= version:
+                    break
+                if key not in changes:
+                    changes[key] = value
+            return dict(reversed(changes.items()))
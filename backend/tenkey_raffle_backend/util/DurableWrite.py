@@ -0,0 +1,137 @@
+from os import path
+import os
+import threading
+import time
+from typing import IO, Callable
+
+
+def write_file_atomically(filepath: str, render: Callable[[IO], None], binary: bool = False, durable: bool = True) -> None:
+    """
+    ファイルを一時ファイル経由で書き出す（書き出し -> fsync -> rename）
+    途中で落ちても既存のファイルは壊れない
+
+    @param render: 開いた一時ファイルに内容を書き込む関数
+    @param binary: バイナリモードで開くか（Falseの場合は改行を変換しないテキストモード）
+    @param durable: Falseの場合はfsyncしない（プロセスが落ちても壊れないが、OSが落ちた場合は古い内容に戻る可能性がある）
+    """
+    temp_filepath = filepath + '.tmp'
+    with (open(temp_filepath, 'wb') if binary else open(temp_filepath, 'wt', newline='')) as temp_file:
+        render(temp_file)
+        if durable:
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+    os.replace(temp_filepath, filepath)
+    if durable:
+        fsync_directory(path.dirname(filepath) or '.')
+
+
+def append_lines_durably(filepath: str, lines: list[str]) -> None:
+    """
+    ファイルに複数行を追記し、1回のfsyncで確定させる
+    """
+    with open(filepath, 'at', newline='') as append_file:
+        append_file.write(''.join(lines))
+        append_file.flush()
+        os.fsync(append_file.fileno())
+
+
+def fsync_directory(directory: str) -> None:
+    """
+    renameをディスクに確定させるため、ディレクトリをfsyncする
+    対応していないOSでは何もしない
+    """
+    try:
+        directory_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+class GroupCommitter[T]:
+    """
+    複数の変更をまとめて1回の書き出しで確定させる（グループコミット）
+
+    変更の登録（enqueue()）と確定待ち（wait()）は分けて呼べるので、ロックの中で登録し、ロックを解放してから待てる
+    書き出し中又は待ち時間中に届いた変更は、次の1回の書き出しにまとめられる
+    最初に待ち始めたスレッドが代表して書き出し、他のスレッドはその完了を待つ
+    """
+
+    def __init__(self, commit: Callable[[list[T]], None], window_seconds: float):
+        """
+        @param commit: 溜まった変更（enqueue()に渡されたitem、登録順）を受け取って書き出す関数
+        @param window_seconds: 代表スレッドが書き出し前に他の変更を待つ時間（0の場合は待たない）
+        """
+        self.__commit = commit
+        self.__window_seconds = window_seconds
+        self.__condition = threading.Condition()
+        self.__pending_items: list[T] = []
+        # 受け付けた変更の通し番号と、確定済みの通し番号
+        self.__requested = 0
+        self.__committed = 0
+        self.__leader_active = False
+        self.__last_error: BaseException | None = None
+
+    def enqueue(self, item: T) -> int:
+        """
+        変更を登録し、確定を待つための番号を返す（wait()に渡す）
+        """
+        with self.__condition:
+            self.__pending_items.append(item)
+            self.__requested += 1
+            return self.__requested
+
+    def wait(self, ticket: int) -> None:
+        """
+        enqueue()で登録した変更が確定するまで待つ
+        他のスレッドが書き出し中でなければ、代表して溜まった変更を書き出す
+        """
+        with self.__condition:
+            # 他のスレッドが書き出し中なら完了を待つ
+            while self.__committed < ticket and self.__leader_active:
+                self.__condition.wait()
+            if self.__committed >= ticket:
+                if self.__last_error is not None:
+                    raise self.__last_error
+                return
+            self.__leader_active = True
+
+        # 代表として書き出す
+        if self.__window_seconds > 0:
+            time.sleep(self.__window_seconds)
+        with self.__condition:
+            items = self.__pending_items
+            self.__pending_items = []
+            commit_ticket = self.__requested
+
+        error: BaseException | None = None
+        try:
+            self.__commit(items)
+        except BaseException as e:
+            error = e
+        finally:
+            with self.__condition:
+                self.__committed = commit_ticket
+                self.__last_error = error
+                self.__leader_active = False
+                self.__condition.notify_all()
+        if error is not None:
+            raise error
+
+    def submit(self, item: T) -> None:
+        """
+        変更を登録し、確定するまで待つ
+        """
+        self.wait(self.enqueue(item))
+
+    def flush(self) -> None:
+        """
+        それまでに登録された全ての変更が確定するまで待つ
+        """
+        with self.__condition:
+            ticket = self.__requested
+        self.wait(ticket)
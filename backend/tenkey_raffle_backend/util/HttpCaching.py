@@ -0,0 +1,98 @@
+import gzip
+from typing import Any, Callable, NamedTuple
+
+from flask import Response, current_app, request
+
+from util.SharedState import SharedState
+
+# brotliは任意（インストールされている場合のみbr圧縮版も作成する）
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_etag(*versions: str | int) -> str:
+    """
+    データのバージョン番号からETagの値を作成する
+    バージョン番号は全プロセス共通の世代番号なので、どのworkerが返したETagも同じ内容を指す
+    データ保管場所ごとのIDを付け、データを作り直した場合に以前のETagと一致しないようにする
+    """
+    return '-'.join([SharedState().store_id, *(str(version) for version in versions)])
+
+
+def parse_version_token(token: str | None, count: int) -> list[int] | None:
+    """
+    make_etag()でバージョン番号のみから作成した値（差分同期の?since=）からバージョン番号を取り出す
+    別のデータ保管場所の値や不正な値の場合はNoneを返す
+    """
+    if token is None:
+        return None
+    store_id, *versions = token.split('-')
+    if store_id != SharedState().store_id or len(versions) != count or not all(version.isdigit() for version in versions):
+        return None
+    return [int(version) for version in versions]
+
+
+# この大きさ未満のレスポンスは圧縮しない
+MIN_COMPRESS_BYTES = 1024
+
+
+class CachedJsonBody(NamedTuple):
+    etag: str                  # 作成時のETag
+    variants: dict[str, bytes] # Content-Encoding -> エンコード済みのJSON（'identity'は非圧縮）
+
+
+# エンドポイント -> 最新のエンコード済みJSON
+# ETagにデータのバージョンが含まれるので、変更があれば次のGETで作り直される
+json_body_cache: dict[str, CachedJsonBody] = {}
+
+
+def encode_json_body(etag: str, data: Any) -> CachedJsonBody:
+    """
+    データをJSONにエンコードし、圧縮版も作成する
+    """
+    body = (current_app.json.dumps(data) + '\n').encode('utf-8')
+    variants = {'identity': body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        variants['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            variants['br'] = brotli.compress(body)
+    return CachedJsonBody(etag=etag, variants=variants)
+
+
+def cached_json_response(endpoint: str, etag: str, build_data: Callable[[], Any]) -> Response:
+    """
+    エンコード済み（・圧縮済み）のJSONをキャッシュから返す
+    ETagが変わった場合のみbuild_data()を呼んでエンコードし直す
+    If-None-MatchがETagと一致する場合はデータに触れずに304を返す
+    
+    圧縮版は別の表現なので、ETagにContent-Encodingを付けて区別する
+    """
+    for encoding in ('identity', 'gzip', 'br'):
+        representation_etag = etag if encoding == 'identity' else f'{etag}-{encoding}'
+        if request.if_none_match.contains(representation_etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(representation_etag)
+            not_modified.vary.add('Accept-Encoding')
+            return not_modified
+
+    cached = json_body_cache.get(endpoint)
+    if cached is None or cached.etag != etag:
+        cached = encode_json_body(etag, build_data())
+        json_body_cache[endpoint] = cached
+
+    encoding = 'identity'
+    for candidate in ('br', 'gzip'):
+        if candidate in cached.variants and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+
+    response = Response(cached.variants[encoding], mimetype='application/json')
+    if encoding == 'identity':
+        response.set_etag(etag)
+    else:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{etag}-{encoding}')
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,115 @@
+from array import array
+from random import Random
+from typing import Iterator, Mapping, Sequence
+
+
+class IndexedPool[T]:
+    """
+    行（参加者リスト等）の一部を保持するプール
+    追加・削除・キーでの存在確認・Indexでのアクセスを全てO(1)で行える
+    削除時は末尾の要素を削除位置に移動させるため、要素の順序は保証されない
+
+    要素やキーは保持せず、行番号（int）のみを配列で持つ（1行あたり8バイト）
+    行とキー -> 行番号の索引は管理クラスのものを共有し、行が置き換えられた場合はreset()で渡し直す
+    """
+
+    def __init__(self):
+        # 全行と、キー -> 行番号
+        self.__rows: Sequence[T] = ()
+        self.__row_numbers: Mapping[str, int] = {}
+        # プールに含まれる行番号（順不同）
+        self.__members = array('i')
+        # 行番号 -> self.__members内のIndex（含まれない行は-1）
+        self.__positions = array('i')
+
+    def __len__(self) -> int:
+        return len(self.__members)
+
+    def __contains__(self, key: str) -> bool:
+        row_number = self.__row_numbers.get(key)
+        return row_number is not None and self.__positions[row_number] >= 0
+
+    def __getitem__(self, index: int) -> T:
+        return self.__rows[self.__members[index]]
+
+    def __iter__(self) -> Iterator[T]:
+        rows = self.__rows
+        return (rows[row_number] for row_number in self.__members)
+
+    def add(self, key: str) -> bool:
+        """
+        キーの行を追加する
+        既に含まれている場合は何もせずFalseを返す
+        """
+        row_number = self.__row_numbers[key]
+        if self.__positions[row_number] >= 0:
+            return False
+        self.__positions[row_number] = len(self.__members)
+        self.__members.append(row_number)
+        return True
+
+    def remove(self, key: str) -> bool:
+        """
+        キーの行を削除する
+        含まれていない場合は何もせずFalseを返す
+        """
+        row_number = self.__row_numbers.get(key)
+        if row_number is None:
+            return False
+        index = self.__positions[row_number]
+        if index < 0:
+            return False
+        self.__positions[row_number] = -1
+        last_row_number = self.__members.pop()
+        # 削除対象が末尾でなければ、末尾の要素を空いた位置に移す
+        if index < len(self.__members):
+            self.__members[index] = last_row_number
+            self.__positions[last_row_number] = index
+        return True
+
+    def clear(self) -> None:
+        """
+        全要素を削除する（行はそのまま）
+        """
+        self.reset(self.__rows, self.__row_numbers, [])
+
+    def reset(self, rows: Sequence[T], row_numbers: Mapping[str, int], members: list[int]) -> None:
+        """
+        行を置き換え、プールをmembers（行番号のリスト）にする（1件ずつadd()するより速い）
+        行番号は重複しないこと
+
+        @param rows: 全行（変更しないこと）
+        @param row_numbers: キー -> rows内の行番号（変更しないこと）
+        """
+        self.__rows = rows
+        self.__row_numbers = row_numbers
+        self.__members = array('i', members)
+        self.__positions = array('i', [-1]) * len(rows)
+        for index, row_number in enumerate(members):
+            self.__positions[row_number] = index
+
+    def choice(self, rng: Random) -> T | None:
+        """
+        一様にランダムな要素を1つ返す（空の場合はNone）
+        """
+        if len(self.__members) == 0:
+            return None
+        return self.__rows[self.__members[rng.randrange(len(self.__members))]]
+
+    def sample(self, count: int, rng: Random) -> list[T]:
+        """
+        重複なしでcount個の要素をランダムに選ぶ（プールの要素数より多い場合は全要素）
+        部分的なFisher-Yatesシャッフルで、入れ替えた位置のみを記録するのでO(count)で済む
+        プール自体は変更しない
+        """
+        pool_size = len(self.__members)
+        count = min(count, pool_size)
+        # 仮想的に入れ替えた位置 -> その位置にある元のIndex
+        swapped: dict[int, int] = {}
+        sampled: list[T] = []
+        for i in range(count):
+            j = rng.randrange(i, pool_size)
+            picked_index = swapped.get(j, j)
+            swapped[j] = swapped.get(i, i)
+            sampled.append(self.__rows[self.__members[picked_index]])
+        return sampled
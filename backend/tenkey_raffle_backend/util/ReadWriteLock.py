@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from threading import Condition, get_ident, local
+from typing import Iterator
+
+
+class ReadWriteLock:
+    """
+    読み込みは複数スレッドが同時に、書き込みは1スレッドのみが行えるロック
+    書き込み待ちのスレッドがいる場合は新たな読み込みを待たせる（書き込みが待たされ続けないように）
+
+    同じスレッドでの入れ子の取得が可能（書き込み中の読み込みも可）
+    ただし読み込み中に書き込みを取得することはできない（デッドロックになるため例外を投げる）
+    """
+
+    def __init__(self):
+        self.__condition = Condition()
+        # 読み込み中のスレッド数
+        self.__reader_count = 0
+        # 書き込み中のスレッドと、その入れ子の深さ
+        self.__writer: int | None = None
+        self.__write_depth = 0
+        # 書き込みを待っているスレッド数
+        self.__waiting_writer_count = 0
+        # スレッドごとの読み込みの入れ子の深さと、reader_countに数えたか
+        self.__thread_state = local()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self) -> None:
+        read_depth = getattr(self.__thread_state, 'read_depth', 0)
+        if read_depth > 0 or self.__writer == get_ident():
+            # 既に読み込み中、又は書き込み中のスレッドはそのまま入れる
+            if read_depth == 0:
+                self.__thread_state.counted = False
+            self.__thread_state.read_depth = read_depth + 1
+            return
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__writer is None and self.__waiting_writer_count == 0)
+            self.__reader_count += 1
+        self.__thread_state.read_depth = 1
+        self.__thread_state.counted = True
+
+    def release_read(self) -> None:
+        self.__thread_state.read_depth -= 1
+        if self.__thread_state.read_depth > 0 or not self.__thread_state.counted:
+            return
+        with self.__condition:
+            self.__reader_count -= 1
+            if self.__reader_count == 0:
+                self.__condition.notify_all()
+
+    def acquire_write(self) -> None:
+        if self.__writer == get_ident():
+            self.__write_depth += 1
+            return
+        if getattr(self.__thread_state, 'read_depth', 0) > 0:
+            raise RuntimeError('読み込みロックの取得中に書き込みロックは取得できません')
+        with self.__condition:
+            self.__waiting_writer_count += 1
+            try:
+                self.__condition.wait_for(lambda: self.__writer is None and self.__reader_count == 0)
+            finally:
+                self.__waiting_writer_count -= 1
+            self.__writer = get_ident()
+            self.__write_depth = 1
+
+    def release_write(self) -> None:
+        self.__write_depth -= 1
+        if self.__write_depth > 0:
+            return
+        with self.__condition:
+            self.__writer = None
+            self.__condition.notify_all()
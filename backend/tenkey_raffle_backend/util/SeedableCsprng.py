@@ -0,0 +1,52 @@
+from hashlib import sha256
+from random import Random, SystemRandom
+
+
+class SeedableCsprng(Random):
+    """
+    シードから決定的に乱数列を生成する暗号論的擬似乱数生成器
+    SHA-256をカウンターモードで利用する（リハーサル等で同じ抽選結果を再現したい場合用）
+    シードを指定しない本番の抽選ではSystemRandomを利用すること
+    """
+
+    def __init__(self, seed: str):
+        self.__key = b''
+        self.__counter = 0
+        super().__init__(seed)
+
+    def seed(self, a=None, version: int = 2) -> None:
+        self.__key = sha256(str(a).encode('utf-8')).digest()
+        self.__counter = 0
+
+    def getstate(self):
+        return (self.__key, self.__counter)
+
+    def setstate(self, state) -> None:
+        self.__key, self.__counter = state
+
+    def __next_block(self) -> bytes:
+        block = sha256(self.__key + self.__counter.to_bytes(8, 'big')).digest()
+        self.__counter += 1
+        return block
+
+    def getrandbits(self, k: int) -> int:
+        if k == 0:
+            return 0
+        num_bytes = (k + 7) // 8
+        random_bytes = b''
+        while len(random_bytes) < num_bytes:
+            random_bytes += self.__next_block()
+        return int.from_bytes(random_bytes[:num_bytes], 'big') >> (num_bytes * 8 - k)
+
+    def random(self) -> float:
+        return self.getrandbits(53) * (2 ** -53)
+
+
+def create_draw_rng(seed: str | None) -> Random:
+    """
+    抽選用の乱数生成器を作成する
+    シードが指定されない場合はOSの乱数（SystemRandom）を利用する
+    """
+    if seed is None:
+        return SystemRandom()
+    return SeedableCsprng(seed)
@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+import fcntl
+import json
+import os
+from secrets import token_hex
+from threading import Lock, local
+from typing import Callable, Iterator
+
+from settings import SHARED_LOCK_FILEPATH, SHARED_GENERATIONS_FILEPATH
+from util.SingletonMetaclass import Singleton
+from util.DurableWrite import write_file_atomically
+from util.ReadWriteLock import ReadWriteLock
+
+
+# Singletonなので、（プロセスごとに）インスタンスは1つしか作成されない
+class SharedState(metaclass=Singleton):
+
+    def __init__(self):
+        """
+        複数のプロセス（gunicornのworker）で同じデータファイルを共有するための排他制御と変更検知
+
+        書き込みはDATA_PATH内のロックファイルをflockで排他してから行う
+        プロセス内のスレッド間は読み書きロックで、読み込みは同時に、書き込み（と読み込み直し）は排他して行う
+        保存単位（参加者・景品・当選者）ごとの世代番号をファイルに記録し、
+        他のプロセスが書き込んだ場合は、次の同期時に該当の管理クラスがファイルを読み込み直す
+        世代番号は変更検知用で、各プロセスは起動時にデータを読み込むので、書き込みごとにfsyncしない
+
+        flockは開いたファイルごとなので、fork後の各プロセスで作成すること（gunicornの--preloadは使わない）
+        """
+
+        self.lock_file = open(SHARED_LOCK_FILEPATH, 'a+')
+        self.thread_lock = ReadWriteLock()
+        # flockはプロセス単位なので、flockを必要としているスレッド（exclusive()の中・書き込みの確定待ち）の数を数える
+        self.process_lock_holders = 0
+        self.process_lock_mutex = Lock()
+        # スレッドごとのexclusive()の入れ子の深さと、一番外側のexclusive()を抜ける際に呼ぶ関数
+        self.thread_state = local()
+
+        # 読み込み直す関数と、依存する保存単位（登録順に呼ばれる）
+        self.reloaders: dict[str, tuple[Callable[[int], None], list[str]]] = {}
+        # このプロセスが読み込んだ時点の世代番号
+        self.loaded_generations: dict[str, int] = {}
+        # 世代番号ファイルの前回確認時のstat（変わっていなければ読まない）
+        self.generations_stat: tuple[int, int, int] | None = None
+
+        with self.exclusive():
+            generations = self.__read_generations()
+            boot_id = self.__read_boot_id()
+            if generations is None or generations.get('boot_id') != boot_id:
+                # OSが再起動した場合は、fsyncしていない世代番号が戻っている可能性があるので、IDを作り直す
+                # （再起動前のETag等と同じIDと世代番号の組み合わせで、別の内容を指さないように）
+                generations = {"store_id": token_hex(4), "boot_id": boot_id, "generations": generations['generations'] if generations else {}}
+                self.__write_generations(generations, durable=True)
+            # ETag等に使う、データ保管場所ごとのID
+            # 世代番号は戻らない（OSの再起動ではIDが変わる）ので、同じIDと世代番号の組み合わせは同じ内容を指す
+            self.store_id: str = generations['store_id']
+
+        return
+
+
+    # === 排他制御 ===
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """
+        管理クラスのデータを読み込む間、書き込みを待たせる（読み込み同士は同時に行える、入れ子で取得可能）
+        """
+        with self.thread_lock.read():
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        全プロセス・全スレッドで排他する（入れ子で取得可能）
+        複数の管理クラスにまたがる確認と書き込みも、この中で行えば1つのトランザクションとして扱える
+        shared()の中では取得できない
+
+        一番外側のexclusive()を抜ける際は、スレッド間の書き込みロックを解放してから
+        after_exclusive()で登録された関数（書き込みの確定待ち）を呼び、その後flockを解放する
+        確定を待つ間も同じプロセスの他のスレッドは書き込めるので、同時の変更は1回の書き出しにまとめられる
+        他のプロセスは確定するまで待たされるので、書き出し途中のファイルや世代番号を読むことはない
+        """
+        depth = getattr(self.thread_state, 'depth', 0)
+        self.thread_lock.acquire_write()
+        try:
+            self.__acquire_process_lock()
+        except BaseException:
+            self.thread_lock.release_write()
+            raise
+        self.thread_state.depth = depth + 1
+        if depth == 0:
+            self.thread_state.deferred = []
+        try:
+            yield
+        finally:
+            self.thread_state.depth = depth
+            self.thread_lock.release_write()
+            try:
+                if depth == 0:
+                    self.__run_deferred()
+            finally:
+                self.__release_process_lock()
+
+    def after_exclusive(self, callback: Callable[[], None]) -> None:
+        """
+        一番外側のexclusive()を抜ける際（スレッド間の書き込みロックの解放後、flockの解放前）に呼ぶ関数を登録する
+        書き込みの確定待ち等、同じプロセスの他のスレッドを止めずに待つ処理に使う
+        exclusive()の外で呼ばれた場合はすぐに呼ぶ
+        """
+        if getattr(self.thread_state, 'depth', 0) == 0:
+            callback()
+            return
+        self.thread_state.deferred.append(callback)
+
+    def __run_deferred(self) -> None:
+        """
+        after_exclusive()で登録された関数を全て呼ぶ（途中で例外が発生しても残りを呼んでから送出する）
+        """
+        deferred, self.thread_state.deferred = self.thread_state.deferred, []
+        error: BaseException | None = None
+        for callback in deferred:
+            try:
+                callback()
+            except BaseException as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def __acquire_process_lock(self) -> None:
+        # flockの取得はスレッド間の書き込みロックの中で行うので、ここで待つのは他のプロセスのみ
+        with self.process_lock_mutex:
+            if self.process_lock_holders == 0:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            self.process_lock_holders += 1
+
+    def __release_process_lock(self) -> None:
+        with self.process_lock_mutex:
+            self.process_lock_holders -= 1
+            if self.process_lock_holders == 0:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+
+    # === 世代番号 ===
+
+    def register(self, key: str, reload: Callable[[int], None], depends_on: list[str] = []) -> int:
+        """
+        保存単位を登録し、現在の世代番号を返す
+        他のプロセスが書き込んだ場合はreload(新しい世代番号)が呼ばれる
+
+        @param depends_on: 依存する保存単位（先に登録しておくこと）、それらを読み込み直した場合は合わせて読み込み直す
+        """
+        with self.exclusive():
+            generation = self.__read_generations()['generations'].get(key, 0)
+            self.reloaders[key] = (reload, depends_on)
+            self.loaded_generations[key] = generation
+            return generation
+
+    def get_generation(self, key: str) -> int:
+        """
+        このプロセスが読み込んだ時点の世代番号を返す
+        """
+        return self.loaded_generations[key]
+
+    def bump_generation(self, key: str) -> int:
+        """
+        保存単位の世代番号を1つ増やし、新しい世代番号を返す
+        書き込みの度に、exclusive()の中で呼ぶこと
+        """
+        with self.exclusive():
+            generations = self.__read_generations()
+            # 他のプロセスの書き込みを全て読み込み済みか（そうでなければ次の同期で読み込み直す）
+            up_to_date = all(generations['generations'].get(loaded_key, 0) == loaded_generation for loaded_key, loaded_generation in self.loaded_generations.items())
+            generation = generations['generations'].get(key, 0) + 1
+            generations['generations'][key] = generation
+            self.__write_generations(generations)
+            if up_to_date:
+                self.loaded_generations[key] = generation
+                # 自分の書き込みで読み込み直さないよう、statを更新しておく
+                self.generations_stat = self.__stat_generations()
+            return generation
+
+    def sync(self) -> None:
+        """
+        他のプロセスが書き込んだ保存単位を読み込み直す
+        世代番号ファイルが変わっていない場合はstat()のみで済ませる
+        """
+        if self.__stat_generations() == self.generations_stat:
+            return
+        with self.exclusive():
+            generations = self.__read_generations()['generations']
+            reloaded_keys: set[str] = set()
+            for key, (reload, depends_on) in self.reloaders.items():
+                generation = generations.get(key, 0)
+                if generation != self.loaded_generations[key] or any(dependency in reloaded_keys for dependency in depends_on):
+                    reload(generation)
+                    self.loaded_generations[key] = generation
+                    reloaded_keys.add(key)
+            self.generations_stat = self.__stat_generations()
+
+    def __stat_generations(self) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(SHARED_GENERATIONS_FILEPATH)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def __read_generations(self) -> dict | None:
+        try:
+            with open(SHARED_GENERATIONS_FILEPATH, 'rt') as generations_file:
+                return json.load(generations_file)
+        # fsyncしていないので、OSが落ちた場合は空のファイルが残る可能性がある（作り直す）
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def __write_generations(self, generations: dict, durable: bool = False) -> None:
+        write_file_atomically(SHARED_GENERATIONS_FILEPATH, lambda generations_file: json.dump(generations, generations_file), durable=durable)
+
+    def __read_boot_id(self) -> str | None:
+        """
+        OSの起動ごとのIDを返す（Linux以外ではNone）
+        """
+        try:
+            with open('/proc/sys/kernel/random/boot_id', 'rt') as boot_id_file:
+                return boot_id_file.read().strip()
+        except OSError:
+            return None
+
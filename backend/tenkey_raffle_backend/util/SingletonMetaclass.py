@@ -1,8 +1,40 @@
+import threading
+from typing import Any, cast
+
+
 class Singleton(type):
     _instances = {}
+    # インスタンスの作成を排他する（作成中に他のSingletonを作成するため、再入可能なロック）
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(
-                Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+        # 作成済みの場合はロックを取得しない
+        instance = cls._instances.get(cls)
+        if instance is None:
+            with Singleton._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super(
+                        Singleton, cls).__call__(*args, **kwargs)
+                instance = cls._instances[cls]
+        return instance
+
+
+class LazySingleton:
+    """
+    Singletonのクラスを、初回の属性アクセス時に作成する代理オブジェクト
+    属性へのアクセスは全てインスタンス（cls()）に転送する
+    """
+
+    def __init__(self, cls: type):
+        self.__cls = cls
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__cls(), name)
+
+
+def lazy_singleton[T](cls: type[T]) -> T:
+    """
+    モジュールの読み込み時にインスタンスを作成せず、初回利用時に作成する
+    （型はインスタンスと同じものとして扱う）
+    """
+    return cast(T, LazySingleton(cls))
@@ -0,0 +1,73 @@
+import hashlib
+import mmap
+import os
+from os import path
+import pickle
+from typing import Any
+
+from util.DurableWrite import write_file_atomically
+
+
+# スナップショットの形式のバージョン（保存する内容を変えた場合は上げる）
+SNAPSHOT_FORMAT_VERSION = 2
+
+# ファイルの指紋：(サイズ, 更新時刻, 内容のハッシュ)、ファイルが存在しない場合はNone
+type FileFingerprint = tuple[int, int, str] | None
+
+
+class SnapshotStore:
+    """
+    元ファイル（CSV等）を解析・確認した結果を、バイナリのスナップショットとして保存する
+    元ファイルの指紋（サイズ・更新時刻・ハッシュ）が保存時と一致する場合のみ、解析せずにスナップショットを使う
+
+    スナップショットは自分で書き出したファイルのみを読み込むこと（pickleのため）
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, key: str, source_filepaths: list[str]) -> Any | None:
+        """
+        スナップショットを読み込む
+        存在しない場合、元ファイルが変わっている場合、読み込めない場合はNoneを返す
+        """
+        snapshot_filepath = self.__snapshot_filepath(key)
+        if not path.exists(snapshot_filepath):
+            return None
+        try:
+            # 読み込みはmmap経由で、ファイル全体を一度にバッファへ読み込まない
+            with open(snapshot_filepath, 'rb') as snapshot_file, mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as snapshot_map:
+                format_version, fingerprints, data = pickle.loads(snapshot_map)
+        except Exception as e:
+            print(f'{snapshot_filepath}を読み込めないため利用しません（{e}）')
+            return None
+        if format_version != SNAPSHOT_FORMAT_VERSION or fingerprints != self.__fingerprints(source_filepaths):
+            return None
+        return data
+
+    def save(self, key: str, source_filepaths: list[str], data: Any) -> None:
+        """
+        元ファイルの現在の指紋と共にスナップショットを書き出す
+        元ファイルを書き出した後、又は元ファイルを解析した後に呼ぶこと
+        """
+        snapshot = (SNAPSHOT_FORMAT_VERSION, self.__fingerprints(source_filepaths), data)
+        write_file_atomically(self.__snapshot_filepath(key), lambda snapshot_file: pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL), binary=True)
+
+    def __snapshot_filepath(self, key: str) -> str:
+        return path.join(self.directory, f'{key}.snapshot')
+
+    def __fingerprints(self, source_filepaths: list[str]) -> list[FileFingerprint]:
+        return [self.__fingerprint(filepath) for filepath in source_filepaths]
+
+    def __fingerprint(self, filepath: str) -> FileFingerprint:
+        """
+        ハッシュは毎回計算する（statが同じでも内容が異なる場合があるため、statで省略しない、解析より十分速い）
+        """
+        try:
+            with open(filepath, 'rb') as source_file:
+                stat = os.fstat(source_file.fileno())
+                digest = hashlib.file_digest(source_file, 'blake2b').hexdigest()
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns, digest)
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+import time
+from typing import Iterator
+
+from util.SingletonMetaclass import Singleton
+
+
+# Singletonなので、（プロセスごとに）インスタンスは1つしか作成されない
+class StartupTimer(metaclass=Singleton):
+    """
+    起動の各段階（モジュールの読み込み、既存データの読み込み・確認、索引の作成）の所要時間を記録する
+    """
+
+    def __init__(self):
+        # 段階名 -> 所要時間（秒）（記録順）
+        self.phase_seconds: dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """
+        中の処理の所要時間を段階phaseとして記録する（同じ段階の場合は加算する）
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    def report(self) -> str:
+        """
+        記録した所要時間を1行にまとめる
+        """
+        phases = [f'{phase} {seconds:.3f}秒' for phase, seconds in self.phase_seconds.items()]
+        return ' / '.join(phases + [f'合計 {sum(self.phase_seconds.values()):.3f}秒'])
@@ -0,0 +1,161 @@
+from array import array
+from random import Random
+from typing import Mapping, Sequence
+
+
+class WeightedPool[T]:
+    """
+    行（参加者リスト等）の一部を重み付きで保持するプール
+    Fenwick木（Binary Indexed Tree）で重みの累積和を管理し、
+    追加・削除・重みの変更・重みに比例したランダム抽出を全てO(log n)で行える
+    重みは誤差が出ないよう整数（64bit）で扱う
+
+    要素やキーは保持せず、行番号をそのままスロットとして、重み・Fenwick木・含まれるかを配列で持つ（1行あたり17バイト）
+    行とキー -> 行番号の索引は管理クラスのものを共有し、行が置き換えられた場合はreset()で渡し直す
+    """
+
+    def __init__(self):
+        # 全行と、キー -> 行番号
+        self.__rows: Sequence[T] = ()
+        self.__row_numbers: Mapping[str, int] = {}
+        # Fenwick木（1始まり、行数 + 1要素）
+        self.__tree = array('q', [0])
+        # 行番号ごとの重みと、プールに含まれるか（重み0の要素も含められるので別に持つ）
+        self.__weights = array('q')
+        self.__members = bytearray()
+        self.__count = 0
+        self.__total_weight = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __contains__(self, key: str) -> bool:
+        row_number = self.__row_numbers.get(key)
+        return row_number is not None and self.__members[row_number] == 1
+
+    @property
+    def total_weight(self) -> int:
+        return self.__total_weight
+
+    def add(self, key: str, weight: int) -> bool:
+        """
+        キーの行を追加する
+        既に含まれている場合は何もせずFalseを返す
+        """
+        row_number = self.__row_numbers[key]
+        if self.__members[row_number] == 1:
+            return False
+        self.__members[row_number] = 1
+        self.__count += 1
+        self.__update(row_number, weight)
+        return True
+
+    def remove(self, key: str) -> bool:
+        """
+        キーの行を削除する
+        含まれていない場合は何もせずFalseを返す
+        """
+        row_number = self.__row_numbers.get(key)
+        if row_number is None or self.__members[row_number] == 0:
+            return False
+        self.__update(row_number, 0)
+        self.__members[row_number] = 0
+        self.__count -= 1
+        return True
+
+    def set_weight(self, key: str, weight: int) -> bool:
+        """
+        要素の重みを変更する
+        含まれていない場合は何もせずFalseを返す
+        """
+        row_number = self.__row_numbers.get(key)
+        if row_number is None or self.__members[row_number] == 0:
+            return False
+        self.__update(row_number, weight)
+        return True
+
+    def clear(self) -> None:
+        """
+        全要素を削除する（行はそのまま）
+        """
+        self.reset(self.__rows, self.__row_numbers, [])
+
+    def reset(self, rows: Sequence[T], row_numbers: Mapping[str, int], entries: list[tuple[int, int]]) -> None:
+        """
+        行を置き換え、プールを(行番号, 重み)のリストにする
+        Fenwick木は最後に1回だけO(n)で作るので、1件ずつadd()するより速い
+        行番号は重複しないこと
+
+        @param rows: 全行（変更しないこと）
+        @param row_numbers: キー -> rows内の行番号（変更しないこと）
+        """
+        self.__rows = rows
+        self.__row_numbers = row_numbers
+        self.__weights = array('q', [0]) * len(rows)
+        self.__members = bytearray(len(rows))
+        for row_number, weight in entries:
+            self.__weights[row_number] = weight
+            self.__members[row_number] = 1
+        self.__count = len(entries)
+        self.__total_weight = sum(self.__weights)
+        self.__rebuild_tree()
+
+    def copy(self) -> 'WeightedPool[T]':
+        """
+        プールの複製を作成する（O(n)、配列のコピーのみ）
+        """
+        duplicate: WeightedPool[T] = WeightedPool()
+        duplicate.__rows = self.__rows
+        duplicate.__row_numbers = self.__row_numbers
+        duplicate.__tree = array('q', self.__tree)
+        duplicate.__weights = array('q', self.__weights)
+        duplicate.__members = bytearray(self.__members)
+        duplicate.__count = self.__count
+        duplicate.__total_weight = self.__total_weight
+        return duplicate
+
+    def choice(self, rng: Random) -> T | None:
+        """
+        重みに比例した確率で要素を1つ返す（重みの合計が0の場合はNone）
+        """
+        if self.__total_weight <= 0:
+            return None
+        remaining = rng.randrange(self.__total_weight)
+        # 累積和がremainingを超える最初の行を木を降りながら探す
+        capacity = len(self.__tree) - 1
+        position = 0
+        step = 1 << (capacity.bit_length() - 1)
+        while step > 0:
+            next_position = position + step
+            if next_position <= capacity and self.__tree[next_position] <= remaining:
+                position = next_position
+                remaining -= self.__tree[next_position]
+            step >>= 1
+        return self.__rows[position]
+
+    def __rebuild_tree(self) -> None:
+        """
+        現在の重みからFenwick木をO(n)で作り直す
+        """
+        capacity = len(self.__weights)
+        self.__tree = array('q', [0])
+        self.__tree.extend(self.__weights)
+        for index in range(1, capacity + 1):
+            parent = index + (index & -index)
+            if parent <= capacity:
+                self.__tree[parent] += self.__tree[index]
+
+    def __update(self, row_number: int, weight: int) -> None:
+        """
+        行の重みを変更し、Fenwick木に差分を反映する
+        """
+        delta = weight - self.__weights[row_number]
+        if delta == 0:
+            return
+        self.__weights[row_number] = weight
+        self.__total_weight += delta
+        index = row_number + 1
+        capacity = len(self.__tree) - 1
+        while index <= capacity:
+            self.__tree[index] += delta
+            index += index & -index
@@ -0,0 +1,6 @@
+"""
+バックエンドのテスト
+
+使い方（backendディレクトリで実行）：
+    python -m unittest discover -s tests -t .
+"""
@@ -0,0 +1,54 @@
+import atexit
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from types import ModuleType
+
+from benchmarks.datagen import parse_scale, generate_dataset
+from benchmarks.runner import BACKEND_PACKAGE_PATH
+
+
+# テスト用の合成データの参加者数
+PARTICIPANTS = 200
+
+workdir: str | None = None
+
+
+def use_backend_modules() -> None:
+    """
+    バックエンドのモジュール（util.*等）をimportできるようにする（管理クラスを使わない単体のテスト用）
+    """
+    if BACKEND_PACKAGE_PATH not in sys.path:
+        sys.path.insert(0, BACKEND_PACKAGE_PATH)
+
+
+def setup_backend() -> ModuleType:
+    """
+    一時ディレクトリに合成データを作成してバックエンドを読み込み、app.pyのモジュールを返す
+    管理クラスはSingletonなので、1つのプロセスの全テストで同じデータを共有する（2回目以降は読み込み済みのものを返す）
+    """
+    global workdir
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='raffle-test-')
+        atexit.register(shutil.rmtree, workdir, True)
+        # settings.DATA_PATH（./data）は作業ディレクトリからの相対パス
+        os.chdir(workdir)
+        generate_dataset('data', parse_scale(str(PARTICIPANTS)))
+        use_backend_modules()
+        settings = importlib.import_module('settings')
+        settings.WARM_UP_ON_BOOT = False
+    app = importlib.import_module('app')
+    if not app.startup_manager.wait_until_ready():
+        raise RuntimeError(app.startup_manager.error)
+    return app
+
+
+def run_in_other_process(code: str) -> None:
+    """
+    同じデータを共有する別のプロセス（gunicornの別のworkerに相当）でcodeを実行する
+    """
+    assert workdir is not None, 'setup_backend()を先に呼ぶこと'
+    subprocess.run([sys.executable, '-c', code], cwd=workdir, env={**os.environ, "PYTHONPATH": BACKEND_PACKAGE_PATH}, check=True, capture_output=True)
@@ -0,0 +1,36 @@
+import unittest
+
+from tests.support import use_backend_modules
+
+
+class ChangeLogTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from util.ChangeLog import ChangeLog
+        self.change_log: ChangeLog[bool] = ChangeLog(4)
+
+    def test_changes_are_combined_per_key(self):
+        self.change_log.record(1, [('0001', True)])
+        self.change_log.record(2, [('0002', True), ('0001', False)])
+        self.assertEqual(self.change_log.changes_since(0), {'0002': True, '0001': False})
+        self.assertEqual(self.change_log.changes_since(1), {'0002': True, '0001': False})
+        self.assertEqual(self.change_log.changes_since(2), {})
+
+    def test_overflow_requires_full_sync(self):
+        for version in range(1, 7):
+            self.change_log.record(version, [(f'{version:04}', True)])
+        # 保持数（4件）を超えて捨てられたバージョンからは差分を返さない（全件を返す）
+        self.assertIsNone(self.change_log.changes_since(0))
+        self.assertIsNone(self.change_log.changes_since(1))
+        self.assertEqual(list(self.change_log.changes_since(2)), ['0003', '0004', '0005', '0006'])
+
+    def test_reset_requires_full_sync(self):
+        self.change_log.record(1, [('0001', True)])
+        self.change_log.reset(5)
+        self.assertIsNone(self.change_log.changes_since(1))
+        self.assertEqual(self.change_log.changes_since(5), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
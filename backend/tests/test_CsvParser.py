@@ -0,0 +1,71 @@
+import csv
+import io
+import unittest
+
+from tests.support import use_backend_modules
+
+
+def reader(text: str) -> csv.DictReader:
+    return csv.DictReader(io.StringIO(text, newline=''))
+
+
+class CsvParserTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from services import CsvParser
+        from typedefs.RaffleDatatypes import Participant, Prize
+        self.parser = CsvParser
+        self.participants = [Participant(registration_id='0001', username='a', display_name='A', connpass_attending=True, weight=1.0)]
+        self.prizes = [Prize(id='P1', provider='x', display_name='X'), Prize(id='P2', provider='y', display_name='Y')]
+
+    def test_participants_report_every_error_class(self):
+        result = self.parser.parse_participants_csv(reader(
+            'ユーザー名,表示名,参加ステータス,受付番号,抽選重み\n'
+            'a,A,参加,0001,1\n'
+            'b,B,補欠,0002,\n'
+            'c,C,参加,0001,2\n'
+            'd,D,参加,0003,-1\n'
+            'e,E,参加,0004,2000000\n'
+        ))
+        self.assertEqual(result['participants'], [])
+        error = result['error']
+        self.assertIsNotNone(error)
+        # 最初の問題で止めず、全ての種類の問題を行番号付きでまとめて返す
+        self.assertIn('0002（3行目）', error)
+        self.assertIn('0001（4行目）', error)
+        self.assertIn('0003（5行目）、0004（6行目）', error)
+        self.assertEqual(len(error.split('\n')), 3)
+
+    def test_participants_missing_headers_are_all_reported(self):
+        result = self.parser.parse_participants_csv(reader('ユーザー名,表示名\na,A\n'))
+        self.assertEqual(result['error'], '参加者CSVに「参加ステータス」列がありません\n参加者CSVに「受付番号」列がありません')
+
+    def test_participants_stop_at_row_limit(self):
+        result = self.parser.parse_participants_csv(reader(
+            'ユーザー名,表示名,参加ステータス,受付番号\n'
+            'a,A,参加,0001\n'
+            'b,B,参加,0002\n'
+            'c,C,参加,0003\n'
+        ), max_rows=2)
+        self.assertEqual(result['participants'], [])
+        self.assertIn('2行', result['error'])
+
+    def test_winners_report_every_error_class(self):
+        result = self.parser.parse_winners_csv(reader(
+            '景品ID,当選者受付番号\n'
+            'P1,0001\n'
+            'P1,0001\n'
+            'P9,0001\n'
+            'P2,9999\n'
+        ), self.participants, self.prizes)
+        self.assertEqual(result['winner_mappings'], [])
+        self.assertEqual(result['error'].split('\n'), [
+            '当選者リストCSVに景品IDの重複があります（P1（3行目））',
+            '当選者リストCSVに存在しない景品IDが含まれてます（P9（4行目））',
+            '当選者リストCSVに存在しない参加者受付番号が含まれてます（9999（5行目））',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+from threading import Barrier, Thread, current_thread
+import time
+import unittest
+from unittest import mock
+
+from tests.support import run_in_other_process, setup_backend
+
+
+class GroupCommitTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_backend()
+        import services.CsvStorage
+        from services.ParticipantsManager import ParticipantsManager
+        cls.storage_module = services.CsvStorage
+        cls.participants_manager = ParticipantsManager()
+
+    def test_concurrent_cancels_are_combined_into_fewer_writes(self):
+        ids = [participant.registration_id for participant in list(self.participants_manager.get_attending_participants())[:16]]
+
+        # cancels.txtの書き出しを遅くして、書き出し中に他のスレッドの変更が届くようにする
+        written_filepaths = []
+        write_file_atomically = self.storage_module.write_file_atomically
+        def slow_write_file_atomically(filepath, render, binary=False):
+            written_filepaths.append(filepath)
+            time.sleep(0.05)
+            write_file_atomically(filepath, render, binary)
+        self.storage_module.write_file_atomically = slow_write_file_atomically
+
+        barrier = Barrier(len(ids))
+        def add_cancel(id):
+            barrier.wait()
+            self.participants_manager.add_cancel(id)
+        threads = [Thread(target=add_cancel, args=(id,)) for id in ids]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.storage_module.write_file_atomically = write_file_atomically
+
+        # 書き込みロックを保持したまま確定を待たないので、書き出し中の変更は次の1回にまとめられる
+        cancels_writes = [filepath for filepath in written_filepaths if filepath.endswith('cancels.txt')]
+        self.assertLess(len(cancels_writes), len(ids) // 2)
+        with open('data/cancels.txt', 'rt') as cancels_file:
+            self.assertTrue(set(ids) <= set(cancels_file.read().split()))
+        self.participants_manager.remove_cancels(ids)
+
+    def test_cancel_fsyncs_only_cancels_file(self):
+        id = self.participants_manager.get_attending_participants()[0].registration_id
+        with mock.patch('os.fsync', wraps=os.fsync) as fsync:
+            self.participants_manager.add_cancel(id)
+        # cancels.txtの一時ファイルとディレクトリのみ（世代番号ファイルはfsyncしない）
+        self.assertEqual(fsync.call_count, 2)
+        self.participants_manager.remove_cancel(id)
+
+
+class JournalCompactionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_backend()
+        import services.CsvStorage
+        from services.RaffleManager import RaffleManager
+        cls.storage_module = services.CsvStorage
+        cls.raffle_manager = RaffleManager()
+
+    def test_journal_is_compacted_in_background_by_shared_count(self):
+        storage = self.raffle_manager.storage
+        participant_ids = list(self.raffle_manager.participants_manager.get_all_participant_ids())
+        prize_ids = self.raffle_manager.get_unraffled_prize_ids()[:4]
+
+        # 他のプロセスで3件追記する（このプロセスの当選は1件のみなので、件数はジャーナル自体から数える必要がある）
+        run_in_other_process(
+            'from services.RaffleManager import RaffleManager\n'
+            + ''.join(f'RaffleManager().set_winner_for_prize({prize_id!r}, {participant_id!r}, False)\n' for prize_id, participant_id in zip(prize_ids[:3], participant_ids))
+        )
+        self.raffle_manager.shared_state.sync()
+
+        compacting_threads = []
+        compact_winners = storage.compact_winners
+        def record_compact_winners(winner_mappings):
+            compacting_threads.append(current_thread())
+            compact_winners(winner_mappings)
+        with mock.patch.object(self.storage_module, 'WINNERS_JOURNAL_COMPACTION_THRESHOLD', 4), \
+                mock.patch.object(storage, 'compact_winners', record_compact_winners), \
+                mock.patch.object(self.storage_module, 'fsync_directory', wraps=self.storage_module.fsync_directory) as fsync_directory:
+            self.raffle_manager.set_winner_for_prize(prize_ids[3], participant_ids[3], False)
+            deadline = time.monotonic() + 2.0
+            while os.path.exists('data/winners.journal') and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        # リクエストのスレッドではなく整理用のスレッドでまとめ、ジャーナルの削除を確定させる
+        self.assertFalse(os.path.exists('data/winners.journal'))
+        self.assertNotIn(current_thread(), compacting_threads)
+        fsync_directory.assert_called_with('./data')
+        with open('data/winners.csv', 'rt') as winners_file:
+            winners_csv = winners_file.read()
+        self.assertTrue(all(prize_id in winners_csv for prize_id in prize_ids))
+        for prize_id in prize_ids:
+            self.raffle_manager.delete_winner_for_prize(prize_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import codecs
+import io
+import unittest
+
+from tests.support import use_backend_modules
+
+
+PARTICIPANTS_CSV = (
+    'ユーザー名,表示名,参加ステータス,受付番号\n'
+    'tenkey,テンキー太郎,参加,0001\n'
+    'ほげ,髙橋（はしごだか）,参加キャンセル,0002\n'
+)
+
+
+class CsvUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from werkzeug.datastructures import FileStorage
+        from services.CsvParser import parse_participants_csv
+        from services.CsvUpload import open_uploaded_csv
+        self.file_storage = FileStorage
+        self.parse_participants_csv = parse_participants_csv
+        self.open_uploaded_csv = open_uploaded_csv
+
+    def parse(self, content: bytes):
+        uploaded_file = self.file_storage(stream=io.BytesIO(content), filename='parts.csv')
+        result = self.parse_participants_csv(self.open_uploaded_csv(uploaded_file))
+        self.assertIsNone(result['error'])
+        return result['participants']
+
+    def test_encodings_round_trip(self):
+        expected = self.parse(PARTICIPANTS_CSV.encode('utf-8'))
+        self.assertEqual([participant.display_name for participant in expected], ['テンキー太郎', '髙橋（はしごだか）'])
+        # BOM付きUTF-8・Shift_JIS（Excel向け）でも同じ内容になり、BOMが最初の列名に混ざらない
+        for content in (codecs.BOM_UTF8 + PARTICIPANTS_CSV.encode('utf-8'), PARTICIPANTS_CSV.encode('cp932')):
+            self.assertEqual(self.parse(content), expected)
+
+    def test_multibyte_character_split_at_detection_boundary(self):
+        from services import CsvUpload
+        content = PARTICIPANTS_CSV.encode('utf-8')
+        # 判定に使う先頭部分の末尾でマルチバイト文字が途切れても、UTF-8と判定する
+        boundary = content.index('テンキー'.encode('utf-8')) + 1
+        original_bytes = CsvUpload.ENCODING_DETECTION_BYTES
+        CsvUpload.ENCODING_DETECTION_BYTES = boundary
+        try:
+            participants = self.parse(content)
+        finally:
+            CsvUpload.ENCODING_DETECTION_BYTES = original_bytes
+        self.assertEqual(participants[0].display_name, 'テンキー太郎')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+from random import SystemRandom
+import unittest
+
+from tests.support import setup_backend
+
+
+class SeededDrawTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = setup_backend()
+        cls.client = cls.app.flask_app.test_client()
+        from services.DrawManager import DrawManager
+        from services.RaffleManager import RaffleManager
+        cls.draw_manager = DrawManager()
+        cls.raffle_manager = RaffleManager()
+
+    def draw(self, seed: str | None = None) -> str:
+        # 既に当選した参加者も対象にする（抽選対象のプールが当選の記録・取り消しで変わらないように）
+        prize_id = self.raffle_manager.get_unraffled_prize_ids()[0]
+        data = {"prize_id": prize_id, "allow_prior_winners": 'y'} | ({"seed": seed} if seed is not None else {})
+        response = self.client.post('/api/v1/raffle/draw', data=data)
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        winner_id = response.get_json()['winner_id']
+        self.raffle_manager.delete_winner_for_prize(prize_id)
+        return winner_id
+
+    def test_seeded_draw_is_reproducible(self):
+        self.assertEqual(self.draw(seed='rehearsal'), self.draw(seed='rehearsal'))
+
+    def test_unseeded_draw_after_seeded_draw_uses_system_random(self):
+        self.draw(seed='rehearsal')
+        self.assertIsInstance(self.draw_manager.rng, SystemRandom)
+
+        # シード無しの抽選がSystemRandomから引かれることを確認する
+        calls = []
+        original_getrandbits = SystemRandom.getrandbits
+        def getrandbits(rng, k):
+            calls.append(rng)
+            return original_getrandbits(rng, k)
+        SystemRandom.getrandbits = getrandbits
+        try:
+            self.draw()
+        finally:
+            SystemRandom.getrandbits = original_getrandbits
+        self.assertGreater(len(calls), 0)
+        self.assertTrue(all(type(rng) is SystemRandom for rng in calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
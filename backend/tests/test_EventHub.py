@@ -0,0 +1,47 @@
+import unittest
+
+from tests.support import run_in_other_process, setup_backend
+
+
+class SharedEventLogTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = setup_backend()
+        from services.EventHub import EventHub
+        from services.ParticipantsManager import ParticipantsManager
+        cls.event_hub = EventHub()
+        cls.participants_manager = ParticipantsManager()
+
+    def test_events_from_other_process_are_delivered_typed(self):
+        participant = self.participants_manager.get_attending_participants()[0]
+        self.assertTrue(self.event_hub.subscribe())
+        try:
+            log_id, sequence = self.event_hub.get_latest_position()
+            run_in_other_process(
+                'from services.ParticipantsManager import ParticipantsManager\n'
+                f'ParticipantsManager().add_cancel({participant.registration_id!r})\n'
+            )
+            # 監視スレッドがログへの追記を読み込んだ時点で届く
+            events = self.event_hub.wait_for_events(log_id, sequence, timeout=2.0)
+        finally:
+            self.event_hub.unsubscribe()
+
+        self.assertEqual([(event.sequence, event.type, event.data) for event in events], [(sequence + 1, 'cancel_added', {"participant_id": participant.registration_id})])
+        self.app.shared_state.sync()
+        self.participants_manager.remove_cancel(participant.registration_id)
+
+    def test_subscribers_over_limit_are_refused(self):
+        import services.EventHub
+        client = self.app.flask_app.test_client()
+        max_subscribers = services.EventHub.EVENT_MAX_SUBSCRIBERS
+        services.EventHub.EVENT_MAX_SUBSCRIBERS = self.event_hub.subscriber_count
+        try:
+            response = client.get('/api/v1/events')
+        finally:
+            services.EventHub.EVENT_MAX_SUBSCRIBERS = max_subscribers
+        self.assertEqual(response.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
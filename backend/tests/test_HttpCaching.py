@@ -0,0 +1,54 @@
+import gzip
+import unittest
+from unittest import mock
+
+from tests.support import setup_backend
+
+
+class ConditionalGetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = setup_backend()
+        cls.client = cls.app.flask_app.test_client()
+        from services.ParticipantsManager import ParticipantsManager
+        cls.participants_manager = ParticipantsManager()
+
+    def test_unchanged_cancels_return_304_without_building_body(self):
+        response = self.client.get('/api/v1/participants/cancels/all')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        with mock.patch.object(self.participants_manager, 'get_all_cancel_ids') as get_all_cancel_ids:
+            not_modified = self.client.get('/api/v1/participants/cancels/all', headers={"If-None-Match": etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.headers['ETag'], etag)
+        self.assertEqual(not_modified.get_data(), b'')
+        get_all_cancel_ids.assert_not_called()
+
+        # 変更後は同じETagでも200と新しいETagを返す
+        id = self.participants_manager.get_attending_participants()[0].registration_id
+        self.participants_manager.add_cancel(id)
+        try:
+            changed = self.client.get('/api/v1/participants/cancels/all', headers={"If-None-Match": etag})
+        finally:
+            self.participants_manager.remove_cancel(id)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertIn(id, changed.get_json())
+
+    def test_compressed_representation_has_its_own_etag(self):
+        plain = self.client.get('/api/v1/participants')
+        compressed = self.client.get('/api/v1/participants', headers={"Accept-Encoding": 'gzip'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.get_data()), plain.get_data())
+        self.assertEqual(compressed.headers['ETag'], plain.headers['ETag'][:-1] + '-gzip"')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+
+        not_modified = self.client.get('/api/v1/participants', headers={"Accept-Encoding": 'gzip', "If-None-Match": compressed.headers['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.headers['ETag'], compressed.headers['ETag'])
+
+
+if __name__ == '__main__':
+    unittest.main()
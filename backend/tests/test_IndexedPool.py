@@ -0,0 +1,51 @@
+from collections import Counter
+from random import Random
+import unittest
+
+from tests.support import use_backend_modules
+
+
+class IndexedPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from util.IndexedPool import IndexedPool
+        self.rows = tuple(f'{index:04}' for index in range(20))
+        self.row_numbers = {row: row_number for row_number, row in enumerate(self.rows)}
+        self.pool: IndexedPool[str] = IndexedPool()
+        self.pool.reset(self.rows, self.row_numbers, list(range(len(self.rows))))
+
+    def test_remove_and_add_keep_index_consistent(self):
+        for row in ('0000', '0019', '0007'):
+            self.assertTrue(self.pool.remove(row))
+        self.assertFalse(self.pool.remove('0007'))
+        self.assertFalse(self.pool.add('0001'))
+        self.assertTrue(self.pool.add('0007'))
+
+        expected = set(self.rows) - {'0000', '0019'}
+        self.assertEqual(len(self.pool), len(expected))
+        self.assertEqual(set(self.pool), expected)
+        self.assertEqual({self.pool[index] for index in range(len(self.pool))}, expected)
+        self.assertNotIn('0019', self.pool)
+        self.assertIn('0007', self.pool)
+
+    def test_sample_has_no_duplicates(self):
+        rng = Random(3)
+        for count in (0, 1, 5, len(self.rows), len(self.rows) + 5):
+            sampled = self.pool.sample(count, rng)
+            self.assertEqual(len(sampled), min(count, len(self.rows)))
+            self.assertEqual(len(set(sampled)), len(sampled))
+        # プール自体は変更しない
+        self.assertEqual(set(self.pool), set(self.rows))
+
+    def test_sample_is_uniform(self):
+        rng = Random(5)
+        rounds = 5000
+        counts = Counter(row for _ in range(rounds) for row in self.pool.sample(4, rng))
+        # 各要素が選ばれる確率は4 / 20
+        for row in self.rows:
+            self.assertAlmostEqual(counts[row] / rounds, 4 / len(self.rows), delta=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()
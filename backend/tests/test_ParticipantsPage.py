@@ -0,0 +1,69 @@
+import unittest
+
+from tests.support import setup_backend
+
+
+class ParticipantsPageTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = setup_backend()
+        cls.client = cls.app.flask_app.test_client()
+        from services.ParticipantsManager import ParticipantsManager
+        cls.participants_manager = ParticipantsManager()
+
+    def page_ids(self, query: str) -> list[str]:
+        response = self.client.get(f'/api/v1/participants?fields=registration_id&limit=1000&{query}')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        return [participant['registration_id'] for participant in response.get_json()['participants']]
+
+    def test_cancelled_filter_matches_cancels_list(self):
+        connpass_absent_ids = [participant.registration_id for participant in self.participants_manager.get_all_participants() if not participant.connpass_attending]
+        self.assertGreater(len(connpass_absent_ids), 0)
+        id = self.participants_manager.get_attending_participants()[0].registration_id
+        self.participants_manager.add_cancel(id)
+        try:
+            cancels = self.client.get('/api/v1/participants/cancels/all').get_json()
+            cancelled_ids = self.page_ids('filter=cancelled')
+            not_attending_ids = self.page_ids('filter=not_attending')
+        finally:
+            self.participants_manager.remove_cancel(id)
+
+        # cancelledは当日不参加のみ、not_attendingはConnpass不参加も含む
+        self.assertEqual(sorted(cancelled_ids), sorted(cancels))
+        self.assertIn(id, cancelled_ids)
+        self.assertTrue(set(connpass_absent_ids).isdisjoint(cancelled_ids))
+        self.assertTrue({id, *connpass_absent_ids} <= set(not_attending_ids))
+
+    def test_pages_follow_cursor_to_the_end(self):
+        all_ids = [participant.registration_id for participant in self.participants_manager.get_all_participants()]
+        # 件数が割り切れる場合は、最後のページの次に空のページが1つ返る
+        limit = len(all_ids) // 4
+        self.assertEqual(len(all_ids) % limit, 0)
+        ids: list[str] = []
+        pages = 0
+        cursor: str | None = None
+        while pages == 0 or cursor is not None:
+            query = {"fields": 'registration_id', "limit": limit, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get('/api/v1/participants', query_string=query)
+            self.assertEqual(response.status_code, 200)
+            body = response.get_json()
+            ids += [participant['registration_id'] for participant in body['participants']]
+            cursor = body['next_cursor']
+            pages += 1
+        self.assertEqual(ids, all_ids)
+        self.assertEqual(pages, 5)
+
+    def test_cursor_past_the_end(self):
+        last_id = self.participants_manager.get_all_participants()[-1].registration_id
+        response = self.client.get(f'/api/v1/participants?cursor={last_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"participants": [], "next_cursor": None})
+
+        # 存在しない受付番号（参加者リストが置き換えられた等）は400
+        response = self.client.get('/api/v1/participants?cursor=no-such-id')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
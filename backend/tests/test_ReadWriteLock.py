@@ -0,0 +1,115 @@
+from threading import Barrier, Event, Thread
+import unittest
+
+from tests.support import use_backend_modules
+
+
+class ReadWriteLockTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from util.ReadWriteLock import ReadWriteLock
+        self.lock = ReadWriteLock()
+
+    def test_readers_share_the_lock(self):
+        readers = 3
+        # 全員が同時に読み込みロックを保持していなければ、Barrierを通過できない
+        barrier = Barrier(readers, timeout=2.0)
+        errors = []
+        def read():
+            with self.lock.read():
+                try:
+                    barrier.wait()
+                except Exception as e:
+                    errors.append(e)
+        threads = [Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_writer_excludes_readers_and_writers(self):
+        writer_entered = Event()
+        release_writer = Event()
+        entered = []
+        def write():
+            with self.lock.write():
+                writer_entered.set()
+                release_writer.wait()
+        def read():
+            with self.lock.read():
+                entered.append('read')
+        def write_other():
+            with self.lock.write():
+                entered.append('write')
+        writer = Thread(target=write)
+        writer.start()
+        writer_entered.wait()
+        others = [Thread(target=read), Thread(target=write_other)]
+        for thread in others:
+            thread.start()
+        for thread in others:
+            thread.join(0.1)
+        # 書き込み中は他のスレッドの読み込み・書き込みは待たされる
+        self.assertEqual(entered, [])
+        release_writer.set()
+        writer.join()
+        for thread in others:
+            thread.join()
+        self.assertCountEqual(entered, ['read', 'write'])
+
+    def test_waiting_writer_blocks_new_readers(self):
+        reader_entered = Event()
+        release_reader = Event()
+        entered = []
+        def read_first():
+            with self.lock.read():
+                reader_entered.set()
+                release_reader.wait()
+        def write():
+            with self.lock.write():
+                entered.append('write')
+        def read_later():
+            with self.lock.read():
+                entered.append('read')
+        first = Thread(target=read_first)
+        first.start()
+        reader_entered.wait()
+        writer = Thread(target=write)
+        writer.start()
+        writer.join(0.1)
+        later = Thread(target=read_later)
+        later.start()
+        later.join(0.1)
+        # 書き込み待ちがいる間は、新たな読み込みも待たされる（書き込みが先）
+        self.assertEqual(entered, [])
+        release_reader.set()
+        for thread in (first, writer, later):
+            thread.join()
+        self.assertEqual(entered, ['write', 'read'])
+
+    def test_nested_acquisition(self):
+        with self.lock.write():
+            with self.lock.write():
+                # 書き込み中の読み込みは可
+                with self.lock.read():
+                    pass
+        with self.lock.read():
+            with self.lock.read():
+                # 読み込み中に書き込みを取得するとデッドロックになるので例外
+                with self.assertRaises(RuntimeError):
+                    self.lock.acquire_write()
+        # 全て解放されていれば、他のスレッドが書き込める
+        done = Event()
+        def write_and_release():
+            with self.lock.write():
+                done.set()
+        other = Thread(target=write_and_release)
+        other.start()
+        other.join(2.0)
+        self.assertTrue(done.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
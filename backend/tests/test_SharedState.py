@@ -0,0 +1,84 @@
+import unittest
+from unittest import mock
+
+from tests.support import run_in_other_process, setup_backend
+
+
+class SharedStateSyncTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_backend()
+        from services.ParticipantsManager import ParticipantsManager
+        from services.RaffleManager import RaffleManager
+        from util.SharedState import SharedState
+        cls.participants_manager = ParticipantsManager()
+        cls.raffle_manager = RaffleManager()
+        cls.shared_state = SharedState()
+
+    def test_cancel_in_other_process_does_not_reload_winners(self):
+        participant = self.participants_manager.get_attending_participants()[0]
+
+        # 当選者リストを読み込み直す関数を記録用に差し替える
+        reload_winners, depends_on = self.shared_state.reloaders['winners']
+        reloaded_generations = []
+        self.shared_state.reloaders['winners'] = (reloaded_generations.append, depends_on)
+        try:
+            run_in_other_process(
+                'from services.ParticipantsManager import ParticipantsManager\n'
+                f'ParticipantsManager().add_cancel({participant.registration_id!r})\n'
+            )
+            self.shared_state.sync()
+        finally:
+            self.shared_state.reloaders['winners'] = (reload_winners, depends_on)
+
+        # 不参加リストは読み込み直され、当選者リストは読み込み直されない
+        self.assertNotIn(participant.registration_id, self.participants_manager.get_attending_participants())
+        self.assertEqual(reloaded_generations, [])
+        self.participants_manager.remove_cancel(participant.registration_id)
+
+    def test_changes_in_other_process_are_returned_as_deltas(self):
+        participant = self.participants_manager.get_attending_participants()[0]
+        prize_id = self.raffle_manager.get_unraffled_prize_ids()[0]
+        cancels_version = self.participants_manager.get_version()
+        winners_version = self.raffle_manager.get_version()
+
+        run_in_other_process(
+            'from services.ParticipantsManager import ParticipantsManager\n'
+            'from services.RaffleManager import RaffleManager\n'
+            f'ParticipantsManager().add_cancel({participant.registration_id!r})\n'
+            f'RaffleManager().set_winner_for_prize({prize_id!r}, {participant.registration_id!r}, False)\n'
+        )
+        self.shared_state.sync()
+
+        # 読み込み直した場合も全件ではなく差分を返す
+        self.assertEqual(self.participants_manager.get_cancel_changes_since(cancels_version), {participant.registration_id: True})
+        self.assertEqual(self.raffle_manager.get_winner_changes_since(winners_version), {prize_id: participant.registration_id})
+        self.raffle_manager.delete_winner_for_prize(prize_id)
+        self.participants_manager.remove_cancel(participant.registration_id)
+
+    def test_cancels_from_other_process_update_pools_incrementally(self):
+        participant = self.participants_manager.get_unwon_attending_participants()[0]
+        id = participant.registration_id
+        pools = [
+            self.participants_manager.get_attending_participants(),
+            self.participants_manager.get_unwon_attending_participants(),
+            self.participants_manager.get_weighted_attending_participants(),
+            self.participants_manager.get_weighted_unwon_attending_participants(),
+        ]
+
+        with mock.patch.object(self.participants_manager, '_ParticipantsManager__rebuild_attending_participants') as rebuild:
+            run_in_other_process(f'from services.ParticipantsManager import ParticipantsManager\nParticipantsManager().add_cancel({id!r})\n')
+            self.shared_state.sync()
+            self.assertEqual([id in pool for pool in pools], [False] * len(pools))
+
+            run_in_other_process(f'from services.ParticipantsManager import ParticipantsManager\nParticipantsManager().remove_cancel({id!r})\n')
+            self.shared_state.sync()
+            self.assertEqual([id in pool for pool in pools], [True] * len(pools))
+
+        # 全参加者のプールを作り直さない
+        rebuild.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from tests.support import use_backend_modules
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from util.SnapshotStore import SnapshotStore
+        self.directory = tempfile.TemporaryDirectory()
+        self.source_filepath = os.path.join(self.directory.name, 'parts.csv')
+        with open(self.source_filepath, 'wb') as source_file:
+            source_file.write(b'id\n0001\n')
+        self.snapshot_store = SnapshotStore(os.path.join(self.directory.name, 'snapshots'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_unchanged_source_loads_snapshot(self):
+        self.snapshot_store.save('participants', [self.source_filepath], ['0001'])
+        self.assertEqual(self.snapshot_store.load('participants', [self.source_filepath]), ['0001'])
+
+    def test_rewrite_with_same_stat_is_detected(self):
+        self.snapshot_store.save('participants', [self.source_filepath], ['0001'])
+        self.assertEqual(self.snapshot_store.load('participants', [self.source_filepath]), ['0001'])
+
+        # 同じinode・サイズ・更新時刻のまま内容だけを書き換える
+        stat = os.stat(self.source_filepath)
+        with open(self.source_filepath, 'r+b') as source_file:
+            source_file.write(b'id\n0002\n')
+        os.utime(self.source_filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(os.stat(self.source_filepath).st_ino, stat.st_ino)
+
+        self.assertIsNone(self.snapshot_store.load('participants', [self.source_filepath]))
+
+    def test_missing_source_does_not_match(self):
+        self.snapshot_store.save('participants', [self.source_filepath], ['0001'])
+        os.remove(self.source_filepath)
+        self.assertIsNone(self.snapshot_store.load('participants', [self.source_filepath]))
+
+
+if __name__ == '__main__':
+    unittest.main()
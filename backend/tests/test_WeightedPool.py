@@ -0,0 +1,91 @@
+from collections import Counter
+from random import Random
+import unittest
+
+from tests.support import use_backend_modules
+
+
+class WeightedPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        use_backend_modules()
+        from util.WeightedPool import WeightedPool
+        # Fenwick木の途中の節点を跨ぐよう、2の冪でない行数にする
+        self.rows = tuple(f'{index:04}' for index in range(37))
+        self.row_numbers = {row: row_number for row_number, row in enumerate(self.rows)}
+        self.pool: WeightedPool[str] = WeightedPool()
+        self.pool.reset(self.rows, self.row_numbers, [(row_number, row_number + 1) for row_number in range(len(self.rows))])
+
+    def assertPrefixSums(self, expected_weights: dict[str, int]):
+        """
+        choice()が返す行の境界から、Fenwick木の累積和が重みと一致することを確かめる
+        """
+        self.assertEqual(self.pool.total_weight, sum(expected_weights.values()))
+        self.assertEqual(len(self.pool), len(expected_weights))
+        cumulative = 0
+        for row in self.rows:
+            weight = expected_weights.get(row, 0)
+            if weight == 0:
+                continue
+            # 累積和の範囲の最初と最後がその行を指す
+            for value in (cumulative, cumulative + weight - 1):
+                self.assertEqual(self.pool.choice(FixedRandom(value)), row)
+            cumulative += weight
+
+    def test_weights_after_remove_and_set_weight(self):
+        expected_weights = {row: row_number + 1 for row_number, row in enumerate(self.rows)}
+        self.assertPrefixSums(expected_weights)
+
+        for row in ('0000', '0015', '0036'):
+            self.assertTrue(self.pool.remove(row))
+            del expected_weights[row]
+        self.assertFalse(self.pool.remove('0015'))
+        self.assertNotIn('0015', self.pool)
+        self.pool.set_weight('0020', 100)
+        expected_weights['0020'] = 100
+        self.assertFalse(self.pool.set_weight('0015', 5))
+        self.assertPrefixSums(expected_weights)
+
+        self.assertTrue(self.pool.add('0015', 7))
+        expected_weights['0015'] = 7
+        self.assertPrefixSums(expected_weights)
+
+    def test_reset_and_copy_are_independent(self):
+        duplicate = self.pool.copy()
+        self.pool.reset(self.rows, self.row_numbers, [(3, 10), (30, 0)])
+        self.assertPrefixSums({'0003': 10, '0030': 0})
+        # 重み0の行も含まれる（抽選はされない）
+        self.assertIn('0030', self.pool)
+
+        self.assertEqual(len(duplicate), len(self.rows))
+        self.assertEqual(duplicate.total_weight, sum(range(1, len(self.rows) + 1)))
+
+        self.pool.clear()
+        self.assertEqual(len(self.pool), 0)
+        self.assertIsNone(self.pool.choice(Random(0)))
+
+    def test_choice_is_proportional_to_weight(self):
+        self.pool.reset(self.rows, self.row_numbers, [(0, 1), (10, 3), (20, 6)])
+        rng = Random(12)
+        draws = 30000
+        counts = Counter(self.pool.choice(rng) for _ in range(draws))
+        self.assertEqual(set(counts), {'0000', '0010', '0020'})
+        for row, weight in (('0000', 1), ('0010', 3), ('0020', 6)):
+            self.assertAlmostEqual(counts[row] / draws, weight / 10, delta=0.02)
+
+
+class FixedRandom(Random):
+    """
+    randrange()が常に指定の値を返す乱数（境界の確認用）
+    """
+
+    def __init__(self, value: int):
+        super().__init__()
+        self.value = value
+
+    def randrange(self, *args, **kwargs) -> int:
+        return self.value
+
+
+if __name__ == '__main__':
+    unittest.main()